@@ -21,6 +21,7 @@ project = PythonProject(
         'pydantic',
         'requests',
         'tqdm',
+        'typing-extensions',
         "boto3-stubs@{version = '*', extras = ['bedrock-runtime', 'bedrock']}",
     ],
     dev_deps=[
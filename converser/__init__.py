@@ -1,11 +1,27 @@
 """The main package for the project."""
 
-from .conversation_memory.memory import Memory
-from .converse import Converse
+from .cache import ResponseCache
+from .conversation_memory import Memory, SqliteMemory, WindowedMemory
+from .converse import AsyncConverse, Converse
 from .models.models import InferenceConfig
+from .resilience import RateLimiter
+from .tool_use import ToolRegistry
 from converser.models import model_ids
-from converser.utils import get_bedrock_client
+from converser.utils import Profiler, get_bedrock_client
 
 
 # Define the public API of the package
-__all__ = ['Converse', 'Memory', 'get_bedrock_client', 'InferenceConfig', 'model_ids']
+__all__ = [
+    'Converse',
+    'AsyncConverse',
+    'Memory',
+    'WindowedMemory',
+    'SqliteMemory',
+    'ResponseCache',
+    'RateLimiter',
+    'ToolRegistry',
+    'Profiler',
+    'get_bedrock_client',
+    'InferenceConfig',
+    'model_ids',
+]
@@ -0,0 +1,4 @@
+"""Benchmarks of converser's client-side overhead and end-to-end throughput.
+
+Run them all with `python -m converser.bench`, which prints the results as JSON.
+"""
@@ -0,0 +1,94 @@
+"""Run the benchmarks and print the results as JSON, to compare releases."""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from converser.bench.history import bench_history_assembly
+from converser.bench.load import bench_load
+from converser.bench.memory import bench_memory
+from converser.bench.requests import bench_request_building
+from converser.bench.streaming import bench_stream_throughput
+from converser.bench.tools import bench_tool_overhead
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+
+def _version() -> str:
+    """The installed version of converser, or the one of the source tree it is run from."""
+    try:
+        return metadata.version('converser')
+    except metadata.PackageNotFoundError:
+        pass
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        return 'unknown'
+    pyproject = Path(__file__).resolve().parents[2] / 'pyproject.toml'
+    try:
+        with pyproject.open('rb') as file:
+            project = tomllib.load(file).get('tool', {}).get('poetry', {})
+    except (OSError, tomllib.TOMLDecodeError):
+        return 'unknown'
+    if project.get('name') != 'converser':
+        return 'unknown'
+    return project.get('version', 'unknown')
+
+
+def main() -> None:
+    """Run the selected suites with the settings given on the command line."""
+    parser = argparse.ArgumentParser(prog='python -m converser.bench', description=__doc__)
+    suites: Dict[str, Callable[[argparse.Namespace], Any]] = {
+        'requests': lambda args: bench_request_building(),
+        'streaming': lambda args: bench_stream_throughput(),
+        'memory': lambda args: bench_memory(),
+        'history': lambda args: bench_history_assembly(),
+        'tools': lambda args: bench_tool_overhead(),
+        'load': lambda args: {
+            concurrency: bench_load(
+                requests=args.requests,
+                concurrency=concurrency,
+                streaming=args.streaming,
+                latency=args.latency,
+                time_to_first_token=args.time_to_first_token,
+                tokens_per_second=args.tokens_per_second,
+            )
+            for concurrency in args.concurrency
+        },
+    }
+    parser.add_argument(
+        '--suite',
+        action='append',
+        choices=list(suites),
+        dest='suites',
+        help='A suite to run, can be repeated. Defaults to all of them.',
+    )
+    parser.add_argument('--requests', type=int, default=500, help='Calls per load test.')
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[1, 8], help='Calls in flight at once.'
+    )
+    parser.add_argument('--streaming', action='store_true', help='Stream the load test calls.')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--time-to-first-token', type=float, default=0.0)
+    parser.add_argument('--tokens-per-second', type=float, default=None)
+    parser.add_argument('--output', help='A file to write the results to, besides stdout.')
+    args = parser.parse_args()
+
+    report = {
+        'converser': _version(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': {suite: suites[suite](args) for suite in args.suites or suites},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
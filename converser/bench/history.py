@@ -0,0 +1,48 @@
+"""Benchmark the per-call cost of assembling the conversation history.
+
+Run it with `python -m converser.bench.history`.
+"""
+
+import json
+from converser.bench.timing import time_per_call
+from converser.conversation_memory import Memory
+from converser.converse import Converse
+from converser.testing import StubBedrockClient
+from functools import partial
+from typing import Dict, Sequence
+
+
+def bench_history_assembly(
+    history_lengths: Sequence[int] = (10, 100, 1_000, 10_000), calls: int = 200
+) -> Dict[int, float]:
+    """Measure the mean client-side time of `send_messages` for several history lengths.
+
+    The stub client does no serialization or I/O, so the timings only cover converser's own
+    work: validation, history assembly and the memory update.
+
+    Args:
+        history_lengths (Sequence[int], optional): The number of messages already in memory.
+        calls (int, optional): The number of calls to time per history length. Defaults to 200.
+
+    Returns:
+        Dict[int, float]: The mean microseconds per call, keyed by history length.
+    """
+    results: Dict[int, float] = {}
+    for length in history_lengths:
+        memory = Memory()
+        for _ in range(length // 2):
+            memory.add_messages(
+                [
+                    {'role': 'user', 'content': [{'text': 'question'}]},
+                    {'role': 'assistant', 'content': [{'text': 'answer'}]},
+                ]
+            )
+        converse = Converse(model_id='bench', memory=memory, client=StubBedrockClient())
+        message = {'role': 'user', 'content': [{'text': 'question'}]}
+        send = partial(converse.send_messages, [message])  # type: ignore[list-item]
+        results[length] = time_per_call(send, calls)
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(bench_history_assembly(), indent=2))
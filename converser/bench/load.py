@@ -0,0 +1,85 @@
+"""Load-test converser end to end against a local fake Bedrock endpoint.
+
+Run it with `python -m converser.bench.load`.
+"""
+
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from converser.converse import Converse
+from converser.testing import FakeBedrock
+from typing import Dict, Optional
+
+
+def bench_load(
+    requests: int = 500,
+    concurrency: int = 8,
+    streaming: bool = False,
+    latency: float = 0.0,
+    time_to_first_token: float = 0.0,
+    tokens_per_second: Optional[float] = None,
+    reply_words: int = 20,
+) -> Dict[str, float]:
+    """Measure the throughput and latency percentiles of calls sent at a fixed concurrency.
+
+    The calls go through a real boto3 client to a `FakeBedrock` server in the same process,
+    so they include signing, serialization, HTTP and event-stream decoding. With no simulated
+    latency the server answers at once, and the numbers measure the client-side ceiling. The
+    server shares the process, and the GIL, with the client, which caps the throughput at
+    high concurrency.
+
+    Args:
+        requests (int, optional): The number of calls to time. Defaults to 500.
+        concurrency (int, optional): The number of calls in flight at once. Defaults to 8.
+        streaming (bool, optional): Whether to stream the replies. Defaults to False.
+        latency (float, optional): The simulated seconds before a response starts. Defaults to 0.0.
+        time_to_first_token (float, optional): The simulated seconds before the first token. Defaults to 0.0.
+        tokens_per_second (Optional[float], optional): The simulated token rate. Defaults to None, for no delay.
+        reply_words (int, optional): The number of words, one token each, of every reply. Defaults to 20.
+
+    Returns:
+        Dict[str, float]: The calls per second, the error count, and the mean and percentile latencies in milliseconds.
+    """  # noqa: E501
+    message = {'role': 'user', 'content': [{'text': 'question'}]}
+    fake = FakeBedrock(
+        text=' '.join(['word'] * reply_words),
+        latency=latency,
+        time_to_first_token=time_to_first_token,
+        tokens_per_second=tokens_per_second,
+    )
+    with fake, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        converse = Converse(model_id='bench', client=fake.client(max_pool_connections=concurrency))
+
+        def call(_: int) -> Optional[float]:
+            start = time.perf_counter()
+            try:
+                if streaming:
+                    for _ in converse.stream_messages([message]):  # type: ignore[list-item]
+                        pass
+                else:
+                    converse.send_messages([message])  # type: ignore[list-item]
+            except Exception:
+                return None
+            return time.perf_counter() - start
+
+        # open the connections before timing
+        list(executor.map(call, range(concurrency)))
+        start = time.perf_counter()
+        timings = list(executor.map(call, range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = [timing * 1_000 for timing in timings if timing is not None]
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'throughput_rps': len(latencies) / elapsed,
+        'errors': len(timings) - len(latencies),
+        'mean_ms': statistics.fmean(latencies) if latencies else 0.0,
+        'p50_ms': percentiles[49] if percentiles else 0.0,
+        'p95_ms': percentiles[94] if percentiles else 0.0,
+        'p99_ms': percentiles[98] if percentiles else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(bench_load(), indent=2))
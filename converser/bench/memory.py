@@ -0,0 +1,58 @@
+"""Benchmark the cost of appending to and validating a growing conversation history.
+
+Run it with `python -m converser.bench.memory`.
+"""
+
+import json
+from converser.bench.timing import time_per_call
+from converser.conversation_memory import Memory
+from typing import Any, Callable, Dict, Sequence
+
+
+def bench_memory(
+    history_lengths: Sequence[int] = (10, 100, 1_000, 10_000), calls: int = 2_000
+) -> Dict[int, Dict[str, float]]:
+    """Measure the mean time of the memory operations of one turn for several history lengths.
+
+    `validate` checks the order of a user and assistant pair against the history; `append`
+    adds the pair, and `request_view` assembles the history and a new message as a request.
+    Appended pairs are removed again between calls, so every call sees the same history.
+
+    Args:
+        history_lengths (Sequence[int], optional): The number of messages already in memory.
+        calls (int, optional): The number of calls to time per step and length. Defaults to 2,000.
+
+    Returns:
+        Dict[int, Dict[str, float]]: The mean microseconds per call, keyed by history length and step.
+    """  # noqa: E501
+    turn = [
+        {'role': 'user', 'content': [{'text': 'question'}]},
+        {'role': 'assistant', 'content': [{'text': 'answer'}]},
+    ]
+    results: Dict[int, Dict[str, float]] = {}
+    for length in history_lengths:
+        memory = Memory()
+        for _ in range(length // 2):
+            memory.add_messages(turn)  # type: ignore[arg-type]
+
+        def append() -> None:
+            memory.add_messages(turn)  # type: ignore[arg-type]
+            del memory.history[-2:]
+
+        def request_view() -> None:
+            with memory.request_view(turn[:1]):  # type: ignore[arg-type]
+                pass
+
+        steps: Dict[str, Callable[[], Any]] = {
+            'validate': lambda: memory._is_valid_message_history_order(turn),  # type: ignore[arg-type]
+            'append': append,
+            'request_view': request_view,
+        }
+        results[length] = {}
+        for step, call in steps.items():
+            results[length][step] = time_per_call(call, calls)
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(bench_memory(), indent=2))
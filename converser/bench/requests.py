@@ -0,0 +1,53 @@
+"""Benchmark the per-call cost of building requests.
+
+Run it with `python -m converser.bench.requests`.
+"""
+
+import json
+from converser.bench.timing import time_per_call
+from converser.converse import Converse
+from converser.testing import StubBedrockClient
+from typing import Any, Callable, Dict
+
+
+def bench_request_building(calls: int = 20_000) -> Dict[str, float]:
+    """Measure the mean client-side time per call of building and sending a request.
+
+    `rebuild` builds the request from scratch, with a `model_dump` of the inference config,
+    as every call used to; `template` builds it from the precompiled request template; and
+    `send_messages` times a whole call against a stub client, which does no serialization or
+    I/O, so it shows the overhead left per call at high QPS.
+
+    Args:
+        calls (int, optional): The number of calls to time per step. Defaults to 20,000.
+
+    Returns:
+        Dict[str, float]: The mean microseconds per call, keyed by step.
+    """
+    converse = Converse(
+        model_id='bench',
+        system_prompt={'text': 'You are terse.'},
+        client=StubBedrockClient(),
+        guardrail_config={'guardrailIdentifier': 'bench', 'guardrailVersion': '1'},
+    )
+    messages = [{'role': 'user', 'content': [{'text': 'question'}]}]
+    steps: Dict[str, Callable[[], Any]] = {
+        'rebuild': lambda: {
+            'modelId': converse.model_id,
+            'messages': messages,
+            'system': converse.system_prompt,
+            'inferenceConfig': converse.inference_config.model_dump(),
+            'guardrailConfig': converse.guardrail_config,
+        },
+        'template': lambda: converse._build_request(messages),  # type: ignore[arg-type]
+        'send_messages': lambda: converse.send_messages(messages),  # type: ignore[arg-type]
+    }
+    results: Dict[str, float] = {}
+    for step, call in steps.items():
+        call()
+        results[step] = time_per_call(call, calls)
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(bench_request_building(), indent=2))
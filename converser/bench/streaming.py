@@ -0,0 +1,54 @@
+"""Benchmark the client-side cost of processing stream events.
+
+Run it with `python -m converser.bench.streaming`.
+"""
+
+import json
+from collections import deque
+from converser.bench.timing import time_per_call
+from converser.converse import Converse
+from converser.testing import StubBedrockClient
+from typing import Dict
+
+
+def bench_stream_throughput(deltas: int = 1_000, streams: int = 20) -> Dict[str, float]:
+    """Measure the mean time converser spends per event of a stream, and the events per second.
+
+    The stub client yields ready-made events without decoding or I/O, so the timings cover
+    converser's own work on each event: `text` streams text deltas, and `tool_use` streams
+    the JSON input of a tool call, parsed as it arrives.
+
+    Args:
+        deltas (int, optional): The number of deltas per stream. Defaults to 1,000.
+        streams (int, optional): The number of streams to time per kind. Defaults to 20.
+
+    Returns:
+        Dict[str, float]: The mean microseconds per event and the events per second, keyed by kind.
+    """  # noqa: E501
+    words = ' '.join(['word'] * deltas)
+    replies = {
+        'text': [{'text': words}],
+        'tool_use': [
+            {'toolUse': {'toolUseId': '1', 'name': 'record', 'input': {'words': words.split()}}}
+        ],
+    }
+    message = {'role': 'user', 'content': [{'text': 'question'}]}
+    results: Dict[str, float] = {}
+    for kind, reply in replies.items():
+        converse = Converse(
+            model_id='bench', client=StubBedrockClient(replies=[reply] * (streams + 1))
+        )
+        # every stream has the same events, so count them on the warm-up one
+        events = len(list(converse.stream_messages([message])))  # type: ignore[list-item]
+
+        def stream() -> None:
+            deque(converse.stream_messages([message]), maxlen=0)  # type: ignore[list-item]
+
+        us_per_stream = time_per_call(stream, streams)
+        results[f'{kind}_us_per_event'] = us_per_stream / events
+        results[f'{kind}_events_per_second'] = events / us_per_stream * 1_000_000
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(bench_stream_throughput(), indent=2))
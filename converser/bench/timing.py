@@ -0,0 +1,13 @@
+"""The timing loop shared by the benchmarks."""
+
+import timeit
+from typing import Any, Callable
+
+
+def time_per_call(call: Callable[[], Any], number: int) -> float:
+    """Call `call` `number` times and return the mean microseconds per call.
+
+    This is `timeit.Timer`, which keeps the garbage collector off while timing so a collection
+    does not land in a single measurement.
+    """
+    return timeit.Timer(call).timeit(number) / number * 1_000_000
@@ -0,0 +1,58 @@
+"""Benchmark the per-request cost of describing and dispatching tools.
+
+Run it with `python -m converser.bench.tools`.
+"""
+
+import json
+from converser.bench.timing import time_per_call
+from converser.tool_use import ToolRegistry
+from converser.tool_use.tool_use import generate_json_schema
+from typing import Any, Callable, Dict
+
+
+def _make_tool(index: int) -> Callable[..., Any]:
+    def tool(city: str, days: int = 1) -> dict:
+        """Get the forecast for a city.
+
+        Args:
+            city (str): The name of the city.
+            days (int): The number of days to forecast.
+        """
+        return {'city': city, 'days': days}
+
+    tool.__name__ = f'forecast_{index}'
+    return tool
+
+
+def bench_tool_overhead(tools: int = 50, requests: int = 200) -> Dict[str, float]:
+    """Measure the mean client-side time per request spent on tools.
+
+    `rebuild` regenerates every schema for each request, as the `toolConfig` used to be built;
+    `tool_config` uses the registry's precompiled configuration; `execute` validates and runs
+    one call, with the tool itself doing no work.
+
+    Args:
+        tools (int, optional): The number of registered tools. Defaults to 50.
+        requests (int, optional): The number of requests to time. Defaults to 200.
+
+    Returns:
+        Dict[str, float]: The mean microseconds per request, keyed by step.
+    """
+    funcs = [_make_tool(index) for index in range(tools)]
+    registry = ToolRegistry(funcs, max_workers=1)
+    tool_use = {'toolUseId': '1', 'name': funcs[0].__name__, 'input': {'city': 'Paris'}}
+    steps: Dict[str, Callable[[], Any]] = {
+        'rebuild': lambda: {'tools': [generate_json_schema(func) for func in funcs]},
+        'tool_config': registry.tool_config,
+        'execute': lambda: registry.execute([tool_use]),  # type: ignore[list-item]
+    }
+    results: Dict[str, float] = {}
+    for step, call in steps.items():
+        call()
+        results[step] = time_per_call(call, requests)
+    registry.close()
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(bench_tool_overhead(), indent=2))
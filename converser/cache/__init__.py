@@ -0,0 +1,7 @@
+"""Caching and coalescing of Bedrock responses."""
+
+from .response_cache import ResponseCache
+from .single_flight import SingleFlight
+
+
+__all__ = ['ResponseCache', 'SingleFlight']
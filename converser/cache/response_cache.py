@@ -0,0 +1,136 @@
+"""Response cache for Converse requests."""
+
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from converser.streaming.events import StreamAccumulator
+from mypy_boto3_bedrock_runtime.type_defs import (
+    ConverseResponseTypeDef,
+    ConverseStreamOutputTypeDef,
+)
+from pathlib import Path
+from typing import Any, Generator, Iterable, Mapping, Optional, Union
+
+
+class ResponseCache:
+    """A two-tier cache of Converse responses, keyed by request fingerprint.
+
+    The first tier is a bounded in-memory LRU. With a directory, responses are also written to
+    disk as JSON, so they survive restarts and can be shared between processes. Entries older
+    than `ttl` seconds are treated as missing in both tiers.
+
+    Requests sampled with a temperature above zero are not deterministic, so they bypass the
+    cache unless `cache_nondeterministic` is set.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        directory: Optional[Union[str, Path]] = None,
+        ttl: Optional[float] = None,
+        cache_nondeterministic: bool = False,
+    ) -> None:
+        """Initialize the ResponseCache class.
+
+        Args:
+            max_entries (int, optional): The number of responses kept in memory. Defaults to 1024.
+            directory (Optional[Union[str, Path]], optional): The directory for the on-disk tier. Defaults to None.
+            ttl (Optional[float], optional): How long an entry stays valid, in seconds. Defaults to None, which never expires.
+            cache_nondeterministic (bool, optional): Whether to also cache requests with a temperature above zero. Defaults to False.
+        """  # noqa: E501
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.cache_nondeterministic = cache_nondeterministic
+        self.hits = 0
+        self.misses = 0
+        self._lru: OrderedDict[str, tuple[float, ConverseResponseTypeDef]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def accepts(self, request: Mapping[str, Any]) -> bool:
+        """Whether a request may be served from, and stored in, the cache."""
+        if self.cache_nondeterministic:
+            return True
+        # Bedrock samples with a temperature of 1 when none is given
+        return request.get('inferenceConfig', {}).get('temperature', 1) == 0
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f'{key}.json'  # type: ignore[operator]
+
+    def get(self, key: str) -> Optional[ConverseResponseTypeDef]:
+        """Get a copy of a cached response, or None on a miss."""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._lru[key]
+                entry = None
+            if entry is not None:
+                self._lru.move_to_end(key)
+        if entry is None:
+            entry = self._read(key)
+            if entry is not None:
+                self._remember(key, entry)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # callers, and memory, may hold on to parts of the response
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: str, response: ConverseResponseTypeDef) -> None:
+        """Store a response."""
+        # the HTTP metadata belongs to the original call, not to the answer
+        stored: Any = {k: v for k, v in response.items() if k != 'ResponseMetadata'}
+        entry = (time.time(), copy.deepcopy(stored))
+        self._remember(key, entry)
+        if self.directory is not None:
+            path = self._path(key)
+            path.parent.mkdir(exist_ok=True)
+            temporary = path.with_name(f'{key}.{os.getpid()}.{threading.get_ident()}.tmp')
+            temporary.write_text(json.dumps({'created': entry[0], 'response': stored}))
+            os.replace(temporary, path)
+
+    def _remember(self, key: str, entry: tuple[float, ConverseResponseTypeDef]) -> None:
+        with self._lock:
+            self._lru[key] = entry
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[tuple[float, ConverseResponseTypeDef]]:
+        if self.directory is None:
+            return None
+        try:
+            data = json.loads(self._path(key).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if self._expired(data['created']):
+            return None
+        return data['created'], data['response']
+
+    def record_stream(
+        self, key: str, events: Iterable[ConverseStreamOutputTypeDef]
+    ) -> Generator[ConverseStreamOutputTypeDef, None, None]:
+        """Pass a live stream through, storing the equivalent response once it completes."""
+        accumulator = StreamAccumulator()
+        for event in events:
+            accumulator.feed(event)
+            yield event
+        if accumulator.stop_reason is not None:
+            self.put(key, accumulator.response())
+
+    def clear(self) -> None:
+        """Empty the in-memory tier."""
+        with self._lock:
+            self._lru.clear()
@@ -0,0 +1,201 @@
+"""Coalescing of identical in-flight requests."""
+
+import copy
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+_PULL = object()
+
+
+class _SharedStream:
+    """One upstream event stream, fanned out to any number of subscribers.
+
+    Every event is buffered, so late subscribers replay the stream from the start. There is no
+    dedicated reader: whichever subscriber first needs an event that has not arrived yet pulls
+    it from upstream while the others wait, so the stream keeps flowing as long as any
+    subscriber is reading. Subscribers are counted, and when the last one detaches before the
+    end, upstream is closed and the stream is forgotten, buffer included.
+    """
+
+    def __init__(
+        self,
+        open_stream: Callable[[], Iterable[Any]],
+        on_done: Callable[[], None],
+        lock: threading.RLock,
+    ) -> None:
+        self._open_stream = open_stream
+        self._on_done = on_done
+        # the lock of the SingleFlight, so that subscribing and abandoning never interleave
+        self._lock = lock
+        self._upstream: Optional[Iterator[Any]] = None
+        self._events: list[Any] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._pulling = False
+        self._subscribers = 0
+        self._condition = threading.Condition()
+
+    def _pull(self) -> None:
+        """Read the next upstream event into the buffer; only one subscriber pulls at a time."""
+        try:
+            if self._upstream is None:
+                self._upstream = iter(self._open_stream())
+            event = next(self._upstream)
+        except StopIteration:
+            self._finish(None)
+        except BaseException as exc:  # re-raised in every subscriber
+            self._finish(exc)
+        else:
+            with self._condition:
+                self._events.append(event)
+                self._pulling = False
+                self._condition.notify_all()
+
+    def _finish(self, error: Optional[BaseException]) -> None:
+        with self._condition:
+            self._done = True
+            self._error = error
+            self._pulling = False
+            self._condition.notify_all()
+        self._on_done()
+
+    def subscribe(self) -> Iterator[Any]:
+        """Iterate over copies of the events of the stream from the start.
+
+        The subscriber is counted from this call, which is made under the lock of the
+        SingleFlight. It detaches when the iterator is exhausted, closed or collected.
+        """
+        self._subscribers += 1
+        detached = threading.Event()
+
+        def detach() -> None:
+            if not detached.is_set():
+                detached.set()
+                self._detach()
+
+        subscription = self._iterate(detach)
+        # a subscription that is never started does not run its finally block
+        weakref.finalize(subscription, detach)
+        return subscription
+
+    def _iterate(self, detach: Callable[[], None]) -> Generator[Any, None, None]:
+        index = 0
+        try:
+            while True:
+                with self._condition:
+                    while index >= len(self._events) and not self._done and self._pulling:
+                        self._condition.wait()
+                    if index < len(self._events):
+                        event = self._events[index]
+                        index += 1
+                    elif self._done:
+                        if self._error is not None:
+                            raise self._error
+                        return
+                    else:
+                        self._pulling = True
+                        event = _PULL
+                if event is _PULL:
+                    self._pull()
+                else:
+                    # every subscriber gets its own copy, as with SingleFlight.do
+                    yield copy.deepcopy(event)
+        finally:
+            detach()
+
+    def _detach(self) -> None:
+        """Count a subscriber out, and abandon the stream if it was the last one."""
+        with self._lock:
+            self._subscribers -= 1
+            if self._subscribers:
+                return
+            with self._condition:
+                if self._done:
+                    return
+                self._done = True
+                upstream, self._upstream = self._upstream, None
+                self._events = []
+            self._on_done()
+        close = getattr(upstream, 'close', None)
+        if close is not None:
+            close()
+
+
+class SingleFlight:
+    """Attach callers of an identical request to the call already in flight.
+
+    Requests are identified by their fingerprint. The first caller runs the request, and
+    callers arriving before it completes wait for its result instead of sending their own.
+    Streams are fanned out: every caller receives its own copy of the whole sequence of events,
+    and a stream that all its callers abandon is closed. Share one
+    SingleFlight between Converse objects to coalesce across them. Asyncio callers are covered
+    through AsyncConverse, which runs requests on worker threads.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the SingleFlight class."""
+        self.coalesced = 0
+        self._calls: Dict[str, Future] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        # reentrant, since an abandoned subscription may be collected while it is held
+        self._lock = threading.RLock()
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        """Run `func`, or wait for the identical call already running.
+
+        Args:
+            key (str): The fingerprint of the request.
+            func (Callable[[], T]): Runs the request.
+
+        Returns:
+            T: The result of the call. Waiting callers get their own copy of it.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            result = func()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stream(self, key: str, open_stream: Callable[[], Iterable[T]]) -> Iterator[T]:
+        """Open a stream, or subscribe to the identical stream already running.
+
+        Args:
+            key (str): The fingerprint of the request.
+            open_stream (Callable[[], Iterable[T]]): Opens the stream, called at most once.
+
+        Returns:
+            Iterator[T]: Copies of the events of the stream, from the first one.
+        """
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = self._streams[key] = _SharedStream(
+                    open_stream, lambda: self._forget_stream(key), self._lock
+                )
+            else:
+                self.coalesced += 1
+            return shared.subscribe()
+
+    def _forget_stream(self, key: str) -> None:
+        with self._lock:
+            self._streams.pop(key, None)
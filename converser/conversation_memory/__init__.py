@@ -1,6 +1,20 @@
 """Conversation memory module."""
 
-from .memory import Memory
+from .attachment_policy import AttachmentElisionPolicy, model_summarizer
+from .blob_store import BlobStore, MissingBlobError
+from .memory import Memory, MessageView, install_message_view_hook
+from .sqlite_memory import SqliteMemory
+from .windowed_memory import WindowedMemory
 
 
-__all__ = ['Memory']
+__all__ = [
+    'AttachmentElisionPolicy',
+    'BlobStore',
+    'Memory',
+    'MessageView',
+    'MissingBlobError',
+    'SqliteMemory',
+    'WindowedMemory',
+    'install_message_view_hook',
+    'model_summarizer',
+]
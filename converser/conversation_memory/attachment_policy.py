@@ -0,0 +1,165 @@
+"""Policy that elides stale image and document attachments from the message history."""
+
+import hashlib
+from collections import OrderedDict
+from converser.conversation_memory.blob_store import BLOB_REF_KEY, BLOB_SIZE_KEY, BlobStore
+from mypy_boto3_bedrock_runtime.type_defs import MessageUnionTypeDef
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence
+
+
+if TYPE_CHECKING:
+    from converser.converse import Converse
+
+
+# Summarizes one image or document content block, as stored in memory.
+Summarizer = Callable[[Dict[str, Any]], str]
+
+_ATTACHMENT_TYPES = ('image', 'document')
+
+
+class AttachmentElisionPolicy:
+    """Replace image and document blocks from old turns with a short text block.
+
+    An attachment is elided once it is more than `max_turns` turns old, or, oldest first,
+    while the attachments kept add up to more than `max_bytes`. The replacement is a
+    placeholder, or a summary from `summarizer` when one is given. Summaries are cached by
+    content hash, so a file attached in several sessions is summarized once.
+
+    `Converse` applies the policy to every request it builds from memory. The memory itself
+    keeps the original messages, so its contents, its token counts and what `SqliteMemory`
+    stores never disagree, and the same history is elided the same way after a reload. Use a
+    `BlobStore` as well to keep the attachment bytes themselves out of memory.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = 2,
+        max_bytes: Optional[int] = None,
+        summarizer: Optional[Summarizer] = None,
+        blob_store: Optional[BlobStore] = None,
+        max_cached_summaries: int = 1024,
+    ) -> None:
+        """Initialize the AttachmentElisionPolicy class.
+
+        Args:
+            max_turns (Optional[int], optional): The number of later turns an attachment is kept for. Defaults to 2.
+            max_bytes (Optional[int], optional): The budget for attachment bytes kept in the history. Defaults to None.
+            summarizer (Optional[Summarizer], optional): Produces the text that replaces an attachment. Defaults to None, which uses a placeholder.
+            blob_store (Optional[BlobStore], optional): The store that blob references point to, used to size references that do not record their size. Defaults to None.
+            max_cached_summaries (int, optional): The number of summaries to keep. Defaults to 1024.
+        """  # noqa: E501
+        if max_turns is None and max_bytes is None:
+            raise ValueError('At least one of max_turns and max_bytes must be set')
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.summarizer = summarizer
+        self.blob_store = blob_store
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        self._lock = Lock()
+
+    def elide(
+        self, messages: Sequence[MessageUnionTypeDef], history_length: Optional[int] = None
+    ) -> Sequence[MessageUnionTypeDef]:
+        """Replace the stale attachments of a request, copying only the messages that change.
+
+        Args:
+            messages (Sequence[MessageUnionTypeDef]): The messages of the request.
+            history_length (Optional[int], optional): The number of messages that come from memory; the attachments age with them, and the messages after them are new and kept as they are. Defaults to None, which treats every message as history.
+
+        Returns:
+            Sequence[MessageUnionTypeDef]: The messages, or a new list if any attachment was elided.
+        """  # noqa: E501
+        end = len(messages) if history_length is None else history_length
+        elided: Optional[List[MessageUnionTypeDef]] = None
+        kept_bytes = 0
+        # newest first, so the byte budget keeps the most recent attachments
+        for index in range(end - 1, -1, -1):
+            message = messages[index]
+            content = message['content']
+            replaced: Optional[List[Any]] = None
+            for position in range(len(content) - 1, -1, -1):
+                block = content[position]
+                block_type = _attachment_type(block)  # type: ignore[arg-type]
+                if block_type is None:
+                    continue
+                stale = self.max_turns is not None and end - 1 - index > 2 * self.max_turns
+                if not stale and self.max_bytes is not None:
+                    kept_bytes += self._size(block[block_type]['source'])  # type: ignore[literal-required]
+                    stale = kept_bytes > self.max_bytes
+                if stale:
+                    if replaced is None:
+                        replaced = list(content)
+                    replaced[position] = self._replacement(block)  # type: ignore[arg-type]
+            if replaced is not None:
+                if elided is None:
+                    elided = list(messages)
+                elided[index] = {**message, 'content': replaced}  # type: ignore[typeddict-item]
+        return messages if elided is None else elided
+
+    def _size(self, source: Dict[str, Any]) -> int:
+        if 'bytes' in source:
+            return len(source['bytes'])
+        if BLOB_SIZE_KEY in source:
+            return source[BLOB_SIZE_KEY]
+        if BLOB_REF_KEY in source and self.blob_store is not None:
+            return self.blob_store.size(source[BLOB_REF_KEY])
+        return 0
+
+    def _replacement(self, block: Dict[str, Any]) -> Dict[str, str]:
+        block_type = _attachment_type(block)
+        attachment = block[block_type]
+        if self.summarizer is None:
+            name = f' "{attachment["name"]}"' if 'name' in attachment else ''
+            return {'text': f'[{block_type}{name} from an earlier turn was removed]'}
+        key = _content_key(attachment['source'])
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+        if summary is None:
+            summary = self.summarizer(block)
+            with self._lock:
+                self._summaries[key] = summary
+                if len(self._summaries) > self.max_cached_summaries:
+                    self._summaries.popitem(last=False)
+        return {'text': f'[Summary of a {block_type} from an earlier turn: {summary}]'}
+
+
+def _attachment_type(block: Dict[str, Any]) -> Optional[str]:
+    return next((block_type for block_type in _ATTACHMENT_TYPES if block_type in block), None)
+
+
+def _content_key(source: Dict[str, Any]) -> str:
+    if BLOB_REF_KEY in source:
+        return source[BLOB_REF_KEY]
+    return hashlib.sha256(source.get('bytes', b'')).hexdigest()
+
+
+def model_summarizer(
+    converse: 'Converse',
+    prompt: str = 'Summarize this attachment in a few sentences, keeping every key fact.',
+) -> Summarizer:
+    """Build a summarizer that asks a model to summarize each attachment.
+
+    The requests are sent directly through the client, so they never touch the memory of
+    `converse`. Blob references are resolved through its blob store.
+
+    Args:
+        converse (Converse): The Converse object whose client and model are used.
+        prompt (str, optional): The instruction sent along with the attachment.
+
+    Returns:
+        Summarizer: The summarizer, to pass to AttachmentElisionPolicy.
+    """
+
+    def summarize(block: Dict[str, Any]) -> str:
+        messages = converse._resolve([{'role': 'user', 'content': [{'text': prompt}, block]}])  # type: ignore[list-item]
+        response = converse.client.converse(modelId=converse.model_id, messages=messages)
+        return ''.join(
+            content.get('text', '')
+            for content in response['output']['message']['content']  # type: ignore[typeddict-item]
+        )
+
+    return summarize
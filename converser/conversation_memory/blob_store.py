@@ -0,0 +1,195 @@
+"""Content-addressed storage for image and document bytes."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from mypy_boto3_bedrock_runtime.type_defs import MessageUnionTypeDef
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+
+# The key that replaces 'bytes' in the source of an image or document block.
+BLOB_REF_KEY = 'blobRef'
+# The key that records the size of the bytes next to the reference, for token estimates.
+BLOB_SIZE_KEY = 'blobSize'
+
+_SOURCE_BLOCK_TYPES = ('image', 'document')
+
+
+class MissingBlobError(KeyError):
+    """Raised when a referenced blob is not in the store."""
+
+
+class BlobStore:
+    """A content-addressed store for the raw bytes of image and document blocks.
+
+    Blobs are keyed by their SHA-256 digest, so a file attached many times is stored once.
+    Messages hold a `{'blobRef': digest, 'blobSize': size}` source instead of the bytes, and
+    the bytes are only put back when a request is built. Recently used blobs are kept in an
+    in-memory LRU of at most `max_memory_bytes`, which always holds the latest blob.
+
+    Every blob is also written to disk, and blobs evicted from the LRU are read back from
+    there, so memory stays bounded without losing any blob. Without a directory, the store
+    creates a temporary one, which is removed along with the store; pass a directory to keep
+    the blobs, for example next to a persistent memory.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        min_size: int = 1024,
+    ) -> None:
+        """Initialize the BlobStore class.
+
+        Args:
+            directory (Optional[Union[str, Path]], optional): The directory for the on-disk tier. Defaults to None, which uses a temporary directory removed with the store.
+            max_memory_bytes (int, optional): The size of the in-memory LRU. Defaults to 64 MiB.
+            min_size (int, optional): Sources smaller than this are left inline in the message. Defaults to 1024.
+        """  # noqa: E501
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='converser-blobs-')
+            weakref.finalize(self, shutil.rmtree, directory, ignore_errors=True)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_memory_bytes = max_memory_bytes
+        self.min_size = min_size
+        self._lru: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+
+    def _remember(self, digest: str, data: bytes) -> None:
+        """Insert a blob at the head of the LRU, evicting the oldest ones if over budget."""
+        with self._lock:
+            if digest in self._lru:
+                self._lru.move_to_end(digest)
+                return
+            self._lru[digest] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes and len(self._lru) > 1:
+                _, evicted = self._lru.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def put(self, data: bytes) -> str:
+        """Store a blob and return its digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            # write to a temporary file first so readers never see a partial blob
+            temporary = path.with_name(f'{digest}.{os.getpid()}.{threading.get_ident()}.tmp')
+            temporary.write_bytes(data)
+            os.replace(temporary, path)
+        self._remember(digest, bytes(data))
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """Get a blob by digest.
+
+        Raises:
+            MissingBlobError: If the blob is not in the store.
+        """
+        with self._lock:
+            data = self._lru.get(digest)
+            if data is not None:
+                self._lru.move_to_end(digest)
+                return data
+        if not self._path(digest).exists():
+            raise MissingBlobError(f'Blob {digest} is not in the store at {self.directory}.')
+        data = self._path(digest).read_bytes()
+        self._remember(digest, data)
+        return data
+
+    def size(self, digest: str) -> int:
+        """Get the size of a blob in bytes without loading it from disk.
+
+        Raises:
+            MissingBlobError: If the blob is not in the store.
+        """
+        with self._lock:
+            data = self._lru.get(digest)
+            if data is not None:
+                return len(data)
+        if not self._path(digest).exists():
+            raise MissingBlobError(f'Blob {digest} is not in the store at {self.directory}.')
+        return self._path(digest).stat().st_size
+
+    def __contains__(self, digest: object) -> bool:
+        """Check whether a blob is in the store."""
+        if not isinstance(digest, str):
+            return False
+        with self._lock:
+            if digest in self._lru:
+                return True
+        return self._path(digest).exists()
+
+    def externalize_source(self, source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The reference replacing the bytes of a source, or None if they stay inline.
+
+        Sources smaller than `min_size` stay inline.
+        """
+        data = source.get('bytes')
+        if isinstance(data, (bytes, bytearray)) and len(data) >= self.min_size:
+            return {BLOB_REF_KEY: self.put(data), BLOB_SIZE_KEY: len(data)}
+        return None
+
+    def _resolve_source(self, source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if BLOB_REF_KEY in source:
+            return {'bytes': self.get(source[BLOB_REF_KEY])}
+        return None
+
+    def externalize_messages(
+        self, messages: Sequence[MessageUnionTypeDef]
+    ) -> List[MessageUnionTypeDef]:
+        """Replace the bytes of image and document sources with references into the store.
+
+        Only the messages and blocks that change are copied, and the input is never modified.
+        """
+        return _map_sources(messages, self.externalize_source)
+
+    def resolve_messages(
+        self, messages: Sequence[MessageUnionTypeDef]
+    ) -> List[MessageUnionTypeDef]:
+        """Replace references into the store with the bytes, for sending a request.
+
+        The input list itself is returned when it holds no references, so resolving a history
+        without attachments costs no copy.
+
+        Raises:
+            MissingBlobError: If a referenced blob is not in the store.
+        """
+        return _map_sources(messages, self._resolve_source)
+
+
+def _map_sources(
+    messages: Sequence[MessageUnionTypeDef],
+    transform: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+) -> List[MessageUnionTypeDef]:
+    """Apply `transform` to the source of every image and document block, copying on write.
+
+    `transform` returns the new source, or None to leave the block unchanged.
+    """
+    result: Optional[List[MessageUnionTypeDef]] = None
+    for i, message in enumerate(messages):
+        content: Optional[List[Any]] = None
+        for j, block in enumerate(message['content']):
+            for block_type in _SOURCE_BLOCK_TYPES:
+                if block_type not in block:
+                    continue
+                source = transform(block[block_type]['source'])  # type: ignore[literal-required]
+                if source is not None:
+                    if content is None:
+                        content = list(message['content'])
+                    content[j] = {block_type: {**block[block_type], 'source': source}}  # type: ignore[literal-required]
+        if content is not None:
+            if result is None:
+                result = list(messages)
+            result[i] = {**message, 'content': content}  # type: ignore[typeddict-item]
+    return result if result is not None else messages  # type: ignore[return-value]
@@ -1,46 +1,172 @@
 """Memory class."""
 
+from contextlib import contextmanager
+from itertools import chain, islice
+from mypy_boto3_bedrock_runtime.literals import ConversationRoleType
 from mypy_boto3_bedrock_runtime.type_defs import MessageUnionTypeDef
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union, overload
+
+
+def next_role_after(
+    messages: Iterable[MessageUnionTypeDef], expected_role: ConversationRoleType = 'user'
+) -> Optional[ConversationRoleType]:
+    """Check that messages alternate between user and assistant, starting with `expected_role`.
+
+    Only the given messages are walked, so callers that keep the expected role as state can
+    validate an append without looking at the rest of the conversation.
+
+    Args:
+        messages (Iterable[MessageUnionTypeDef]): The messages to check.
+        expected_role (ConversationRoleType, optional): The role of the first message. Defaults to 'user'.
+
+    Returns:
+        Optional[ConversationRoleType]: The role expected after the messages, or None if the order is invalid.
+    """  # noqa: E501
+    for message in messages:
+        if message.get('role') != expected_role:
+            return None
+        expected_role = 'assistant' if expected_role == 'user' else 'user'
+    return expected_role
+
+
+class MessageView(Sequence[MessageUnionTypeDef]):
+    """A read-only sequence of the first `length` messages of a history, then `messages`.
+
+    Nothing is copied: items are read from the history list itself. This is safe as long as
+    the history is only ever appended to, and lists that are trimmed are replaced instead,
+    which is how every Memory keeps them.
+    """
+
+    __slots__ = ('_history', '_length', '_messages')
+
+    def __init__(
+        self,
+        history: Sequence[MessageUnionTypeDef],
+        length: int,
+        messages: Sequence[MessageUnionTypeDef],
+    ) -> None:
+        """Initialize the MessageView class.
+
+        Args:
+            history (Sequence[MessageUnionTypeDef]): The history list.
+            length (int): The number of messages of the history in the view.
+            messages (Sequence[MessageUnionTypeDef]): The messages following them.
+        """
+        self._history = history
+        self._length = length
+        self._messages = messages
+
+    def __len__(self) -> int:
+        """The number of messages in the view."""
+        return self._length + len(self._messages)
+
+    @overload
+    def __getitem__(self, index: int) -> MessageUnionTypeDef: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[MessageUnionTypeDef]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[MessageUnionTypeDef, List[MessageUnionTypeDef]]:
+        """A message of the view, or a list of the messages of a slice."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('MessageView index out of range')
+        if index < self._length:
+            return self._history[index]
+        return self._messages[index - self._length]
+
+    def __iter__(self) -> Iterator[MessageUnionTypeDef]:
+        """Iterate over the messages of the view."""
+        return chain(islice(self._history, self._length), self._messages)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare equal to any list or sequence holding the same messages."""
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        """Show the messages, like a list."""
+        return f'MessageView({list(self)!r})'
+
+
+def install_message_view_hook(client: Any) -> None:
+    """Make a boto3 client accept a MessageView as the messages of a call.
+
+    botocore only validates lists, so the view is turned into one just before the call is
+    serialized, which walks every message anyway. Objects that are not boto3 clients are left
+    as they are.
+    """
+    events = getattr(getattr(client, 'meta', None), 'events', None)
+    if events is not None:
+        events.register(
+            'provide-client-params.bedrock-runtime.*',
+            _list_messages,
+            unique_id='converser-message-view',
+        )
+
+
+def _list_messages(params: Dict[str, Any], **kwargs: Any) -> Optional[Dict[str, Any]]:
+    messages = params.get('messages')
+    if isinstance(messages, MessageView):
+        return {**params, 'messages': list(messages)}
+    return None
 
 
 class Memory:
-    """A class to store the message history."""
+    """A class to store the message history.
+
+    The history list is only ever appended to; subclasses that drop messages replace it with a
+    new list, so that the views handed out by `request_view` stay valid.
+    """
 
     def __init__(self) -> None:
         """Initialize the Memory class."""
         self.history: List[MessageUnionTypeDef] = []
+        self._next_role: ConversationRoleType = 'user'
 
     def add_messages(self, messages: List[MessageUnionTypeDef]) -> None:
         """Add a message to the history."""
-        if not self._is_valid_message_history_order(messages):
+        next_role = next_role_after(messages, self._next_role)
+        if next_role is None:
             raise ValueError(
                 'Invalid message order. Messages must start with a user message and alternate'
                 ' between user and assistant.'
             )
         self.history.extend(messages)
+        self._next_role = next_role
 
     def get_history(self) -> List[MessageUnionTypeDef]:
         """Get the message history."""
         return self.history
 
+    @contextmanager
+    def request_view(
+        self, messages: List[MessageUnionTypeDef]
+    ) -> Iterator[Sequence[MessageUnionTypeDef]]:
+        """Yield a read-only view of the history followed by `messages`.
+
+        The view reads the history as it is on entry, without copying it, so building a request
+        costs the same however long the conversation is. The history itself is never touched,
+        which keeps a pending turn out of `get_history()` and out of the requests of concurrent
+        callers until it is recorded, and the view stays valid after the block.
+        """
+        history = self.get_history()
+        yield MessageView(history, len(history), messages)
+
     def _is_valid_message_history_order(self, new_messages: List[MessageUnionTypeDef]) -> bool:
         """Check if the new messages have a valid order.
 
         Messages must start with a user message and alternate
-        between user and assistant.
+        between user and assistant. Only the new messages are checked, against
+        the role expected after the current history.
         """
-        message_history = self.get_history() + new_messages
-        if message_history[0].get('role') != 'user':
-            return False
-
-        for i, message in enumerate(message_history[1:], start=1):
-            if i % 2 == 0 and message.get('role') != 'user':
-                return False
-            if i % 2 == 1 and message.get('role') != 'assistant':
-                return False
-
-        return True
+        return next_role_after(new_messages, self._next_role) is not None
 
     def get_last_message(self) -> MessageUnionTypeDef:
         """Get the last message in the history."""
@@ -49,3 +175,4 @@ class Memory:
     def clear_history(self) -> None:
         """Clear the message history."""
         self.history = []
+        self._next_role = 'user'
@@ -0,0 +1,238 @@
+"""Memory class persisted in a SQLite database."""
+
+import base64
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from converser.conversation_memory.memory import Memory, next_role_after
+from mypy_boto3_bedrock_runtime.literals import ConversationRoleType
+from mypy_boto3_bedrock_runtime.type_defs import MessageUnionTypeDef
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Union
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID
+"""
+
+
+def _encode_default(value: Any) -> Dict[str, str]:
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _decode_hook(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and '__bytes__' in value:
+        return base64.b64decode(value['__bytes__'])
+    return value
+
+
+def encode_content(content: Any) -> str:
+    """Serialize message content to JSON, encoding raw bytes as base64."""
+    return json.dumps(content, default=_encode_default, separators=(',', ':'))
+
+
+def decode_content(data: str) -> Any:
+    """Deserialize message content written by `encode_content`."""
+    return json.loads(data, object_hook=_decode_hook)
+
+
+def _role_after(last_row: Optional[tuple[int, str]]) -> ConversationRoleType:
+    return 'assistant' if last_row is not None and last_row[1] == 'user' else 'user'
+
+
+class SqliteMemory(Memory):
+    """A memory that persists the message history of a session in a SQLite database.
+
+    Every turn is an append-only insert, so any number of processes on the same host can share
+    the database file. The database runs in WAL mode, which lets readers proceed while a turn is
+    being written. The history is loaded lazily, on first use, and afterwards only the messages
+    added since the last load are read. With `window` set, only the most recent messages are
+    ever loaded into memory.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        path: Union[str, Path] = 'converser_memory.db',
+        window: Optional[int] = None,
+        timeout: float = 5.0,
+    ) -> None:
+        """Initialize the SqliteMemory class.
+
+        Args:
+            session_id (str): The session whose history is stored.
+            path (Union[str, Path], optional): The SQLite database file. Defaults to 'converser_memory.db'.
+            window (Optional[int], optional): The maximum number of most recent messages to load. Defaults to None, which loads the whole history.
+            timeout (float, optional): Seconds to wait for a lock held by another connection. Defaults to 5.0.
+        """  # noqa: E501
+        if window is not None and window < 1:
+            raise ValueError('window must be at least 1')
+        self.session_id = session_id
+        self.path = Path(path)
+        self.window = window
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(
+            self.path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(_SCHEMA)
+        self._cache: Optional[List[MessageUnionTypeDef]] = None
+        self._loaded_seq = -1
+
+    @property
+    def history(self) -> List[MessageUnionTypeDef]:  # type: ignore[override]
+        """The loaded message history."""
+        return self.get_history()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+
+    def _last_row(self) -> Optional[tuple[int, str]]:
+        return self._connection.execute(
+            'SELECT seq, role FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT 1',
+            (self.session_id,),
+        ).fetchone()
+
+    def add_messages(self, messages: List[MessageUnionTypeDef]) -> None:
+        """Append messages to the session, validating them against the stored history."""
+        with self._transaction() as connection:
+            last_row = self._last_row()
+            last_seq = last_row[0] if last_row else -1
+            if next_role_after(messages, _role_after(last_row)) is None:
+                raise ValueError(
+                    'Invalid message order. Messages must start with a user message and'
+                    ' alternate between user and assistant.'
+                )
+            connection.executemany(
+                'INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)',
+                [
+                    (self.session_id, seq, message['role'], encode_content(message['content']))
+                    for seq, message in enumerate(messages, start=last_seq + 1)
+                ],
+            )
+            # skip the read-back when nobody else wrote to the session since our last load
+            if self._cache is not None and last_seq == self._loaded_seq:
+                self._cache.extend(messages)
+                self._loaded_seq = last_seq + len(messages)
+                self._trim_to_window()
+
+    def get_history(self) -> List[MessageUnionTypeDef]:
+        """Get the message history, loading only the messages not seen yet."""
+        with self._lock:
+            if self._cache is None:
+                self._cache = []
+                rows = self._tail_rows() if self.window is not None else self._rows_after(-1)
+            else:
+                rows = self._rows_after(self._loaded_seq)
+            if rows:
+                self._cache.extend(
+                    {'role': role, 'content': decode_content(content)} for _, role, content in rows
+                )
+                self._loaded_seq = rows[-1][0]
+                self._trim_to_window()
+            return self._cache
+
+    def _tail_rows(self) -> List[tuple[int, str, str]]:
+        rows = self._connection.execute(
+            'SELECT seq, role, content FROM messages WHERE session_id = ?'
+            ' ORDER BY seq DESC LIMIT ?',
+            (self.session_id, self.window),
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def _rows_after(self, seq: int) -> List[tuple[int, str, str]]:
+        return self._connection.execute(
+            'SELECT seq, role, content FROM messages WHERE session_id = ? AND seq > ?'
+            ' ORDER BY seq',
+            (self.session_id, seq),
+        ).fetchall()
+
+    def _trim_to_window(self) -> None:
+        """Drop the oldest loaded messages beyond the window, starting the rest on a user turn."""
+        if self._cache is None:
+            return
+        start = 0 if self.window is None else max(0, len(self._cache) - self.window)
+        while start < len(self._cache) and self._cache[start]['role'] != 'user':
+            start += 1
+        if start:
+            # a new list, so request views of the old one hold
+            self._cache = self._cache[start:]
+
+    def _is_valid_message_history_order(self, new_messages: List[MessageUnionTypeDef]) -> bool:
+        """Check if the new messages have a valid order after the stored history."""
+        with self._lock:
+            last_row = self._last_row()
+        return next_role_after(new_messages, _role_after(last_row)) is not None
+
+    def get_last_message(self) -> MessageUnionTypeDef:
+        """Get the last message in the history."""
+        return self.get_history()[-1]
+
+    def clear_history(self) -> None:
+        """Delete the stored history of the session."""
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM messages WHERE session_id = ?', (self.session_id,))
+            self._cache = None
+            self._loaded_seq = -1
+
+    def sessions(self) -> List[str]:
+        """List the ids of all the sessions stored in the database."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT DISTINCT session_id FROM messages ORDER BY session_id'
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def export(self, file: IO[str], all_sessions: bool = False) -> int:
+        """Export stored messages as JSON lines, streaming them from the database.
+
+        Each line holds `session_id`, `seq`, `role` and `content`, with raw bytes base64-encoded
+        as in the database.
+
+        Args:
+            file (IO[str]): The text file to write to.
+            all_sessions (bool, optional): Whether to export every session instead of this one. Defaults to False.
+
+        Returns:
+            int: The number of exported messages.
+        """  # noqa: E501
+        query = 'SELECT session_id, seq, role, content FROM messages'
+        params: tuple[str, ...] = ()
+        if not all_sessions:
+            query += ' WHERE session_id = ?'
+            params = (self.session_id,)
+        count = 0
+        with self._lock:
+            for session_id, seq, role, content in self._connection.execute(
+                query + ' ORDER BY session_id, seq', params
+            ):
+                file.write(
+                    f'{{"session_id":{json.dumps(session_id)},"seq":{seq},'
+                    f'"role":{json.dumps(role)},"content":{content}}}\n'
+                )
+                count += 1
+        return count
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
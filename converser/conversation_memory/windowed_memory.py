@@ -0,0 +1,74 @@
+"""Memory class that keeps the history within a token budget."""
+
+from converser.conversation_memory.memory import Memory
+from converser.utils.tokens import estimate_message_tokens
+from mypy_boto3_bedrock_runtime.type_defs import MessageUnionTypeDef
+from typing import Callable, List
+
+
+class WindowedMemory(Memory):
+    """A sliding-window memory that keeps the history within an input-token budget.
+
+    Every message is estimated once when it is added, so eviction never re-counts old messages.
+    When the history goes over the budget, the oldest user/assistant pairs after the pinned
+    turns are evicted, which keeps the history alternating. The most recent turn is always kept,
+    even if it exceeds the budget on its own.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        pinned_turns: int = 0,
+        token_estimator: Callable[[MessageUnionTypeDef], int] = estimate_message_tokens,
+    ) -> None:
+        """Initialize the WindowedMemory class.
+
+        Args:
+            max_tokens (int): The input-token budget for the history.
+            pinned_turns (int, optional): The number of user/assistant pairs at the start of the conversation that are never evicted. Defaults to 0.
+            token_estimator (Callable[[MessageUnionTypeDef], int], optional): Estimates the tokens of one message. Defaults to estimate_message_tokens.
+        """  # noqa: E501
+        if max_tokens < 1:
+            raise ValueError('max_tokens must be at least 1')
+        if pinned_turns < 0:
+            raise ValueError('pinned_turns cannot be negative')
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.pinned_turns = pinned_turns
+        self.token_estimator = token_estimator
+        self._token_counts: List[int] = []
+        self._total_tokens = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """The estimated number of tokens in the history."""
+        return self._total_tokens
+
+    def add_messages(self, messages: List[MessageUnionTypeDef]) -> None:
+        """Add messages to the history and evict the oldest turns if over budget."""
+        super().add_messages(messages)
+        counts = [self.token_estimator(message) for message in messages]
+        self._token_counts.extend(counts)
+        self._total_tokens += sum(counts)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Evict the oldest unpinned user/assistant pairs until the history fits the budget."""
+        start = 2 * self.pinned_turns
+        end = start
+        freed = 0
+        # keep at least the most recent turn
+        while self._total_tokens - freed > self.max_tokens and len(self.history) - end > 2:
+            freed += self._token_counts[end] + self._token_counts[end + 1]
+            end += 2
+        if end > start:
+            # a new list, however many pairs are evicted, so request views of the old one hold
+            self.history = self.history[:start] + self.history[end:]
+            del self._token_counts[start:end]
+            self._total_tokens -= freed
+
+    def clear_history(self) -> None:
+        """Clear the message history."""
+        super().clear_history()
+        self._token_counts = []
+        self._total_tokens = 0
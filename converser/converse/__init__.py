@@ -1,6 +1,7 @@
 """The main module for the project."""
 
-from .converse import Converse
+from .async_converse import AsyncConverse
+from .converse import BatchResult, Converse
 
 
-__all__ = ['Converse']
+__all__ = ['Converse', 'AsyncConverse', 'BatchResult']
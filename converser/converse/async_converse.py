@@ -0,0 +1,256 @@
+"""This module contains the AsyncConverse class."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from converser.conversation_memory import BlobStore, Memory
+from converser.converse.converse import Converse
+from converser.models import InferenceConfig
+from converser.streaming import ConverserStreamOutputTypeDefEnd
+from converser.utils import get_bedrock_client
+from functools import partial
+from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
+from mypy_boto3_bedrock_runtime.type_defs import (
+    ConverseResponseTypeDef,
+    MessageUnionTypeDef,
+    SystemContentBlockTypeDef,
+)
+from threading import Event
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Generator,
+    List,
+    Literal,
+    Optional,
+    Union,
+    overload,
+)
+
+
+StreamEvent = tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef]
+
+_STREAM_END = object()
+
+
+def _pump(
+    stream: Generator[StreamEvent, Any, Any],
+    loop: asyncio.AbstractEventLoop,
+    queue: 'asyncio.Queue[tuple[Any, Optional[BaseException]]]',
+    stop: Event,
+) -> None:
+    """Iterate a blocking stream on a worker thread and forward its events to the event loop."""
+
+    def put(item: Any, exc: Optional[BaseException]) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, exc))
+        except RuntimeError:
+            # the event loop has been closed, nobody is listening anymore
+            stop.set()
+
+    try:
+        for item in stream:
+            put(item, None)
+            if stop.is_set():
+                stream.close()
+                return
+    except BaseException as exc:  # re-raised in the event loop
+        put(None, exc)
+    else:
+        put(_STREAM_END, None)
+
+
+class AsyncConverse:
+    """The AsyncConverse class is the asyncio counterpart of the Converse class.
+
+    The boto3 client is blocking, so every request runs on a dedicated thread pool while the
+    event loop only awaits the result. A semaphore bounds the number of requests (including
+    open streams) in flight at any time.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        system_prompt: Optional[SystemContentBlockTypeDef] = None,
+        memory: Optional[Memory] = None,
+        inference_config: InferenceConfig = InferenceConfig(),
+        region: str = 'us-west-2',
+        client: Optional[BedrockRuntimeClient] = None,
+        blob_store: Optional[BlobStore] = None,
+        max_concurrency: int = 64,
+        **kwargs: Any,
+    ):
+        """Initialize the AsyncConverse class.
+
+        Args:
+            model_id (ModelId): The ID of the model to use for conversation.
+            system_prompt (Optional[SystemContentBlockTypeDef], optional): The system prompt to use. Defaults to None.
+            memory (Optional[Memory], optional): The memory object to use for conversation. Defaults to None.
+            inference_config (InferenceConfig, optional): The inference configuration to use. Defaults to InferenceConfig().
+            region (str, optional): The region to use for the Bedrock client. Defaults to 'us-west-2'.
+            client (Optional[BedrockRuntimeClient], optional): The Bedrock client to use. Defaults to None.
+            blob_store (Optional[BlobStore], optional): Where to keep image and document bytes. Defaults to None.
+            max_concurrency (int, optional): The maximum number of requests in flight. Defaults to 64.
+            **kwargs: Any other keyword argument of Converse, such as attachment_policy.
+        """  # noqa: E501
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+        if client is None:
+            # one pooled connection per request that can be in flight
+            client = get_bedrock_client(region, max_pool_connections=max_concurrency)
+        self.converse = Converse(
+            model_id=model_id,
+            system_prompt=system_prompt,
+            memory=memory,
+            inference_config=inference_config,
+            region=region,
+            client=client,
+            blob_store=blob_store,
+            **kwargs,
+        )
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix='converser'
+        )
+
+    @property
+    def client(self) -> BedrockRuntimeClient:
+        """The Bedrock client used by the underlying Converse object."""
+        return self.converse.client
+
+    @property
+    def model_id(self) -> str:
+        """The ID of the model used for conversation."""
+        return self.converse.model_id
+
+    @property
+    def memory(self) -> Optional[Memory]:
+        """The memory object used for conversation."""
+        return self.converse.memory
+
+    async def __aenter__(self) -> 'AsyncConverse':
+        """Enter the async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Exit the async context manager and shut down the thread pool."""
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the thread pool used to run requests."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func: Callable[[], Any]) -> Any:
+        """Run a blocking callable on the thread pool under the concurrency limit."""
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func)
+
+    async def _stream(
+        self, open_stream: Callable[[], Generator[StreamEvent, Any, Any]]
+    ) -> AsyncGenerator[StreamEvent, None]:
+        """Drive a blocking stream generator on the thread pool and yield its events.
+
+        Events are handed over to the event loop through a queue, so the loop never blocks on
+        the network. The concurrency slot is held until the stream is exhausted or closed.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            stream = await loop.run_in_executor(self._executor, open_stream)
+            queue: asyncio.Queue[tuple[Any, Optional[BaseException]]] = asyncio.Queue()
+            stop = Event()
+            loop.run_in_executor(self._executor, _pump, stream, loop, queue, stop)
+            try:
+                while True:
+                    item, exc = await queue.get()
+                    if exc is not None:
+                        raise exc
+                    if item is _STREAM_END:
+                        return
+                    yield item
+            finally:
+                stop.set()
+
+    @overload
+    async def send_messages(
+        self, messages: List[MessageUnionTypeDef], streaming: Literal[True]
+    ) -> AsyncGenerator[StreamEvent, None]: ...
+
+    @overload
+    async def send_messages(
+        self, messages: List[MessageUnionTypeDef], streaming: bool = False
+    ) -> ConverseResponseTypeDef: ...
+
+    async def send_messages(
+        self, messages: List[MessageUnionTypeDef], streaming: bool = False
+    ) -> Union[ConverseResponseTypeDef, AsyncGenerator[StreamEvent, None]]:
+        """Send a message to the model.
+
+        Args:
+            messages (List[MessageUnionTypeDef]) : The messages to send.
+            streaming (bool, optional): Whether to use streaming or not. Defaults to False.
+
+        Returns:
+            ConverseResponseTypeDef: The response from the model, or an async iterator of
+            stream events when streaming.
+
+        Raises:
+            ValueError: If the message order is invalid.
+        """
+        if streaming:
+            # validation and history assembly happen here, the network calls on the pool
+            stream = self.converse.send_messages(messages, streaming=True)
+            return self._stream(lambda: stream)
+        return await self._run(partial(self.converse.send_messages, messages))
+
+    @overload
+    async def from_file(
+        self,
+        file_path: str,
+        content_type: Literal['image', 'document'],
+        streaming: Literal[True],
+        user_text: str = 'Please describe the contents of the file in detail',
+    ) -> AsyncGenerator[StreamEvent, None]: ...
+
+    @overload
+    async def from_file(
+        self,
+        file_path: str,
+        content_type: Literal['image', 'document'],
+        streaming: bool = False,
+        user_text: str = 'Please describe the contents of the file in detail',
+    ) -> ConverseResponseTypeDef: ...
+
+    async def from_file(
+        self,
+        file_path: str,
+        content_type: Literal['image', 'document'],
+        streaming: bool = False,
+        user_text: str = 'Please describe the contents of the file in detail',
+    ) -> Union[ConverseResponseTypeDef, AsyncGenerator[StreamEvent, None]]:
+        """Create a message from a file.
+
+        Args:
+            file_path (str): The path to the file.
+            content_type (Literal['image', 'document']): The type of content in the file.
+            streaming (bool, optional): Whether to use streaming or not. Defaults to False.
+            user_text (Optional[str], optional): The user text to include with the file.
+
+        Returns:
+            ConverseResponseTypeDef: The response from the model, or an async iterator of
+            stream events when streaming.
+
+        Raises:
+            ValueError: If the document format or image format is unsupported.
+        """
+        call = partial(
+            self.converse.from_file,
+            file_path,
+            content_type,
+            streaming=streaming,
+            user_text=user_text,
+        )
+        if streaming:
+            # reading the file is blocking, so the stream is opened on the pool as well
+            return self._stream(call)
+        return await self._run(call)
@@ -1,10 +1,34 @@
 """This module contains the Converse class."""
 
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from converser.cache import ResponseCache, SingleFlight
 from converser.conversation_memory import Memory
+from converser.conversation_memory.attachment_policy import AttachmentElisionPolicy
+from converser.conversation_memory.blob_store import BlobStore
+from converser.conversation_memory.memory import install_message_view_hook, next_role_after
 from converser.models import InferenceConfig
-from converser.streaming import ConverserStreamOutputTypeDefEnd, stream_messages
+from converser.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    HedgePolicy,
+    RateLimiter,
+)
+from converser.resilience.deadline import install_deadline_hook
+from converser.streaming import (
+    ConverserStreamOutputTypeDefEnd,
+    StreamSink,
+    converse_stream,
+    events_from_response,
+    process_stream,
+    stream_messages,
+)
+from converser.tool_use import StructuredOutput, ToolRegistry
 from converser.utils import get_bedrock_client
+from converser.utils.fingerprint import request_fingerprint
 from converser.utils.helpers import sanitize_file_name
+from converser.utils.profiler import Profiler, install_profiler_hooks
 from functools import partial, wraps
 from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
 from mypy_boto3_bedrock_runtime.literals import (
@@ -14,19 +38,33 @@ from mypy_boto3_bedrock_runtime.literals import (
 from mypy_boto3_bedrock_runtime.type_defs import (
     ContentBlockTypeDef,
     ConverseResponseTypeDef,
-    InferenceConfigurationTypeDef,
+    ConverseStreamOutputTypeDef,
+    GuardrailConfigurationTypeDef,
     MessageTypeDef,
     MessageUnionTypeDef,
     SystemContentBlockTypeDef,
+    ToolConfigurationTypeDef,
 )
 from pathlib import Path
+from pydantic import BaseModel
+from tqdm import tqdm
+from types import MappingProxyType
 from typing import (
     Any,
+    Callable,
+    ContextManager,
+    Dict,
     Generator,
+    Iterable,
+    Iterator,
     List,
     Literal,
+    Mapping,
+    NamedTuple,
     Optional,
     Sequence,
+    Type,
+    TypeVar,
     Union,
     cast,
     get_args,
@@ -34,6 +72,24 @@ from typing import (
 )
 
 
+M = TypeVar('M', bound=BaseModel)
+
+# the attributes of Converse that the request template is compiled from
+_TEMPLATE_ATTRIBUTES = frozenset(
+    {
+        'model_id',
+        'system_prompt',
+        'inference_config',
+        'tool_config',
+        'guardrail_config',
+        'additional_model_request_fields',
+    }
+)
+
+# reusable, and cheaper than a profiler phase
+_NOT_PROFILED: ContextManager[None] = nullcontext()
+
+
 def validate_message_order(func):
     """Decorator to validate the message order."""
 
@@ -44,16 +100,34 @@ def validate_message_order(func):
         ConverseResponseTypeDef,
         Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any],
     ]:
-        if not self._is_valid_message_order(messages):
-            raise ValueError(
-                'Invalid message order: Messages must start with a user message '
-                'and alternate between user and assistant.'
-            )
+        with self._phase('validate'):
+            if not self._is_valid_message_order(messages):
+                raise ValueError(
+                    'Invalid message order: Messages must start with a user message '
+                    'and alternate between user and assistant.'
+                )
         return func(self, messages, *args, **kwargs)
 
     return wrapper
 
 
+class BatchResult(NamedTuple):
+    """The outcome of one request sent through `Converse.send_many`.
+
+    `response` is the ConverseResponseTypeDef, or the final assistant message when streaming.
+    `error` holds the exception raised by the request, in which case `response` is None.
+    """
+
+    index: int
+    response: Optional[Union[ConverseResponseTypeDef, MessageUnionTypeDef]]
+    error: Optional[BaseException]
+
+    @property
+    def ok(self) -> bool:
+        """Whether the request succeeded."""
+        return self.error is None
+
+
 class Converse:
     """The Converse class is used to interact with the Bedrock Runtime API."""
 
@@ -65,6 +139,17 @@ class Converse:
         inference_config: InferenceConfig = InferenceConfig(),
         region: str = 'us-west-2',
         client: Optional[BedrockRuntimeClient] = None,
+        blob_store: Optional[BlobStore] = None,
+        attachment_policy: Optional[AttachmentElisionPolicy] = None,
+        cache: Optional[ResponseCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        hedging: Optional[HedgePolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        profiler: Optional[Profiler] = None,
+        tool_config: Optional[ToolConfigurationTypeDef] = None,
+        guardrail_config: Optional[GuardrailConfigurationTypeDef] = None,
+        additional_model_request_fields: Optional[Dict[str, Any]] = None,
     ):
         """Initialize the Converse class.
 
@@ -75,23 +160,96 @@ class Converse:
             inference_config (InferenceConfig, optional): The inference configuration to use. Defaults to InferenceConfig().
             region (str, optional): The region to use for the Bedrock client. Defaults to 'us-west-2'.
             client (Optional[BedrockRuntimeClient], optional): The Bedrock client to use. It's best if you pass your own client, but one will be created if you don't. Defaults to None.
+            blob_store (Optional[BlobStore], optional): Where to keep image and document bytes, so that messages and memory only hold references to them. Defaults to None.
+            attachment_policy (Optional[AttachmentElisionPolicy], optional): Elides images and documents from old turns in the requests built from memory. Defaults to None.
+            cache (Optional[ResponseCache], optional): Serves repeated requests from a cache instead of Bedrock. Defaults to None.
+            single_flight (Optional[SingleFlight], optional): Coalesces identical requests in flight at the same time, share it between Converse objects. Defaults to None.
+            rate_limiter (Optional[RateLimiter], optional): Holds requests back until the model's requests and tokens per minute quotas allow them, share it between Converse objects. Defaults to None.
+            hedging (Optional[HedgePolicy], optional): Sends a duplicate of non-streaming requests that are slower than usual, and keeps the first answer. It is not closed by Converse. Defaults to None.
+            circuit_breaker (Optional[CircuitBreaker], optional): Fails fast on calls to a model that keeps failing, share it between Converse objects. Defaults to None.
+            profiler (Optional[Profiler], optional): Times every phase of the calls, to tell library overhead from network time. Defaults to None.
+            tool_config (Optional[ToolConfigurationTypeDef], optional): The tools the model may use in every request, unless a call passes its own. Defaults to None.
+            guardrail_config (Optional[GuardrailConfigurationTypeDef], optional): The guardrail applied to every request. Defaults to None.
+            additional_model_request_fields (Optional[Dict[str, Any]], optional): Model-specific inference parameters sent with every request. Defaults to None.
         """  # noqa: E501
         self.client = get_bedrock_client(region=region) if client is None else client
+        install_deadline_hook(self.client)
+        install_message_view_hook(self.client)
+        if profiler is not None:
+            install_profiler_hooks(self.client)
         self.model_id = model_id
         self.system_prompt: Sequence[SystemContentBlockTypeDef] = (
             [system_prompt] if system_prompt else []
         )
         self.memory = memory
         self.inference_config = inference_config
-        self.stream_messages = partial(
-            stream_messages,
-            client=self.client,
-            model_id=self.model_id,
-            system_prompt=self.system_prompt,
-            memory=self.memory,
-            inference_config=self.inference_config,
-            stdout=False,
-        )
+        self.blob_store = blob_store
+        self.attachment_policy = attachment_policy
+        self.cache = cache
+        self.single_flight = single_flight
+        self.rate_limiter = rate_limiter
+        self.hedging = hedging
+        self.circuit_breaker = circuit_breaker
+        self.profiler = profiler
+        self.tool_config = tool_config
+        self.guardrail_config = guardrail_config
+        self.additional_model_request_fields = additional_model_request_fields
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Set an attribute, invalidating the request template when it depends on it."""
+        if name in _TEMPLATE_ATTRIBUTES:
+            self.__dict__['_compiled_template'] = None
+        super().__setattr__(name, value)
+
+    def request_template(self) -> Mapping[str, Any]:
+        """The parts of every request that do not depend on the messages.
+
+        It is compiled once, and again after one of `model_id`, `system_prompt`,
+        `inference_config`, `tool_config`, `guardrail_config` or
+        `additional_model_request_fields` is replaced or the inference config is modified.
+        The template is read-only, and so are the values it shares with every request.
+        """
+        return MappingProxyType(self._template())
+
+    def _template(self) -> Dict[str, Any]:
+        template = self.__dict__.get('_compiled_template')
+        # the inference config is the only part that is copied, so the only one checked
+        if template is None or self.inference_config.__dict__ != template['inferenceConfig']:
+            request: Dict[str, Any] = {
+                'modelId': self.model_id,
+                'system': self.system_prompt,
+                'inferenceConfig': self.inference_config.model_dump(),
+            }
+            if self.tool_config is not None:
+                request['toolConfig'] = self.tool_config
+            if self.guardrail_config is not None:
+                request['guardrailConfig'] = self.guardrail_config
+            if self.additional_model_request_fields is not None:
+                request['additionalModelRequestFields'] = self.additional_model_request_fields
+            template = self.__dict__['_compiled_template'] = request
+        return template
+
+    def stream_messages(
+        self, messages: List[MessageUnionTypeDef], **kwargs: Any
+    ) -> Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any]:
+        """Stream messages with `converser.streaming.stream_messages` and this object's settings.
+
+        Keyword arguments override the settings, as in `stream_messages(..., stdout=True)`.
+        """
+        options: Dict[str, Any] = {
+            'client': self.client,
+            'model_id': self.model_id,
+            'system_prompt': self.system_prompt,
+            'memory': self.memory,
+            'inference_config': self.inference_config,
+            'stdout': False,
+            'rate_limiter': self.rate_limiter,
+            'circuit_breaker': self.circuit_breaker,
+            'profiler': self.profiler,
+            'request_template': self.request_template(),
+            **kwargs,
+        }
+        return stream_messages(messages=messages, **options)
 
     def _is_valid_message_order(self, new_messages: List[MessageUnionTypeDef]) -> bool:
         """Check if the new messages have a valid order.
@@ -99,35 +257,38 @@ class Converse:
         Messages must start with a user message and alternate
         between user and assistant.
         """
-        if len(new_messages) == 1 and new_messages[0].get('role') == 'user':
-            return True
-
-        if new_messages[0].get('role') != 'user':
-            return False
-
-        for i, message in enumerate(new_messages[1:], start=1):
-            if i % 2 == 0 and message.get('role') != 'user':
-                return False
-            if i % 2 == 1 and message.get('role') != 'assistant':
-                return False
-
-        return True
+        return bool(new_messages) and next_role_after(new_messages) is not None
 
     @overload
     def send_messages(
-        self, messages: List[MessageUnionTypeDef], streaming: Literal[True]
+        self,
+        messages: List[MessageUnionTypeDef],
+        streaming: Literal[True],
+        timeout: Optional[float] = None,
+        tool_config: Optional[ToolConfigurationTypeDef] = None,
+        sinks: Sequence[StreamSink] = (),
     ) -> Generator[
         tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any
     ]: ...
 
     @overload
     def send_messages(
-        self, messages: List[MessageUnionTypeDef], streaming: bool = False
+        self,
+        messages: List[MessageUnionTypeDef],
+        streaming: bool = False,
+        timeout: Optional[float] = None,
+        tool_config: Optional[ToolConfigurationTypeDef] = None,
+        sinks: Sequence[StreamSink] = (),
     ) -> ConverseResponseTypeDef: ...
 
     @validate_message_order
     def send_messages(
-        self, messages: List[MessageUnionTypeDef], streaming: bool = False
+        self,
+        messages: List[MessageUnionTypeDef],
+        streaming: bool = False,
+        timeout: Optional[float] = None,
+        tool_config: Optional[ToolConfigurationTypeDef] = None,
+        sinks: Sequence[StreamSink] = (),
     ) -> Union[
         ConverseResponseTypeDef,
         Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any],
@@ -137,35 +298,51 @@ class Converse:
         Args:
             messages (List[MessageUnionTypeDef]) : The messages to send.
             streaming (bool, optional): Whether to use streaming or not. Defaults to False.
+            timeout (Optional[float], optional): The number of seconds the call may take in total, retries included. When streaming, it bounds the whole stream. Defaults to None.
+            tool_config (Optional[ToolConfigurationTypeDef], optional): The tools the model may use. Defaults to None.
+            sinks (Sequence[StreamSink], optional): Where to send the text and events of the stream as well, when streaming. Defaults to ().
 
         Returns:
             ConverseResponseTypeDef: The response from the model.
 
         Raises:
             ValueError: If the message order is invalid.
-        """
-        if self.memory:
-            message_history = self.memory.get_history()
-            messages = message_history + messages
-        else:
-            messages = messages
+            DeadlineExceeded: If the call does not complete within `timeout`.
+        """  # noqa: E501
+        return self._send_messages(messages, streaming, timeout, tool_config, sinks)
 
+    def _send_messages(
+        self,
+        messages: List[MessageUnionTypeDef],
+        streaming: bool = False,
+        timeout: Optional[float] = None,
+        tool_config: Optional[ToolConfigurationTypeDef] = None,
+        sinks: Sequence[StreamSink] = (),
+        transcript: Optional[Callable[[MessageUnionTypeDef], MessageUnionTypeDef]] = None,
+    ) -> Union[
+        ConverseResponseTypeDef,
+        Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any],
+    ]:
+        """Send validated messages; `transcript` turns the reply into the message recorded."""
+        deadline = Deadline(timeout) if timeout is not None else None
         if streaming:
-            return cast(
-                Generator[
-                    tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any
-                ],
-                self.stream_messages(messages=messages),
-            )
-
-        response: ConverseResponseTypeDef = self.client.converse(
-            modelId=self.model_id,
-            messages=messages,
-            system=self.system_prompt,
-            inferenceConfig=cast(
-                InferenceConfigurationTypeDef, self.inference_config.model_dump()
-            ),
-        )
+            if self.memory:
+                return self._stream_with_memory(
+                    messages, self.memory, deadline, tool_config, sinks, transcript
+                )
+            return self._stream(self._resolve(messages), deadline, tool_config, sinks)
+
+        with (
+            self.profiler.call('send_messages') if self.profiler else _NOT_PROFILED,
+            (
+                self.memory.request_view(messages) if self.memory else nullcontext(messages)
+            ) as request_messages,
+        ):
+            with self._phase('history'):
+                request_messages = self._resolve(self._elide(request_messages, messages))
+            with self._phase('build_request'):
+                request = self._build_request(request_messages, tool_config)
+            response = self._send(request, deadline)
 
         match response['stopReason']:
             case 'end_turn' | 'tool_use' | 'max_tokens' | 'stop_sequence':
@@ -175,7 +352,10 @@ class Converse:
                         'role': 'assistant',
                         'content': content,
                     }
-                    self.memory.add_messages([messages[-1]] + [assistant_message])
+                    if transcript is not None:
+                        assistant_message = transcript(assistant_message)
+                    with self._phase('record_turn'):
+                        self._record_turn(self.memory, messages[-1], assistant_message)
             # default case
             case _:
                 raise NotImplementedError(
@@ -184,6 +364,171 @@ class Converse:
 
         return response
 
+    def _stream_with_memory(
+        self,
+        messages: List[MessageUnionTypeDef],
+        memory: Memory,
+        deadline: Optional[Deadline] = None,
+        tool_config: Optional[ToolConfigurationTypeDef] = None,
+        sinks: Sequence[StreamSink] = (),
+        transcript: Optional[Callable[[MessageUnionTypeDef], MessageUnionTypeDef]] = None,
+    ) -> Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any]:
+        """Stream a reply to the history plus `messages` and record the turn in memory."""
+        with memory.request_view(messages) as request_messages, self._phase('history'):
+            request_messages = self._resolve(self._elide(request_messages, messages))
+        for event, final_message in self._stream(request_messages, deadline, tool_config, sinks):
+            if final_message is not None:
+                recorded = final_message if transcript is None else transcript(final_message)
+                with self._phase('record_turn'):
+                    self._record_turn(memory, messages[-1], recorded)
+            yield event, final_message
+
+    def _build_request(
+        self,
+        messages: Sequence[MessageUnionTypeDef],
+        tool_config: Optional[ToolConfigurationTypeDef] = None,
+    ) -> Dict[str, Any]:
+        """Build the keyword arguments of a converse or converse_stream call from the template."""
+        request: Dict[str, Any] = {**self._template(), 'messages': messages}
+        if tool_config is not None:
+            request['toolConfig'] = tool_config
+        return request
+
+    def _send(
+        self, request: Dict[str, Any], deadline: Optional[Deadline] = None
+    ) -> ConverseResponseTypeDef:
+        """Send a request through the response cache and single-flight, when configured."""
+        use_cache = self.cache is not None and self.cache.accepts(request)
+        if not use_cache and self.single_flight is None:
+            return self._converse(request, deadline)
+        key = request_fingerprint(request)
+        if use_cache:
+            cached = self.cache.get(key)  # type: ignore[union-attr]
+            if cached is not None:
+                return cached
+
+        def call() -> ConverseResponseTypeDef:
+            response = self._converse(request, deadline)
+            if use_cache:
+                self.cache.put(key, response)  # type: ignore[union-attr]
+            return response
+
+        return self.single_flight.do(key, call) if self.single_flight else call()
+
+    def _open_stream(
+        self, request: Dict[str, Any], deadline: Optional[Deadline] = None
+    ) -> Iterable[ConverseStreamOutputTypeDef]:
+        """Open a stream through the response cache and single-flight, when configured.
+
+        A cached response is replayed as events.
+        """
+        use_cache = self.cache is not None and self.cache.accepts(request)
+        if not use_cache and self.single_flight is None:
+            return self._converse_stream(request, deadline)
+        key = request_fingerprint(request)
+        if use_cache:
+            cached = self.cache.get(key)  # type: ignore[union-attr]
+            if cached is not None:
+                return events_from_response(cached)
+
+        def open_stream() -> Iterable[ConverseStreamOutputTypeDef]:
+            events = self._converse_stream(request, deadline)
+            return self.cache.record_stream(key, events) if use_cache else events  # type: ignore[union-attr]
+
+        return self.single_flight.stream(key, open_stream) if self.single_flight else open_stream()
+
+    def _converse(
+        self, request: Dict[str, Any], deadline: Optional[Deadline] = None
+    ) -> ConverseResponseTypeDef:
+        """Call converse, hedged when hedging is set."""
+        if self.hedging is None:
+            return self._converse_once(self.client, request, deadline)
+        # the deadline is passed on, since the hedging threads do not see the caller's
+        call = partial(self._converse_once, deadline=deadline)
+        return self.hedging.send(call, self.client, request)
+
+    def _converse_once(
+        self,
+        client: BedrockRuntimeClient,
+        request: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+    ) -> ConverseResponseTypeDef:
+        """Call converse once, through the rate limiter, circuit breaker and deadline."""
+        reservation = None
+        if self.rate_limiter is not None:
+            # waiting for the quota sends nothing to the model, so it stays outside the breaker
+            reservation = self.rate_limiter.reserve_for(request, deadline)
+
+        def call() -> ConverseResponseTypeDef:
+            if self.rate_limiter is None:
+                return client.converse(**request)
+            return self.rate_limiter.send(client, request, reservation)
+
+        if self.circuit_breaker is None:
+            return call() if deadline is None else deadline.run(call)
+        try:
+            # the deadline is inside the breaker, so that a call timing out counts as a failure
+            with self.circuit_breaker.guard(request['modelId']):
+                return call() if deadline is None else deadline.run(call)
+        except CircuitOpenError:
+            if self.rate_limiter is not None and reservation is not None:
+                self.rate_limiter.reconcile(reservation, 0)
+            raise
+
+    def _converse_stream(
+        self, request: Dict[str, Any], deadline: Optional[Deadline] = None
+    ) -> Iterable[ConverseStreamOutputTypeDef]:
+        """Call converse_stream, through the rate limiter, circuit breaker and deadline."""
+        return converse_stream(
+            self.client, request, deadline, self.rate_limiter, self.circuit_breaker
+        )
+
+    def _stream(
+        self,
+        messages: Sequence[MessageUnionTypeDef],
+        deadline: Optional[Deadline] = None,
+        tool_config: Optional[ToolConfigurationTypeDef] = None,
+        sinks: Sequence[StreamSink] = (),
+    ) -> Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any]:
+        """Stream a reply to `messages`, which already include any history."""
+        with self._phase('build_request'):
+            request = self._build_request(messages, tool_config)
+        opener = partial(self._open_stream, request, deadline)
+        if self.profiler is None:
+            yield from process_stream(opener(), sinks=sinks)
+        else:
+            process = partial(process_stream, sinks=sinks)
+            yield from self.profiler.stream('stream_messages', opener, process)
+
+    def _phase(self, phase: str) -> ContextManager[None]:
+        """Time a phase of a call when profiling."""
+        return self.profiler.phase(phase) if self.profiler else _NOT_PROFILED
+
+    def _resolve(self, messages: Sequence[MessageUnionTypeDef]) -> Sequence[MessageUnionTypeDef]:
+        """Put the bytes of blob references back into the messages of a request."""
+        return self.blob_store.resolve_messages(messages) if self.blob_store else messages
+
+    def _elide(
+        self, request_messages: Sequence[MessageUnionTypeDef], messages: List[MessageUnionTypeDef]
+    ) -> Sequence[MessageUnionTypeDef]:
+        """Elide the stale attachments of the history that precedes the new `messages`."""
+        if not self.attachment_policy or request_messages is messages:
+            return request_messages
+        history_length = len(request_messages) - len(messages)
+        return self.attachment_policy.elide(request_messages, history_length)
+
+    def _record_turn(
+        self,
+        memory: Memory,
+        user_message: MessageUnionTypeDef,
+        assistant_message: MessageUnionTypeDef,
+    ) -> None:
+        """Add a turn to memory, moving attachment bytes into the blob store."""
+        turn = [user_message, assistant_message]
+        if self.blob_store:
+            turn = self.blob_store.externalize_messages(turn)
+        memory.add_messages(turn)
+
     @overload
     def from_file(
         self,
@@ -191,6 +536,7 @@ class Converse:
         content_type: Literal['image', 'document'],
         streaming: Literal[True],
         user_text: str = 'Please describe the contents of the file in detail',
+        timeout: Optional[float] = None,
     ) -> Generator[
         tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any
     ]: ...
@@ -202,6 +548,7 @@ class Converse:
         content_type: Literal['image', 'document'],
         streaming: bool = False,
         user_text: str = 'Please describe the contents of the file in detail',
+        timeout: Optional[float] = None,
     ) -> ConverseResponseTypeDef: ...
 
     def from_file(
@@ -210,6 +557,7 @@ class Converse:
         content_type: Literal['image', 'document'],
         streaming: bool = False,
         user_text: str = 'Please describe the contents of the file in detail',
+        timeout: Optional[float] = None,
     ) -> Union[
         ConverseResponseTypeDef,
         Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any],
@@ -221,14 +569,16 @@ class Converse:
             content_type (Literal['image', 'document']): The type of content in the file.
             user_text (Optional[str], optional): The user text to include with the file. Defaults to None.
             streaming (bool, optional): Whether to use streaming or not. Defaults to False.
+            timeout (Optional[float], optional): The number of seconds the call may take in total, retries included. Defaults to None.
 
         Returns:
             ConverseResponseTypeDef: The response from the model.
 
         Raises:
             ValueError: If the document format or image format is unsupported.
+            DeadlineExceeded: If the call does not complete within `timeout`.
         """  # noqa: E501
-        with open(file_path, 'rb') as file:
+        with self._phase('read_file'), open(file_path, 'rb') as file:
             content_bytes = file.read()
 
         content_block: ContentBlockTypeDef
@@ -243,20 +593,23 @@ class Converse:
             raise ValueError(f'Unsupported image format: {file_extension}')
 
         document_name: str = sanitize_file_name(file_path)
+        source: Dict[str, Any] = {'bytes': content_bytes}
+        if self.blob_store:
+            source = self.blob_store.externalize_source(source) or source
 
         if content_type == 'document':
             content_block = {
                 'document': {
                     'format': file_extension,  # type: ignore
                     'name': document_name,
-                    'source': {'bytes': content_bytes},
+                    'source': source,  # type: ignore[typeddict-item]
                 }
             }
         elif content_type == 'image':
             content_block = {
                 'image': {
                     'format': file_extension,  # type: ignore
-                    'source': {'bytes': content_bytes},
+                    'source': source,  # type: ignore[typeddict-item]
                 }
             }
         else:
@@ -266,4 +619,237 @@ class Converse:
             'role': 'user',
             'content': [{'text': user_text}, content_block],
         }
-        return self.send_messages([user_message], streaming=streaming)
+        return self.send_messages([user_message], streaming=streaming, timeout=timeout)
+
+    @overload
+    def send_structured(
+        self,
+        messages: List[MessageUnionTypeDef],
+        model: Type[M],
+        streaming: Literal[True],
+        timeout: Optional[float] = None,
+    ) -> Generator[M, None, None]: ...
+
+    @overload
+    def send_structured(
+        self,
+        messages: List[MessageUnionTypeDef],
+        model: Type[M],
+        streaming: Literal[False] = False,
+        timeout: Optional[float] = None,
+    ) -> M: ...
+
+    @validate_message_order
+    def send_structured(
+        self,
+        messages: List[MessageUnionTypeDef],
+        model: Type[M],
+        streaming: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Union[M, Generator[M, None, None]]:
+        """Send messages and get the answer as an instance of a pydantic model.
+
+        The model is forced to call a tool whose input schema is generated from `model`, which
+        only some models support, such as Anthropic Claude. When streaming, partial instances
+        are yielded as their fields arrive, and the last one is the whole validated answer.
+        With memory, the answer is recorded as the assistant's reply in JSON text, instead of
+        the call of the tool, so later requests need neither the tool nor a result for it.
+
+        Args:
+            messages (List[MessageUnionTypeDef]): The messages to send.
+            model (Type[M]): The pydantic model of the answer.
+            streaming (bool, optional): Whether to stream partial instances. Defaults to False.
+            timeout (Optional[float], optional): The number of seconds the call may take in total, retries included. When streaming, it bounds the whole stream. Defaults to None.
+
+        Returns:
+            M: The answer, or a generator of partial answers when streaming.
+
+        Raises:
+            ValueError: If the message order is invalid, or the reply does not call the tool.
+            pydantic.ValidationError: If the answer does not match `model`.
+        """  # noqa: E501
+        output = StructuredOutput(model)
+        if streaming:
+            stream = self._send_messages(
+                messages, True, timeout, output.tool_config, transcript=output.transcript
+            )
+            return output.partials(stream)  # type: ignore[arg-type]
+        response = self._send_messages(
+            messages, False, timeout, output.tool_config, transcript=output.transcript
+        )
+        return output.from_response(response)  # type: ignore[arg-type]
+
+    def run_agent(
+        self,
+        messages: List[MessageUnionTypeDef],
+        tools: ToolRegistry,
+        max_iterations: int = 10,
+        streaming: bool = False,
+    ) -> ConverseResponseTypeDef:
+        """Send messages and run the tools the model asks for until it gives a final answer.
+
+        Every time the model stops to use tools, all the calls of that turn are run
+        concurrently by the registry and their results are sent back. With memory, every turn
+        is recorded as usual.
+
+        Args:
+            messages (List[MessageUnionTypeDef]): The messages to send.
+            tools (ToolRegistry): The tools the model may use.
+            max_iterations (int, optional): The maximum number of requests to send. Defaults to 10.
+            streaming (bool, optional): Whether to stream the replies, starting every tool call as soon as its arguments have arrived. Defaults to False.
+
+        Returns:
+            ConverseResponseTypeDef: The final response from the model.
+
+        Raises:
+            RuntimeError: If the model still asks for tools after `max_iterations` requests. With memory, the unanswered tool request is the last message of the history.
+        """  # noqa: E501
+        # without memory, the conversation so far is sent with every request
+        conversation = None if self.memory else list(messages)
+        pending = messages
+        tool_config = tools.tool_config()
+        for _ in range(max_iterations):
+            started: Dict[str, Future] = {}
+            if streaming:
+                response = self._stream_agent_turn(conversation or pending, tools, started)
+            else:
+                response = self.send_messages(conversation or pending, tool_config=tool_config)
+            if response['stopReason'] != 'tool_use':
+                return response
+            assistant_message = response['output']['message']  # type: ignore[typeddict-item]
+            results = tools.execute(
+                [block['toolUse'] for block in assistant_message['content'] if 'toolUse' in block],
+                started,
+            )
+            pending = [{'role': 'user', 'content': results}]
+            if conversation is not None:
+                conversation += [assistant_message, *pending]
+        raise RuntimeError(f'The model was still using tools after {max_iterations} requests')
+
+    def _stream_agent_turn(
+        self,
+        messages: List[MessageUnionTypeDef],
+        tools: ToolRegistry,
+        started: Dict[str, Future],
+    ) -> ConverseResponseTypeDef:
+        """Stream one reply of the agent loop, starting the tool calls as they complete."""
+        response: Dict[str, Any] = {}
+        stream = self.send_messages(messages, streaming=True, tool_config=tools.tool_config())
+        for event, final_message in stream:
+            tool_use_input = event.get('toolUseInput')
+            if tool_use_input and tool_use_input['complete']:
+                tool_use_id = tool_use_input['toolUseId']
+                if tool_use_id not in started:
+                    started[tool_use_id] = tools.start(
+                        {
+                            'toolUseId': tool_use_id,
+                            'name': tool_use_input['name'],
+                            'input': tool_use_input['input'],
+                        }
+                    )
+            if final_message is not None:
+                response['output'] = {'message': final_message}
+                response['stopReason'] = event['messageStop']['stopReason']
+            elif 'metadata' in event:
+                response.update(event['metadata'])
+        return response  # type: ignore[return-value]
+
+    def _send_one(
+        self, messages: List[MessageUnionTypeDef], streaming: bool
+    ) -> Union[ConverseResponseTypeDef, MessageUnionTypeDef, None]:
+        """Send one request of a batch, draining the stream when streaming."""
+        if not streaming:
+            return self.send_messages(messages)
+        final_message: Optional[MessageUnionTypeDef] = None
+        for event, message in self.send_messages(messages, streaming=True):
+            if event['done']:
+                final_message = message
+        return final_message
+
+    def iter_many(
+        self,
+        batch: Sequence[List[MessageUnionTypeDef]],
+        max_workers: int = 10,
+        streaming: bool = False,
+        progress: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> Iterator[BatchResult]:
+        """Send independent requests concurrently and yield the results as they complete.
+
+        Args:
+            batch (Sequence[List[MessageUnionTypeDef]]): One message list per request.
+            max_workers (int, optional): The number of worker threads. Defaults to 10, the size of the default boto3 connection pool.
+            streaming (bool, optional): Whether to use streaming or not. Defaults to False.
+            progress (bool, optional): Whether to show a tqdm progress bar. Defaults to False.
+            executor (Optional[Executor], optional): An executor to run the requests on instead of a new thread pool. Defaults to None.
+
+        Returns:
+            Iterator[BatchResult]: The results in completion order. Failed requests are reported
+            through `BatchResult.error` instead of being raised.
+
+        Raises:
+            ValueError: If memory is enabled, since the requests are independent conversations.
+        """  # noqa: E501
+        if self.memory:
+            raise ValueError('send_many cannot be used with memory: requests are independent.')
+        return self._iter_many(batch, max_workers, streaming, progress, executor)
+
+    def _iter_many(
+        self,
+        batch: Sequence[List[MessageUnionTypeDef]],
+        max_workers: int,
+        streaming: bool,
+        progress: bool,
+        executor: Optional[Executor],
+    ) -> Generator[BatchResult, None, None]:
+        pool = executor or ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='converser'
+        )
+        futures = {
+            pool.submit(self._send_one, messages, streaming): index
+            for index, messages in enumerate(batch)
+        }
+        try:
+            with tqdm(total=len(futures), disable=not progress, unit='req') as progress_bar:
+                for future in as_completed(futures):
+                    error = future.exception()
+                    progress_bar.update()
+                    yield BatchResult(
+                        index=futures[future],
+                        response=None if error else future.result(),
+                        error=error,
+                    )
+        finally:
+            # stop any work left behind if the caller stopped iterating early
+            for future in futures:
+                future.cancel()
+            if executor is None:
+                pool.shutdown(wait=False)
+
+    def send_many(
+        self,
+        batch: Sequence[List[MessageUnionTypeDef]],
+        max_workers: int = 10,
+        streaming: bool = False,
+        progress: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> List[BatchResult]:
+        """Send independent requests concurrently and return the results in input order.
+
+        Args:
+            batch (Sequence[List[MessageUnionTypeDef]]): One message list per request.
+            max_workers (int, optional): The number of worker threads. Defaults to 10, the size of the default boto3 connection pool.
+            streaming (bool, optional): Whether to use streaming or not. Defaults to False.
+            progress (bool, optional): Whether to show a tqdm progress bar. Defaults to False.
+            executor (Optional[Executor], optional): An executor to run the requests on instead of a new thread pool. Defaults to None.
+
+        Returns:
+            List[BatchResult]: One result per request, in the order of `batch`.
+
+        Raises:
+            ValueError: If memory is enabled, since the requests are independent conversations.
+        """  # noqa: E501
+        results: List[Optional[BatchResult]] = [None] * len(batch)
+        for result in self.iter_many(batch, max_workers, streaming, progress, executor):
+            results[result.index] = result
+        return cast(List[BatchResult], results)
@@ -0,0 +1,24 @@
+"""Protection of Bedrock calls against throttling and degraded service."""
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState, CircuitStatus
+from .deadline import Deadline, DeadlineExceeded
+from .hedging import HedgePolicy
+from .rate_limiter import Quota, RateLimiter, Reservation
+from .router import FAILOVER_ERROR_CODES, RegionHealth, RegionRouter
+
+
+__all__ = [
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'CircuitState',
+    'CircuitStatus',
+    'Deadline',
+    'DeadlineExceeded',
+    'FAILOVER_ERROR_CODES',
+    'HedgePolicy',
+    'Quota',
+    'RateLimiter',
+    'RegionHealth',
+    'RegionRouter',
+    'Reservation',
+]
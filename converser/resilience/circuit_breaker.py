@@ -0,0 +1,180 @@
+"""Per-model circuit breaker for Bedrock calls."""
+
+import threading
+import time
+from botocore.exceptions import ClientError, ConnectionError, ReadTimeoutError
+from contextlib import contextmanager
+from enum import Enum
+from typing import Callable, Dict, Generator, Iterable, Iterator, NamedTuple, TypeVar
+
+
+T = TypeVar('T')
+
+# errors that say something about the health of the model, unlike validation errors
+FAILURE_ERROR_CODES = frozenset(
+    {
+        'ThrottlingException',
+        'ServiceUnavailableException',
+        'InternalServerException',
+        'ModelTimeoutException',
+        'ModelNotReadyException',
+    }
+)
+
+
+class CircuitState(str, Enum):
+    """The state of a circuit."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose circuit is open."""
+
+
+class CircuitStatus(NamedTuple):
+    """The state of the circuit of a model, for monitoring."""
+
+    state: CircuitState
+    consecutive_failures: int
+    trips: int
+
+
+class _Circuit:
+    def __init__(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.opened_at = 0.0
+        self.probes = 0
+
+
+class CircuitBreaker:
+    """Fail fast on calls to a model that keeps failing, and probe it for recovery.
+
+    Every model has its own circuit. After `failure_threshold` consecutive failures the
+    circuit opens, and calls raise CircuitOpenError without reaching Bedrock. After
+    `reset_timeout` seconds it half-opens: up to `half_open_probes` calls go through, and the
+    circuit closes when one succeeds or opens again when one fails.
+
+    Only throttling, server and timeout errors count as failures. Errors caused by the
+    request itself, such as validation errors, are no outcome at all: they neither count as a
+    failure nor reset the failures counted so far, and a probe ending with one leaves the
+    circuit half-open.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_probes: int = 1
+    ) -> None:
+        """Initialize the CircuitBreaker class.
+
+        Args:
+            failure_threshold (int, optional): The number of consecutive failures that opens a circuit. Defaults to 5.
+            reset_timeout (float, optional): The number of seconds a circuit stays open before probing. Defaults to 30.0.
+            half_open_probes (int, optional): The number of calls let through at once while half-open. Defaults to 1.
+        """  # noqa: E501
+        if failure_threshold < 1 or half_open_probes < 1:
+            raise ValueError('failure_threshold and half_open_probes must be at least 1')
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def status(self, model_id: str) -> CircuitStatus:
+        """The status of the circuit of a model."""
+        with self._lock:
+            return self._status(self._circuit(model_id))
+
+    def statuses(self) -> Dict[str, CircuitStatus]:
+        """The status of every circuit that has seen a call."""
+        with self._lock:
+            return {
+                model_id: self._status(circuit) for model_id, circuit in self._circuits.items()
+            }
+
+    @contextmanager
+    def guard(self, model_id: str) -> Iterator[None]:
+        """Wrap a call to a model, recording whether it failed.
+
+        Raises:
+            CircuitOpenError: If the circuit of the model is open.
+        """
+        probe = self._acquire(model_id)
+        try:
+            yield
+        except Exception as exc:
+            # an error caused by the request tells nothing about the model
+            self._release(model_id, probe, True if is_failure(exc) else None)
+            raise
+        except BaseException:
+            # neither does an abandoned stream
+            self._release(model_id, probe, None)
+            raise
+        self._release(model_id, probe, False)
+
+    def stream(
+        self, model_id: str, open_stream: Callable[[], Iterable[T]]
+    ) -> Generator[T, None, None]:
+        """Open a stream when the first event is requested, recording whether it failed."""
+        with self.guard(model_id):
+            yield from open_stream()
+
+    def _circuit(self, model_id: str) -> _Circuit:
+        circuit = self._circuits.get(model_id)
+        if circuit is None:
+            circuit = self._circuits[model_id] = _Circuit()
+        if (
+            circuit.state == CircuitState.OPEN
+            and time.monotonic() - circuit.opened_at >= self.reset_timeout
+        ):
+            circuit.state = CircuitState.HALF_OPEN
+            circuit.probes = 0
+        return circuit
+
+    def _status(self, circuit: _Circuit) -> CircuitStatus:
+        return CircuitStatus(circuit.state, circuit.consecutive_failures, circuit.trips)
+
+    def _acquire(self, model_id: str) -> bool:
+        """Let a call through, or raise; returns whether the call is a half-open probe."""
+        with self._lock:
+            circuit = self._circuit(model_id)
+            if circuit.state == CircuitState.CLOSED:
+                return False
+            if circuit.state == CircuitState.HALF_OPEN and circuit.probes < self.half_open_probes:
+                circuit.probes += 1
+                return True
+        raise CircuitOpenError(f'Circuit of {model_id} is open')
+
+    def _release(self, model_id: str, probe: bool, failed: bool | None) -> None:
+        with self._lock:
+            circuit = self._circuit(model_id)
+            if probe:
+                circuit.probes -= 1
+            if failed is None:
+                return
+            if not failed:
+                circuit.consecutive_failures = 0
+                circuit.state = CircuitState.CLOSED
+                return
+            circuit.consecutive_failures += 1
+            if circuit.state == CircuitState.HALF_OPEN or (
+                circuit.state == CircuitState.CLOSED
+                and circuit.consecutive_failures >= self.failure_threshold
+            ):
+                circuit.state = CircuitState.OPEN
+                circuit.opened_at = time.monotonic()
+                circuit.trips += 1
+
+
+def is_failure(error: BaseException) -> bool:
+    """Whether an error counts against the health of the model that raised it."""
+    if isinstance(error, ClientError):
+        response = error.response
+        return (
+            response.get('Error', {}).get('Code') in FAILURE_ERROR_CODES
+            or response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500
+        )
+    return isinstance(error, (ConnectionError, ReadTimeoutError, TimeoutError))
@@ -0,0 +1,157 @@
+"""Deadlines bounding the total time of Bedrock calls, retries included."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Generator, Iterable, Iterator, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+_END = object()
+_local = threading.local()
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not complete before its deadline."""
+
+
+class Deadline:
+    """A point in time by which a call, and all of its retries, must have completed.
+
+    `run` and `stream` move the blocking work to a daemon thread, one per call, and stop
+    waiting for it when the deadline passes, so a degraded connection cannot hold the caller
+    for the full read timeout. The deadline is set on that thread, where `current_deadline`
+    returns it. An abandoned call cannot be interrupted, but clients prepared with
+    `install_deadline_hook` stop retrying it, and an abandoned stream is closed as soon as its
+    next event arrives, so the thread ends at most one event, or one read timeout, later.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        """Initialize the Deadline class.
+
+        Args:
+            timeout (float): The number of seconds from now until the deadline.
+        """
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """The number of seconds left, zero once the deadline has passed."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def check(self) -> None:
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if time.monotonic() >= self.expires_at:
+            raise DeadlineExceeded(f'Deadline of {self.timeout}s exceeded')
+
+    def run(self, func: Callable[[], T]) -> T:
+        """Run `func` on a separate thread and wait for its result until the deadline.
+
+        Raises:
+            DeadlineExceeded: If `func` has not returned by the deadline.
+        """
+        self.check()
+        future: Future = Future()
+
+        def target() -> None:
+            _local.deadline = self
+            try:
+                future.set_result(func())
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=target, name='converser-deadline', daemon=True).start()
+        try:
+            return future.result(timeout=self.remaining())
+        except FutureTimeoutError:
+            raise DeadlineExceeded(f'Deadline of {self.timeout}s exceeded') from None
+
+    def stream(self, open_stream: Callable[[], Iterable[T]]) -> Generator[T, None, None]:
+        """Open and read a stream on a separate thread, until the deadline.
+
+        The deadline bounds the whole stream, not the wait for each item. When the caller
+        stops reading, on error, at the deadline or by closing the generator, the stream is
+        closed by the thread reading it.
+
+        Raises:
+            DeadlineExceeded: If the stream has not ended by the deadline.
+        """
+        self.check()
+        buffer: queue.Queue = queue.Queue()
+        stop = threading.Event()
+
+        def target() -> None:
+            _local.deadline = self
+            stream: Optional[Iterator[T]] = None
+            try:
+                stream = iter(open_stream())
+                for item in stream:
+                    if stop.is_set():
+                        return
+                    buffer.put((item, None))
+                buffer.put((_END, None))
+            except BaseException as exc:
+                buffer.put((_END, exc))
+            finally:
+                close = getattr(stream, 'close', None)
+                if stop.is_set() and close is not None:
+                    close()
+
+        threading.Thread(target=target, name='converser-deadline', daemon=True).start()
+        try:
+            while True:
+                try:
+                    item, error = buffer.get(timeout=self.remaining())
+                except queue.Empty:
+                    raise DeadlineExceeded(f'Deadline of {self.timeout}s exceeded') from None
+                if error is not None:
+                    raise error
+                if item is _END:
+                    return
+                yield item
+        finally:
+            stop.set()
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the call running on this thread, if any."""
+    return getattr(_local, 'deadline', None)
+
+
+def bind_deadline(func: Callable[..., T]) -> Callable[..., T]:
+    """Wrap `func` so that it runs under the deadline of the calling thread, on any thread.
+
+    Use it for work submitted to an executor, whose threads do not see the caller's deadline.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return func
+
+    def bound(*args: Any, **kwargs: Any) -> T:
+        previous = current_deadline()
+        _local.deadline = deadline
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.deadline = previous
+
+    return bound
+
+
+def _check_deadline(**kwargs: Any) -> None:
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+
+def install_deadline_hook(client: Any) -> None:
+    """Make a boto3 client give up retrying calls whose deadline has passed.
+
+    Objects that are not boto3 clients are left as they are.
+    """
+    events = getattr(getattr(client, 'meta', None), 'events', None)
+    if events is not None:
+        events.register('before-send.*', _check_deadline, unique_id='converser-deadline')
@@ -0,0 +1,200 @@
+"""Hedged requests, to cut the tail latency of Bedrock calls."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    CancelledError,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from converser.resilience.deadline import bind_deadline
+from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+
+class HedgePolicy:
+    """Send a duplicate of a request that is slower than usual, and keep the first answer.
+
+    The hedge delay is a percentile of the latencies of recent calls: a request that has not
+    completed after it is sent a second time, to `client` when given, such as a client for
+    another region, and the first successful response wins. The loser cannot be cancelled once
+    sent, so its response is discarded. Hedges are only sent once `min_samples` latencies are
+    known, and never add more than `max_extra_load` times the number of requests.
+
+    Calls run on a thread pool while the caller waits for them. A hedge still queued for a
+    worker when the original call succeeds is never sent, and a losing call already sent runs
+    to completion on its thread. Share one policy between the Converse objects calling the
+    same model, so that they share its latencies.
+
+    The pool is `executor` when given, which the caller owns and shuts down. Otherwise the
+    policy creates its own on first use, and `close`, or leaving the policy as a context
+    manager, shuts it down. Converse objects never close the policy they are given.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_extra_load: float = 0.05,
+        client: Optional[BedrockRuntimeClient] = None,
+        min_samples: int = 20,
+        window: int = 1000,
+        max_workers: int = 64,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """Initialize the HedgePolicy class.
+
+        Args:
+            percentile (float, optional): The percentile of recent latencies after which a request is hedged. Defaults to 95.0.
+            max_extra_load (float, optional): The maximum number of hedges per request sent. Defaults to 0.05.
+            client (Optional[BedrockRuntimeClient], optional): The client to send hedges to. Defaults to None, which uses the client of the request.
+            min_samples (int, optional): The number of latencies to observe before hedging. Defaults to 20.
+            window (int, optional): The number of recent latencies the percentile is computed over. Defaults to 1000.
+            max_workers (int, optional): The size of the thread pool the policy creates to run the calls. Defaults to 64.
+            executor (Optional[Executor], optional): A pool to run the calls on instead, owned by the caller. Defaults to None.
+        """  # noqa: E501
+        if not 0 < percentile < 100:
+            raise ValueError('percentile must be between 0 and 100')
+        if max_extra_load < 0:
+            raise ValueError('max_extra_load cannot be negative')
+        self.percentile = percentile
+        self.max_extra_load = max_extra_load
+        self.client = client
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._delay: Optional[float] = None
+        self._stale_samples = 0
+        self.max_workers = max_workers
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'HedgePolicy':
+        """Enter the context manager."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Exit the context manager and shut down the thread pool of the policy."""
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the thread pool the policy created, cancelling the calls not started yet.
+
+        Calls already sent finish on their threads. A pool passed as `executor` is left open.
+        """
+        with self._lock:
+            executor, owned = self._executor, self._owns_executor
+        if owned and executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def delay(self) -> Optional[float]:
+        """The current hedge delay in seconds, or None while there are too few samples."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            # sorting the window on every request would cost more than it is worth
+            if self._delay is None or self._stale_samples >= 16:
+                ordered = sorted(self._latencies)
+                self._delay = ordered[int(len(ordered) * self.percentile / 100)]
+                self._stale_samples = 0
+            return self._delay
+
+    def record(self, latency: float) -> None:
+        """Record the latency of a successful call."""
+        with self._lock:
+            self._latencies.append(latency)
+            self._stale_samples += 1
+
+    def send(
+        self,
+        call: Callable[[BedrockRuntimeClient, Dict[str, Any]], T],
+        client: BedrockRuntimeClient,
+        request: Dict[str, Any],
+    ) -> T:
+        """Run `call(client, request)`, hedging it if it is slow.
+
+        Args:
+            call (Callable[[BedrockRuntimeClient, Dict[str, Any]], T]): Sends a request with a client.
+            client (BedrockRuntimeClient): The client of the request.
+            request (Dict[str, Any]): The keyword arguments of the call.
+
+        Returns:
+            T: The result of the first call to succeed.
+
+        Raises:
+            Exception: The error of the original call, if both calls fail.
+        """  # noqa: E501
+        delay = self.delay()
+        with self._lock:
+            self.requests += 1
+        if delay is None:
+            return self._timed(call, client, request)
+        # the calls run on the pool, under the deadline of the caller
+        timed = bind_deadline(self._timed)
+        primary = self._pool().submit(timed, call, client, request)
+        done, _ = wait((primary,), timeout=delay)
+        if done or not self._take_hedge():
+            return primary.result()
+        # the original call may still read the request, and the caller may change its
+        # messages as soon as this returns, so the hedge gets its own message list
+        hedge_request = {**request, 'messages': list(request['messages'])}
+        hedge = self._pool().submit(
+            _unless_succeeded, primary, timed, call, self.client or client, hedge_request
+        )
+        return self._first_success(primary, hedge)
+
+    def _pool(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='hedge'
+                )
+            return self._executor
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.max_extra_load * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _first_success(self, primary: Future, hedge: Future) -> Any:
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+        return primary.result()
+
+    def _timed(
+        self,
+        call: Callable[[BedrockRuntimeClient, Dict[str, Any]], T],
+        client: BedrockRuntimeClient,
+        request: Dict[str, Any],
+    ) -> T:
+        start = time.perf_counter()
+        result = call(client, request)
+        self.record(time.perf_counter() - start)
+        return result
+
+
+def _unless_succeeded(primary: Future, func: Callable[..., T], *args: Any) -> T:
+    """Run `func`, unless `primary` has already succeeded while this call was queued."""
+    if primary.done() and primary.exception() is None:
+        raise CancelledError('The original call succeeded first')
+    return func(*args)
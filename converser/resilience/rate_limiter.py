@@ -0,0 +1,299 @@
+"""Client-side token-bucket rate limiting of Bedrock requests."""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from converser.resilience.deadline import Deadline, current_deadline
+from converser.utils.tokens import CHARS_PER_TOKEN, estimate_request_tokens
+from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
+from mypy_boto3_bedrock_runtime.type_defs import (
+    ConverseResponseTypeDef,
+    ConverseStreamOutputTypeDef,
+)
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterable, Iterator, Mapping, NamedTuple, Optional, Union
+
+
+class Quota(NamedTuple):
+    """The requests and tokens a model may consume per minute. None means unlimited."""
+
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+class Reservation(NamedTuple):
+    """The capacity taken by one request, to reconcile once its usage is known.
+
+    `output_tokens` is the part of `tokens` reserved for the output of the request.
+    """
+
+    model_id: str
+    tokens: int
+    output_tokens: int = 0
+
+
+class RateLimiter:
+    """Enforce per-model requests-per-minute and tokens-per-minute quotas before sending.
+
+    Each model has two token buckets, one for requests and one for tokens, that hold up to a
+    minute of quota and refill continuously. A request reserves one request and its estimated
+    tokens, waiting until both are available, and the estimate is corrected with the real usage
+    once the response arrives.
+
+    The limiter is thread-safe, so share one instance between every Converse object calling a
+    model. With `lock_file`, the buckets are kept in that file under an exclusive lock instead
+    of in memory, which shares them between processes on the same host (POSIX only).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        quotas: Optional[Mapping[str, Quota]] = None,
+        lock_file: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """Initialize the RateLimiter class.
+
+        Args:
+            requests_per_minute (Optional[float], optional): The default requests per minute of each model. Defaults to None.
+            tokens_per_minute (Optional[float], optional): The default tokens per minute of each model. Defaults to None.
+            quotas (Optional[Mapping[str, Quota]], optional): Quotas for specific model IDs, replacing the defaults. Defaults to None.
+            lock_file (Optional[Union[str, Path]], optional): A file to keep the buckets in, to share them between processes. Defaults to None.
+        """  # noqa: E501
+        self.default_quota = Quota(requests_per_minute, tokens_per_minute)
+        self.quotas = dict(quotas or {})
+        self.lock_file = Path(lock_file) if lock_file is not None else None
+        self._buckets: Dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def quota(self, model_id: str) -> Quota:
+        """The quota that applies to a model."""
+        return self.quotas.get(model_id, self.default_quota)
+
+    def reserve(self, model_id: str, tokens: int, timeout: Optional[float] = None) -> Reservation:
+        """Wait until the quota of a model allows one more request of `tokens` tokens, and take it.
+
+        Requests estimated at more than a minute of tokens are capped at a minute, so that they
+        can go through at all.
+
+        Args:
+            model_id (str): The model the request is for.
+            tokens (int): The estimated tokens of the request, input and output.
+            timeout (Optional[float], optional): The longest to wait, in seconds. Defaults to None, which waits as long as needed.
+
+        Returns:
+            Reservation: The capacity taken, to pass to `reconcile`.
+
+        Raises:
+            TimeoutError: If the capacity is not available within `timeout`.
+        """  # noqa: E501
+        quota = self.quota(model_id)
+        if quota.tokens_per_minute is not None:
+            tokens = min(tokens, int(quota.tokens_per_minute))
+        if quota == (None, None):
+            return Reservation(model_id, tokens)
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._state() as buckets:
+                bucket = _refill(buckets, model_id, quota)
+                wait = max(
+                    _wait_time(bucket[0], 1, quota.requests_per_minute),
+                    _wait_time(bucket[1], tokens, quota.tokens_per_minute),
+                )
+                if wait <= 0:
+                    bucket[0] -= 1
+                    bucket[1] -= tokens
+                    return Reservation(model_id, tokens)
+            if give_up is not None and time.monotonic() + wait > give_up:
+                raise TimeoutError(f'Rate limit of {model_id} not available within {timeout}s')
+            time.sleep(wait)
+
+    def reconcile(self, reservation: Reservation, tokens_used: int) -> None:
+        """Correct a reservation with the tokens the request actually consumed.
+
+        Tokens reserved but not used are given back, and tokens used beyond the reservation
+        are taken from the bucket, delaying the next requests.
+
+        Args:
+            reservation (Reservation): The reservation of the request.
+            tokens_used (int): The input and output tokens reported by Bedrock.
+        """
+        quota = self.quota(reservation.model_id)
+        if quota.tokens_per_minute is None or tokens_used == reservation.tokens:
+            return
+        with self._state() as buckets:
+            bucket = _refill(buckets, reservation.model_id, quota)
+            bucket[1] = min(bucket[1] + reservation.tokens - tokens_used, quota.tokens_per_minute)
+
+    def reserve_for(
+        self, request: Mapping[str, Any], deadline: Optional[Deadline] = None
+    ) -> Reservation:
+        """Wait until the quota allows a converse request, within its deadline, and take it.
+
+        Callers that must not count the wait as part of the call, such as a circuit breaker,
+        reserve first and pass the reservation to `send` or `stream`.
+
+        Args:
+            request (Mapping[str, Any]): The keyword arguments of the call.
+            deadline (Optional[Deadline], optional): The deadline of the call. Defaults to None, which uses the deadline of the calling thread.
+
+        Returns:
+            Reservation: The capacity taken, to pass to `send`, `stream` or `reconcile`.
+
+        Raises:
+            TimeoutError: If the capacity is not available before the deadline.
+        """  # noqa: E501
+        deadline = deadline or current_deadline()
+        reservation = self.reserve(
+            request['modelId'],
+            estimate_request_tokens(request),
+            timeout=None if deadline is None else deadline.remaining(),
+        )
+        if deadline is not None:
+            try:
+                deadline.check()
+            except TimeoutError:
+                self.reconcile(reservation, 0)
+                raise
+        output_tokens = request.get('inferenceConfig', {}).get('maxTokens', 0)
+        return reservation._replace(output_tokens=min(output_tokens, reservation.tokens))
+
+    def send(
+        self,
+        client: BedrockRuntimeClient,
+        request: Mapping[str, Any],
+        reservation: Optional[Reservation] = None,
+    ) -> ConverseResponseTypeDef:
+        """Call converse within the quota, reconciling with the `usage` of the response.
+
+        Args:
+            client (BedrockRuntimeClient): The client to call.
+            request (Mapping[str, Any]): The keyword arguments of the call.
+            reservation (Optional[Reservation], optional): The capacity already taken for the call with `reserve_for`. Defaults to None, which takes it here.
+
+        Returns:
+            ConverseResponseTypeDef: The response from the model.
+        """  # noqa: E501
+        if reservation is None:
+            reservation = self.reserve_for(request)
+        try:
+            response = client.converse(**request)
+        except BaseException:
+            # a rejected request consumed no tokens
+            self.reconcile(reservation, 0)
+            raise
+        self.reconcile(reservation, usage_tokens(response.get('usage', {})))
+        return response
+
+    def stream(
+        self,
+        client: BedrockRuntimeClient,
+        request: Mapping[str, Any],
+        reservation: Optional[Reservation] = None,
+    ) -> Iterable[ConverseStreamOutputTypeDef]:
+        """Call converse_stream within the quota, reconciling with the `metadata` event.
+
+        Args:
+            client (BedrockRuntimeClient): The client to call.
+            request (Mapping[str, Any]): The keyword arguments of the call.
+            reservation (Optional[Reservation], optional): The capacity already taken for the call with `reserve_for`. Defaults to None, which takes it here.
+
+        Returns:
+            Iterable[ConverseStreamOutputTypeDef]: The events of the stream.
+        """  # noqa: E501
+        if reservation is None:
+            reservation = self.reserve_for(request)
+        try:
+            events = client.converse_stream(**request)['stream']
+        except BaseException:
+            self.reconcile(reservation, 0)
+            raise
+        return self.track_stream(reservation, events)
+
+    def track_stream(
+        self, reservation: Reservation, events: Iterable[ConverseStreamOutputTypeDef]
+    ) -> Generator[ConverseStreamOutputTypeDef, None, None]:
+        """Pass a stream through, reconciling the reservation with its `metadata` event.
+
+        A stream that stops before that event, because it failed or was abandoned by the caller,
+        is reconciled with an estimate instead: the input of the request and the output received
+        so far, or nothing if no event arrived at all.
+        """
+        received = False
+        output_chars = 0
+        reconciled = False
+        try:
+            for event in events:
+                received = True
+                if 'metadata' in event:
+                    self.reconcile(reservation, usage_tokens(event['metadata'].get('usage', {})))
+                    reconciled = True
+                elif 'contentBlockDelta' in event:
+                    delta: Mapping[str, Any] = event['contentBlockDelta']['delta']
+                    output_chars += len(
+                        delta.get('text') or delta.get('toolUse', {}).get('input', '')
+                    )
+                yield event
+        finally:
+            if not reconciled:
+                input_tokens = reservation.tokens - reservation.output_tokens
+                used = input_tokens + output_chars // CHARS_PER_TOKEN if received else 0
+                self.reconcile(reservation, used)
+
+    @contextmanager
+    def _state(self) -> Iterator[Dict[str, list[float]]]:
+        """Hold the buckets, as `{model_id: [requests, tokens, updated]}`, for an update."""
+        with self._lock:
+            if self.lock_file is None:
+                yield self._buckets
+                return
+            import fcntl
+
+            with open(self.lock_file, 'a+') as file:
+                fcntl.flock(file, fcntl.LOCK_EX)
+                try:
+                    file.seek(0)
+                    content = file.read()
+                    buckets = json.loads(content) if content else {}
+                    yield buckets
+                    file.seek(0)
+                    file.truncate()
+                    # no fsync: the lock orders the processes, and buckets need not survive a crash
+                    file.write(json.dumps(buckets))
+                    file.flush()
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def usage_tokens(usage: Mapping[str, Any]) -> int:
+    """The tokens counted against the quota for the `usage` of a response."""
+    if 'totalTokens' in usage:
+        return usage['totalTokens']
+    return usage.get('inputTokens', 0) + usage.get('outputTokens', 0)
+
+
+def _refill(buckets: Dict[str, list[float]], model_id: str, quota: Quota) -> list[float]:
+    """Get the bucket of a model, refilled for the time elapsed since its last update."""
+    # wall-clock time, since the buckets may be shared with other processes
+    now = time.time()
+    bucket = buckets.get(model_id)
+    if bucket is None:
+        bucket = buckets[model_id] = [
+            quota.requests_per_minute or 0.0,
+            quota.tokens_per_minute or 0.0,
+            now,
+        ]
+    elapsed = max(now - bucket[2], 0.0)
+    for slot, per_minute in enumerate(quota[:2]):
+        if per_minute is not None:
+            bucket[slot] = min(bucket[slot] + elapsed * per_minute / 60, per_minute)
+    bucket[2] = now
+    return bucket
+
+
+def _wait_time(available: float, needed: float, per_minute: Optional[float]) -> float:
+    """The seconds until a bucket refilling at `per_minute` holds `needed`."""
+    if per_minute is None or available >= needed:
+        return 0.0
+    return (needed - available) * 60 / per_minute
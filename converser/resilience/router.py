@@ -0,0 +1,268 @@
+"""Routing of Bedrock calls across regions, with failover."""
+
+import threading
+import time
+from botocore.exceptions import (
+    ClientError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+)
+from converser.utils import get_bedrock_client
+from itertools import chain
+from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
+from mypy_boto3_bedrock_runtime.type_defs import (
+    ConverseResponseTypeDef,
+    ConverseStreamOutputTypeDef,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+
+T = TypeVar('T')
+
+# error codes meaning the region cannot serve the request right now, but another one might
+FAILOVER_ERROR_CODES = frozenset({'ThrottlingException', 'ServiceUnavailableException'})
+
+# a decayed error rate below this counts as none, so a recovered region ties with healthy ones
+_NEGLIGIBLE_ERROR_RATE = 0.01
+
+
+class RegionHealth(NamedTuple):
+    """The health of a region, as seen by a RegionRouter.
+
+    `latency` is the moving average of successful converse calls, and `first_event_latency`
+    that of the time to the first event of successful streams, in seconds, or None before the
+    first one. `error_rate` is the moving average of failovers, between 0 and 1, decayed to now.
+    """
+
+    latency: Optional[float]
+    error_rate: float
+    requests: int
+    failures: int
+    first_event_latency: Optional[float] = None
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.latency: Optional[float] = None
+        self.first_event_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.updated_at = time.monotonic()
+        self.requests = 0
+        self.failures = 0
+
+
+class _RegionalEvents:
+    """The botocore event hooks of every regional client, registered on all of them at once."""
+
+    def __init__(self, clients: Iterable[Any]) -> None:
+        self._emitters = [
+            events
+            for client in clients
+            if (events := getattr(getattr(client, 'meta', None), 'events', None)) is not None
+        ]
+
+    def register(self, event_name: str, handler: Callable[..., Any], **kwargs: Any) -> None:
+        """Register a handler on every regional client."""
+        for events in self._emitters:
+            events.register(event_name, handler, **kwargs)
+
+    def unregister(self, event_name: str, handler: Any = None, **kwargs: Any) -> None:
+        """Unregister a handler from every regional client."""
+        for events in self._emitters:
+            events.unregister(event_name, handler, **kwargs)
+
+
+class _RegionalMeta(NamedTuple):
+    events: _RegionalEvents
+
+
+class RegionRouter:
+    """A drop-in replacement for a bedrock-runtime client that spreads calls over regions.
+
+    Each call goes to the healthiest region serving the model: the one with the lowest moving
+    average latency, penalized by its moving average error rate. When a region answers with a
+    throttling or service-unavailable error, or cannot be reached, the call is retried in the
+    next region. Other errors, such as validation errors, are raised as they are.
+
+    Converse calls are ranked on the latency of whole calls, and streams on the time to their
+    first event, each with its own moving average. The error rate of a region is shared, and
+    halves every `error_half_life` seconds, so a region that was demoted, and so no longer gets
+    calls, is tried again once its failures are old enough.
+
+    Streams fail over until their first event arrives; after that, errors are raised to the
+    caller since part of the reply has already been consumed.
+
+    Pass it as the `client` of Converse or AsyncConverse. Its `meta.events` registers botocore
+    event hooks, such as those of deadlines and profilers, on the client of every region.
+    """
+
+    def __init__(
+        self,
+        regions: Union[Sequence[str], Mapping[str, BedrockRuntimeClient]],
+        model_regions: Optional[Mapping[str, Sequence[str]]] = None,
+        smoothing: float = 0.2,
+        error_penalty: float = 10.0,
+        failover_error_codes: frozenset[str] = FAILOVER_ERROR_CODES,
+        error_half_life: float = 30.0,
+    ) -> None:
+        """Initialize the RegionRouter class.
+
+        Args:
+            regions (Union[Sequence[str], Mapping[str, BedrockRuntimeClient]]): The regions to use, in order of preference, or a client per region. Clients created for region names retry a call only once before failing over.
+            model_regions (Optional[Mapping[str, Sequence[str]]], optional): The regions serving specific model IDs. Other models may use every region. Defaults to None.
+            smoothing (float, optional): The weight of the latest call in the moving averages. Defaults to 0.2.
+            error_penalty (float, optional): How much the error rate inflates the latency of a region when ranking them. Defaults to 10.0.
+            failover_error_codes (frozenset[str], optional): The error codes that make a call move to the next region. Defaults to FAILOVER_ERROR_CODES.
+            error_half_life (float, optional): The number of seconds for the error rate of a region to halve. Defaults to 30.0.
+        """  # noqa: E501
+        if not regions:
+            raise ValueError('At least one region is required')
+        if not 0 < smoothing <= 1:
+            raise ValueError('smoothing must be in (0, 1]')
+        if error_half_life <= 0:
+            raise ValueError('error_half_life must be positive')
+        self.clients: Dict[str, BedrockRuntimeClient] = (
+            dict(regions)
+            if isinstance(regions, Mapping)
+            # failing over beats retrying in a throttled region, so only retry once
+            else {region: get_bedrock_client(region, max_attempts=2) for region in regions}
+        )
+        self.model_regions = {
+            model_id: list(model_region_list)
+            for model_id, model_region_list in (model_regions or {}).items()
+        }
+        for model_id, model_region_list in self.model_regions.items():
+            unknown = set(model_region_list) - set(self.clients)
+            if not model_region_list or unknown:
+                raise ValueError(f'Invalid regions for {model_id}: {model_region_list}')
+        self.smoothing = smoothing
+        self.error_penalty = error_penalty
+        self.failover_error_codes = failover_error_codes
+        self.error_half_life = error_half_life
+        self._stats = {region: _Stats() for region in self.clients}
+        self._lock = threading.Lock()
+        self.meta = _RegionalMeta(_RegionalEvents(self.clients.values()))
+
+    def health(self) -> Dict[str, RegionHealth]:
+        """The current health of every region."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                region: RegionHealth(
+                    stats.latency,
+                    self._error_rate(stats, now),
+                    stats.requests,
+                    stats.failures,
+                    stats.first_event_latency,
+                )
+                for region, stats in self._stats.items()
+            }
+
+    def ranked_regions(self, model_id: str, stream: bool = False) -> List[str]:
+        """The regions serving a model, healthiest first, for converse calls or for streams."""
+        regions = self.model_regions.get(model_id, list(self.clients))
+        now = time.monotonic()
+        with self._lock:
+            latencies = {region: self._latency(self._stats[region], stream) for region in regions}
+            # regions without a measurement yet are assumed to be as fast as the best one
+            default_latency = min(
+                (latency for latency in latencies.values() if latency is not None), default=0.0
+            )
+
+            def score(region: str) -> float:
+                stats = self._stats[region]
+                latency = latencies[region]
+                latency = default_latency if latency is None else latency
+                error_rate = self._error_rate(stats, now)
+                return latency * (1 + self.error_penalty * error_rate) + error_rate
+
+            # sorted is stable, so ties keep the order of preference
+            return sorted(regions, key=score)
+
+    def converse(self, **kwargs: Any) -> ConverseResponseTypeDef:
+        """Call converse in the healthiest region, failing over to the others."""
+        return self._call(kwargs['modelId'], lambda client: client.converse(**kwargs))
+
+    def converse_stream(self, **kwargs: Any) -> Dict[str, Any]:
+        """Call converse_stream in the healthiest region, failing over to the others."""
+
+        def open_stream(client: BedrockRuntimeClient) -> Dict[str, Any]:
+            response: Dict[str, Any] = dict(client.converse_stream(**kwargs))
+            events: Iterator[ConverseStreamOutputTypeDef] = iter(response['stream'])
+            # throttling of a stream surfaces with its first event, so wait for it here
+            first_event = next(events, None)
+            response['stream'] = events if first_event is None else chain((first_event,), events)
+            return response
+
+        return self._call(kwargs['modelId'], open_stream, stream=True)
+
+    def _call(
+        self, model_id: str, call: Callable[[BedrockRuntimeClient], T], stream: bool = False
+    ) -> T:
+        regions = self.ranked_regions(model_id, stream)
+        for attempt, region in enumerate(regions):
+            start = time.perf_counter()
+            try:
+                result = call(self.clients[region])
+            except (ClientError, EndpointConnectionError, ConnectTimeoutError) as error:
+                if not self._is_failover_error(error):
+                    raise
+                self._record(region, None, stream)
+                if attempt == len(regions) - 1:
+                    raise
+            else:
+                self._record(region, time.perf_counter() - start, stream)
+                return result
+        raise AssertionError('unreachable')  # pragma: no cover
+
+    def _is_failover_error(self, error: Exception) -> bool:
+        # errors raised by an event stream are ClientErrors too
+        if isinstance(error, ClientError):
+            return error.response.get('Error', {}).get('Code') in self.failover_error_codes
+        return True
+
+    def _record(self, region: str, latency: Optional[float], stream: bool = False) -> None:
+        """Update the moving averages of a region; a latency of None records a failure.
+
+        The latency of a stream is the time to its first event.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats[region]
+            stats.requests += 1
+            failed = latency is None
+            stats.failures += failed
+            error_rate = self._error_rate(stats, now)
+            stats.error_rate = error_rate + self.smoothing * (failed - error_rate)
+            stats.updated_at = now
+            if latency is not None:
+                average = self._latency(stats, stream)
+                average = (
+                    latency if average is None else average + self.smoothing * (latency - average)
+                )
+                if stream:
+                    stats.first_event_latency = average
+                else:
+                    stats.latency = average
+
+    def _latency(self, stats: _Stats, stream: bool) -> Optional[float]:
+        """The moving average latency of a region for streams, or for converse calls."""
+        return stats.first_event_latency if stream else stats.latency
+
+    def _error_rate(self, stats: _Stats, now: float) -> float:
+        """The error rate of a region, decayed for the time since it was last updated."""
+        error_rate = stats.error_rate * 0.5 ** ((now - stats.updated_at) / self.error_half_life)
+        return 0.0 if error_rate < _NEGLIGIBLE_ERROR_RATE else error_rate
@@ -1,6 +1,35 @@
 """Streaming module for converser."""
 
-from .streaming import ConverserStreamOutputTypeDefEnd, stream_messages
+from .events import (
+    StreamAccumulator,
+    ToolUseInputTypeDef,
+    events_from_response,
+    response_from_events,
+)
+from .partial_json import PartialJSONParser
+from .sinks import CallbackSink, FileSink, QueueSink, StdoutSink, StreamSink, TextSink
+from .streaming import (
+    ConverserStreamOutputTypeDefEnd,
+    converse_stream,
+    process_stream,
+    stream_messages,
+)
 
 
-__all__ = ['stream_messages', 'ConverserStreamOutputTypeDefEnd']
+__all__ = [
+    'stream_messages',
+    'process_stream',
+    'converse_stream',
+    'ConverserStreamOutputTypeDefEnd',
+    'StreamAccumulator',
+    'ToolUseInputTypeDef',
+    'PartialJSONParser',
+    'StreamSink',
+    'TextSink',
+    'StdoutSink',
+    'FileSink',
+    'QueueSink',
+    'CallbackSink',
+    'events_from_response',
+    'response_from_events',
+]
@@ -0,0 +1,220 @@
+"""Conversions between ConverseStream events and Converse responses."""
+
+import json
+from converser.streaming.partial_json import PartialJSONParser
+from mypy_boto3_bedrock_runtime.type_defs import (
+    ConverseResponseTypeDef,
+    ConverseStreamOutputTypeDef,
+)
+from typing import Any, Dict, Generator, Iterable, List, Optional, TypedDict
+
+
+class ToolUseInputTypeDef(TypedDict):
+    """The arguments of a toolUse block, as far as they have been received."""
+
+    contentBlockIndex: int
+    toolUseId: str
+    name: str
+    input: Any
+    complete: bool
+
+
+class StreamAccumulator:
+    """Rebuild the equivalent Converse response from the events of a stream.
+
+    Feed it every event as it arrives. Text and reasoning deltas are joined per content block,
+    and toolUse input fragments are parsed incrementally as they arrive. A toolUse block that
+    stops without any input, as for a tool without arguments, has an empty object as its input.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the StreamAccumulator class."""
+        self._blocks: Dict[int, Dict[str, Any]] = {}
+        self._parts: Dict[int, List[str]] = {}
+        self._parsers: Dict[int, PartialJSONParser] = {}
+        self.stop_reason: Optional[str] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self.metrics: Optional[Dict[str, Any]] = None
+
+    def feed(self, event: ConverseStreamOutputTypeDef) -> None:
+        """Record one event.
+
+        Raises:
+            ValueError: If the input of a toolUse block is not valid JSON.
+        """
+        if 'contentBlockDelta' in event:
+            delta_event = event['contentBlockDelta']
+            index = delta_event['contentBlockIndex']
+            delta = delta_event['delta']
+            if 'toolUse' in delta:
+                self._blocks.setdefault(index, {'toolUse': {}})
+                self._parser(index).feed(delta['toolUse']['input'])
+            elif 'reasoningContent' in delta:
+                self._feed_reasoning(index, delta['reasoningContent'])
+            else:
+                self._blocks.setdefault(index, {'text': None})
+                self._parts.setdefault(index, []).append(delta.get('text', ''))
+        elif 'contentBlockStart' in event:
+            start = event['contentBlockStart']
+            if 'toolUse' in start['start']:
+                index = start['contentBlockIndex']
+                self._blocks[index] = {'toolUse': dict(start['start']['toolUse'])}
+                self._parsers[index] = PartialJSONParser()
+        elif 'contentBlockStop' in event:
+            parser = self._parsers.get(event['contentBlockStop']['contentBlockIndex'])
+            if parser is not None and parser.value() is None:
+                parser.feed('{}')
+        elif 'messageStop' in event:
+            self.stop_reason = event['messageStop']['stopReason']
+        elif 'metadata' in event:
+            self.usage = dict(event['metadata'].get('usage', {}))
+            self.metrics = dict(event['metadata'].get('metrics', {}))
+
+    def _feed_reasoning(self, index: int, delta: Dict[str, Any]) -> None:
+        reasoning = self._blocks.setdefault(index, {'reasoningContent': {}})['reasoningContent']
+        for key, value in delta.items():
+            if key == 'text':
+                self._parts.setdefault(index, []).append(value)
+            elif key == 'redactedContent':
+                reasoning[key] = reasoning.get(key, b'') + value
+            else:
+                reasoning[key] = value
+
+    def tool_use_input(self, index: int) -> Optional[ToolUseInputTypeDef]:
+        """The arguments received so far for the toolUse block at `index`, if it is one.
+
+        The partial input is updated in place as more fragments arrive.
+        """
+        block = self._blocks.get(index)
+        if block is None or 'toolUse' not in block:
+            return None
+        parser = self._parser(index)
+        return {
+            'contentBlockIndex': index,
+            'toolUseId': block['toolUse'].get('toolUseId', ''),
+            'name': block['toolUse'].get('name', ''),
+            'input': {} if parser.value() is None else parser.value(),
+            'complete': parser.complete,
+        }
+
+    def content(self) -> List[Dict[str, Any]]:
+        """The content blocks received so far, in block order."""
+        content: List[Dict[str, Any]] = []
+        for index in sorted(self._blocks):
+            if 'toolUse' in self._blocks[index]:
+                tool_use = dict(self._blocks[index]['toolUse'])
+                tool_use['input'] = self.tool_use_input(index)['input']  # type: ignore[index]
+                content.append({'toolUse': tool_use})
+            elif 'reasoningContent' in self._blocks[index]:
+                content.append({'reasoningContent': self._reasoning(index)})
+            else:
+                content.append({'text': ''.join(self._parts.get(index, ()))})
+        return content
+
+    def _reasoning(self, index: int) -> Dict[str, Any]:
+        """The reasoning block at `index`, as it appears in a Converse response."""
+        reasoning = dict(self._blocks[index]['reasoningContent'])
+        if index not in self._parts and 'redactedContent' in reasoning:
+            return {'redactedContent': reasoning['redactedContent']}
+        reasoning.pop('redactedContent', None)
+        return {'reasoningText': {'text': ''.join(self._parts.get(index, ())), **reasoning}}
+
+    def _parser(self, index: int) -> PartialJSONParser:
+        parser = self._parsers.get(index)
+        if parser is None:
+            parser = self._parsers[index] = PartialJSONParser()
+        return parser
+
+    def response(self) -> ConverseResponseTypeDef:
+        """The Converse response equivalent to the events received."""
+        response: Dict[str, Any] = {
+            'output': {'message': {'role': 'assistant', 'content': self.content()}},
+            'stopReason': self.stop_reason,
+        }
+        if self.usage is not None:
+            response['usage'] = self.usage
+        if self.metrics is not None:
+            response['metrics'] = self.metrics
+        return response  # type: ignore[return-value]
+
+
+def response_from_events(events: Iterable[ConverseStreamOutputTypeDef]) -> ConverseResponseTypeDef:
+    """Rebuild the equivalent Converse response from a complete stream of events."""
+    accumulator = StreamAccumulator()
+    for event in events:
+        accumulator.feed(event)
+    return accumulator.response()
+
+
+def events_from_response(
+    response: ConverseResponseTypeDef, chunk_size: int = 32
+) -> Generator[ConverseStreamOutputTypeDef, None, None]:
+    """Replay a Converse response as the events ConverseStream would have sent.
+
+    Text and reasoning text are split into `contentBlockDelta` events of up to `chunk_size`
+    characters, and toolUse input and redacted reasoning are sent in a single delta.
+
+    Args:
+        response (ConverseResponseTypeDef): The response to replay.
+        chunk_size (int, optional): The maximum number of characters per text delta. Defaults to 32.
+    """  # noqa: E501
+    yield {'messageStart': {'role': 'assistant'}}
+    for index, block in enumerate(response['output']['message']['content']):  # type: ignore[typeddict-item]
+        if 'toolUse' in block:
+            tool_use = block['toolUse']
+            yield {
+                'contentBlockStart': {
+                    'start': {
+                        'toolUse': {'toolUseId': tool_use['toolUseId'], 'name': tool_use['name']}
+                    },
+                    'contentBlockIndex': index,
+                }
+            }
+            yield {
+                'contentBlockDelta': {
+                    'delta': {'toolUse': {'input': json.dumps(tool_use['input'])}},
+                    'contentBlockIndex': index,
+                }
+            }
+        elif 'text' in block:
+            for chunk in _chunks(block['text'], chunk_size):
+                yield {'contentBlockDelta': {'delta': {'text': chunk}, 'contentBlockIndex': index}}
+        elif 'reasoningContent' in block:
+            for delta in _reasoning_deltas(block['reasoningContent'], chunk_size):
+                yield {
+                    'contentBlockDelta': {
+                        'delta': {'reasoningContent': delta},
+                        'contentBlockIndex': index,
+                    }
+                }
+        else:
+            continue
+        yield {'contentBlockStop': {'contentBlockIndex': index}}
+    yield {'messageStop': {'stopReason': response['stopReason']}}
+    if 'usage' in response:
+        yield {
+            'metadata': {
+                'usage': response['usage'],
+                'metrics': response.get('metrics', {'latencyMs': 0}),
+            }
+        }  # type: ignore[misc]
+
+
+def _chunks(text: str, chunk_size: int) -> Generator[str, None, None]:
+    """Split text into chunks of up to `chunk_size` characters, at least one."""
+    for start in range(0, max(len(text), 1), chunk_size):
+        yield text[start : start + chunk_size]
+
+
+def _reasoning_deltas(
+    reasoning: Dict[str, Any], chunk_size: int
+) -> Generator[Dict[str, Any], None, None]:
+    """The deltas of a reasoning block: its text in chunks, then its signature."""
+    if 'redactedContent' in reasoning:
+        yield {'redactedContent': reasoning['redactedContent']}
+        return
+    reasoning_text = reasoning.get('reasoningText', {})
+    for chunk in _chunks(reasoning_text.get('text', ''), chunk_size):
+        yield {'text': chunk}
+    if 'signature' in reasoning_text:
+        yield {'signature': reasoning_text['signature']}
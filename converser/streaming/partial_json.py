@@ -0,0 +1,223 @@
+"""Incremental parsing of JSON documents that arrive in fragments."""
+
+import json
+from typing import Any, Dict, List, Optional, Union
+
+
+_ESCAPES = {
+    '"': '"',
+    '\\': '\\',
+    '/': '/',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+_WHITESPACE = frozenset(' \t\r\n')
+_TOKEN_START = frozenset('-0123456789tfn')
+_TOKEN_CHARS = frozenset('+-.0123456789Eaeflnrstu')
+
+# what the parser expects next, outside of strings and tokens
+_VALUE = 0
+_VALUE_OR_END = 1
+_KEY = 2
+_KEY_OR_END = 3
+_COLON = 4
+_AFTER_VALUE = 5
+_DONE = 6
+
+
+class PartialJSONParser:
+    """Parse a JSON document fed in fragments, exposing the value parsed so far at any point.
+
+    `feed` continues where the previous fragment stopped, so every character is examined once
+    however many fragments there are. `value` includes open objects, arrays and strings as
+    they are so far; numbers, `true`, `false` and `null` appear once complete. The partial
+    value is updated in place by later fragments: copy it to keep a snapshot.
+
+    The pieces of an open string are only joined when its value is asked for, and are merged
+    into one then, so each fragment adds a single concatenation rather than a join of every
+    piece received so far.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the PartialJSONParser class."""
+        self._root: Any = None
+        self._stack: List[Union[Dict[str, Any], List[Any]]] = []
+        # per open object, the key whose value comes next
+        self._keys: List[Optional[str]] = []
+        self._state = _VALUE
+        self._chars: Optional[List[str]] = None
+        self._string_is_key = False
+        # whether the open string has pieces that are not in the value yet
+        self._string_is_stale = False
+        self._escape: Optional[str] = None
+        self._token: List[str] = []
+
+    @property
+    def complete(self) -> bool:
+        """Whether a whole document has been parsed."""
+        return self._state == _DONE
+
+    def value(self) -> Any:
+        """The value parsed so far, None before anything has been parsed."""
+        if self._string_is_stale:
+            chars: List[str] = self._chars  # type: ignore[assignment]
+            string = ''.join(chars)
+            chars[:] = [string]
+            self._place(string, new=False)
+            self._string_is_stale = False
+        return self._root
+
+    def result(self) -> Any:
+        """The value of the whole document.
+
+        Raises:
+            ValueError: If the document is incomplete.
+        """
+        if self._token:
+            self._end_token()
+        if self._state != _DONE:
+            raise ValueError('Incomplete JSON document')
+        return self._root
+
+    def feed(self, fragment: str) -> Any:
+        """Parse the next fragment of the document.
+
+        Args:
+            fragment (str): The text following the previous fragments.
+
+        Returns:
+            Any: The value parsed so far.
+
+        Raises:
+            ValueError: If the document is not valid JSON.
+        """
+        index, length = 0, len(fragment)
+        while index < length:
+            if self._chars is not None:
+                index = self._scan_string(fragment, index)
+                continue
+            char = fragment[index]
+            index += 1
+            if self._token:
+                if char in _TOKEN_CHARS:
+                    self._token.append(char)
+                    continue
+                self._end_token()
+            if char not in _WHITESPACE:
+                self._structural(char)
+        if self._chars is not None and not self._string_is_key:
+            self._string_is_stale = True
+        return self.value()
+
+    def _structural(self, char: str) -> None:
+        state = self._state
+        if state in (_VALUE, _VALUE_OR_END) and not (char == ']' and state == _VALUE_OR_END):
+            self._start_value(char)
+        elif state in (_KEY, _KEY_OR_END) and char == '"':
+            self._chars, self._string_is_key = [], True
+        elif state == _COLON and char == ':':
+            self._state = _VALUE
+        elif state == _AFTER_VALUE and char == ',':
+            self._state = _KEY if isinstance(self._stack[-1], dict) else _VALUE
+        elif (state == _KEY_OR_END and char == '}') or (state == _VALUE_OR_END and char == ']'):
+            self._close()
+        elif state == _AFTER_VALUE and char == ('}' if isinstance(self._stack[-1], dict) else ']'):
+            self._close()
+        else:
+            raise ValueError(f'Unexpected character {char!r} in JSON document')
+
+    def _start_value(self, char: str) -> None:
+        if char == '{':
+            self._open({}, _KEY_OR_END)
+        elif char == '[':
+            self._open([], _VALUE_OR_END)
+        elif char == '"':
+            self._chars, self._string_is_key = [], False
+            self._place('')
+        elif char in _TOKEN_START:
+            self._token.append(char)
+        else:
+            raise ValueError(f'Unexpected character {char!r} in JSON document')
+
+    def _scan_string(self, fragment: str, index: int) -> int:
+        """Consume the open string from `index`, returning where parsing continues."""
+        chars: List[str] = self._chars  # type: ignore[assignment]
+        if self._escape is not None:
+            self._escape += fragment[index]
+            if self._escape[0] != 'u':
+                if self._escape not in _ESCAPES:
+                    raise ValueError(f'Invalid escape \\{self._escape} in JSON document')
+                chars.append(_ESCAPES[self._escape])
+            elif len(self._escape) == 5:
+                code = int(self._escape[1:], 16)
+                previous = chars[-1][-1:] if chars else ''
+                if 0xDC00 <= code <= 0xDFFF and previous and 0xD800 <= ord(previous) < 0xDC00:
+                    # the second half of a surrogate pair
+                    chars[-1] = chars[-1][:-1]
+                    code = 0x10000 + ((ord(previous) - 0xD800) << 10) + (code - 0xDC00)
+                chars.append(chr(code))
+            else:
+                return index + 1
+            self._escape = None
+            return index + 1
+        quote = fragment.find('"', index)
+        backslash = fragment.find('\\', index, None if quote < 0 else quote)
+        if backslash >= 0:
+            if backslash > index:
+                chars.append(fragment[index:backslash])
+            self._escape = ''
+            return backslash + 1
+        if quote < 0:
+            chars.append(fragment[index:])
+            return len(fragment)
+        chars.append(fragment[index:quote])
+        string = ''.join(chars)
+        self._chars = None
+        self._string_is_stale = False
+        if self._string_is_key:
+            self._keys[-1] = string
+            self._state = _COLON
+        else:
+            self._place(string, new=False)
+            self._after_value()
+        return quote + 1
+
+    def _end_token(self) -> None:
+        token = ''.join(self._token)
+        self._token = []
+        try:
+            value = json.loads(token)
+        except json.JSONDecodeError:
+            raise ValueError(f'Invalid token {token!r} in JSON document') from None
+        self._place(value)
+        self._after_value()
+
+    def _place(self, value: Any, new: bool = True) -> None:
+        """Put a value in the open container, replacing the last one unless it is new."""
+        if not self._stack:
+            self._root = value
+            return
+        container = self._stack[-1]
+        if isinstance(container, dict):
+            container[self._keys[-1]] = value  # type: ignore[index]
+        elif new:
+            container.append(value)
+        else:
+            container[-1] = value
+
+    def _open(self, container: Union[Dict[str, Any], List[Any]], state: int) -> None:
+        self._place(container)
+        self._stack.append(container)
+        self._keys.append(None)
+        self._state = state
+
+    def _close(self) -> None:
+        self._stack.pop()
+        self._keys.pop()
+        self._after_value()
+
+    def _after_value(self) -> None:
+        self._state = _AFTER_VALUE if self._stack else _DONE
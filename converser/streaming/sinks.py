@@ -0,0 +1,215 @@
+"""Destinations for the output of a stream, driven by `process_stream`."""
+
+import os
+import queue
+import sys
+import time
+from mypy_boto3_bedrock_runtime.type_defs import ConverseStreamOutputTypeDef, MessageUnionTypeDef
+from typing import Any, Callable, List, Optional, TextIO
+
+
+class StreamSink:
+    """A destination for the output of streams.
+
+    Subclasses override the hooks they need: `write` receives every piece of text,
+    `event` every event with the final message on the last one, and `end` is called once the
+    stream is over, with the error that ended it, if any. The stream only calls the hooks a
+    sink overrides. A sink can be attached to several streams in turn; closing it is up to
+    its owner.
+    """
+
+    def write(self, text: str) -> None:
+        """Receive the next piece of text."""
+
+    def event(
+        self, event: ConverseStreamOutputTypeDef, final_message: Optional[MessageUnionTypeDef]
+    ) -> None:
+        """Receive the next event, and the final message along with the `messageStop` event."""
+
+    def end(self, error: Optional[BaseException]) -> None:
+        """Receive the end of the stream, and the error that ended it, if any."""
+
+    def close(self) -> None:
+        """Release the resources of the sink."""
+
+    def overrides(self, hook: str) -> bool:
+        """Whether the sink overrides a hook of StreamSink."""
+        return getattr(type(self), hook) is not getattr(StreamSink, hook)
+
+
+class TextSink(StreamSink):
+    """Write the text of streams to a text file, in batches.
+
+    Text is buffered and written once `max_buffer` characters are pending or `flush_interval`
+    seconds have passed since the last write, and when a content block or the stream ends,
+    which saves a write and flush per delta without holding text back while the model pauses
+    between blocks.
+    """
+
+    def __init__(
+        self, stream: TextIO, flush_interval: float = 0.05, max_buffer: int = 4096
+    ) -> None:
+        """Initialize the TextSink class.
+
+        Args:
+            stream (TextIO): The file to write to.
+            flush_interval (float, optional): The maximum number of seconds text stays in the buffer while more arrives. Defaults to 0.05.
+            max_buffer (int, optional): The number of pending characters that triggers a write. Defaults to 4096.
+        """  # noqa: E501
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[str] = []
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+
+    def write(self, text: str) -> None:
+        """Buffer text, writing the buffer out when it is full or old enough."""
+        self._buffer.append(text)
+        self._pending += len(text)
+        if (
+            self._pending >= self.max_buffer
+            or time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def event(
+        self, event: ConverseStreamOutputTypeDef, final_message: Optional[MessageUnionTypeDef]
+    ) -> None:
+        """Write out the buffered text when a content block or the message stops."""
+        if self._buffer and ('contentBlockStop' in event or 'messageStop' in event):
+            self.flush()
+
+    def end(self, error: Optional[BaseException]) -> None:
+        """Write out the rest of the text."""
+        self.flush()
+
+    def flush(self) -> None:
+        """Write out the buffered text."""
+        if self._buffer:
+            self.stream.write(''.join(self._buffer))
+            self._buffer.clear()
+            self._pending = 0
+        self.stream.flush()
+        self._flushed_at = time.monotonic()
+
+    def close(self) -> None:
+        """Write out the buffered text."""
+        self.flush()
+
+
+class StdoutSink(TextSink):
+    """Print the text of streams in batches; `stdout=True` attaches one to a stream."""
+
+    def __init__(self, flush_interval: float = 0.05, max_buffer: int = 4096) -> None:
+        """Initialize the StdoutSink class.
+
+        Args:
+            flush_interval (float, optional): The maximum number of seconds text stays in the buffer while more arrives. Defaults to 0.05.
+            max_buffer (int, optional): The number of pending characters that triggers a write. Defaults to 4096.
+        """  # noqa: E501
+        super().__init__(sys.stdout, flush_interval=flush_interval, max_buffer=max_buffer)
+
+
+class FileSink(TextSink):
+    """Append the text of streams to a file, as a write-ahead log of the reply.
+
+    With `fsync`, every write of the buffer is forced to disk, so the text received so far
+    survives a crash of the process or the machine.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync: bool = False,
+        flush_interval: float = 0.05,
+        max_buffer: int = 4096,
+    ) -> None:
+        """Initialize the FileSink class.
+
+        Args:
+            path (str): The file to append to, created if needed.
+            fsync (bool, optional): Whether to force every write to disk. Defaults to False.
+            flush_interval (float, optional): The maximum number of seconds text stays in the buffer while more arrives. Defaults to 0.05.
+            max_buffer (int, optional): The number of pending characters that triggers a write. Defaults to 4096.
+        """  # noqa: E501
+        super().__init__(
+            open(path, 'a', encoding='utf-8'),
+            flush_interval=flush_interval,
+            max_buffer=max_buffer,
+        )
+        self.fsync = fsync
+
+    def flush(self) -> None:
+        """Write out the buffered text, forcing it to disk with `fsync`."""
+        super().flush()
+        if self.fsync:
+            os.fsync(self.stream.fileno())
+
+    def close(self) -> None:
+        """Write out the buffered text and close the file."""
+        if not self.stream.closed:
+            self.flush()
+            self.stream.close()
+
+
+class QueueSink(StreamSink):
+    """Hand the events of streams to another thread through a queue.
+
+    Every `(event, final_message)` pair is put on `queue`, followed by None when the stream
+    ends, or by the exception that ended it.
+    """
+
+    def __init__(self, maxsize: int = 0) -> None:
+        """Initialize the QueueSink class.
+
+        Args:
+            maxsize (int, optional): The maximum number of items in the queue, zero for no limit. A full queue blocks the stream. Defaults to 0.
+        """  # noqa: E501
+        self.queue: queue.Queue = queue.Queue(maxsize)
+
+    def event(
+        self, event: ConverseStreamOutputTypeDef, final_message: Optional[MessageUnionTypeDef]
+    ) -> None:
+        """Put the event on the queue."""
+        self.queue.put((event, final_message))
+
+    def end(self, error: Optional[BaseException]) -> None:
+        """Put the end marker on the queue."""
+        self.queue.put(error)
+
+
+class CallbackSink(StreamSink):
+    """Call a function with the text, or with every event, of streams."""
+
+    def __init__(
+        self,
+        on_text: Optional[Callable[[str], Any]] = None,
+        on_event: Optional[
+            Callable[[ConverseStreamOutputTypeDef, Optional[MessageUnionTypeDef]], Any]
+        ] = None,
+    ) -> None:
+        """Initialize the CallbackSink class.
+
+        Args:
+            on_text (Optional[Callable[[str], Any]], optional): Called with every piece of text. Defaults to None.
+            on_event (Optional[Callable[[ConverseStreamOutputTypeDef, Optional[MessageUnionTypeDef]], Any]], optional): Called with every event and the final message, if any. Defaults to None.
+        """  # noqa: E501
+        self.on_text = on_text
+        self.on_event = on_event
+
+    def overrides(self, hook: str) -> bool:
+        """Whether a callback is set for the hook."""
+        if hook == 'write':
+            return self.on_text is not None
+        return hook == 'event' and self.on_event is not None
+
+    def write(self, text: str) -> None:
+        """Call `on_text`."""
+        self.on_text(text)  # type: ignore[misc]
+
+    def event(
+        self, event: ConverseStreamOutputTypeDef, final_message: Optional[MessageUnionTypeDef]
+    ) -> None:
+        """Call `on_event`."""
+        self.on_event(event, final_message)  # type: ignore[misc]
@@ -1,7 +1,13 @@
 """This module contains the functions that are used to interact with the Bedrock Runtime API."""
 
+from contextlib import nullcontext
 from converser.conversation_memory.memory import Memory
 from converser.models.models import ConverseStreamingKeys, InferenceConfig
+from converser.resilience import CircuitBreaker, CircuitOpenError, Deadline, RateLimiter
+from converser.streaming.events import StreamAccumulator, ToolUseInputTypeDef
+from converser.streaming.sinks import StdoutSink, StreamSink
+from converser.utils.profiler import Profiler
+from functools import partial
 from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
 from mypy_boto3_bedrock_runtime.type_defs import (
     ConverseStreamOutputTypeDef,
@@ -10,13 +16,33 @@ from mypy_boto3_bedrock_runtime.type_defs import (
     MessageUnionTypeDef,
     SystemContentBlockTypeDef,
 )
-from typing import Any, Generator, List, Optional, Sequence, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    cast,
+)
+from typing_extensions import NotRequired
+
+
+_STREAMING_KEYS = frozenset(key.value for key in ConverseStreamingKeys)
 
 
 class ConverserStreamOutputTypeDefEnd(ConverseStreamOutputTypeDef):
-    """Extend the ConverseStreamOutputTypeDef with the 'done' key."""
+    """Extend the ConverseStreamOutputTypeDef with the 'done' key.
+
+    The deltas and the stop of a toolUse block also carry `toolUseInput`, the arguments parsed
+    so far; once `complete` is set, the tool can be run before the rest of the reply arrives.
+    """
 
     done: bool
+    toolUseInput: NotRequired[ToolUseInputTypeDef]
 
 
 def stream_messages(
@@ -27,45 +53,172 @@ def stream_messages(
     memory: Optional[Memory] = None,
     inference_config: InferenceConfig = InferenceConfig(),
     stdout: Optional[bool] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    timeout: Optional[float] = None,
+    sinks: Sequence[StreamSink] = (),
+    profiler: Optional[Profiler] = None,
+    request_template: Optional[Mapping[str, Any]] = None,
+) -> Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any]:
+    """Stream messages to the model.
+
+    `timeout` bounds the whole stream, in seconds from the call, retries included.
+    The text and events are also sent to `sinks`, and `profiler` times the phases. A
+    `request_template`, such as `Converse.request_template()`, is used instead of building
+    the request from `model_id`, `system_prompt` and `inference_config`.
+    """
+    with profiler.phase('build_request') if profiler else nullcontext():
+        if request_template is not None:
+            request: Dict[str, Any] = {**request_template, 'messages': messages}
+        else:
+            request = {
+                'modelId': model_id,
+                'messages': messages,
+                'system': system_prompt,
+                'inferenceConfig': cast(
+                    InferenceConfigurationTypeDef, inference_config.model_dump()
+                ),
+            }
+
+    deadline = Deadline(timeout) if timeout is not None else None
+    opener = partial(converse_stream, client, request, deadline, rate_limiter, circuit_breaker)
+    process = partial(process_stream, messages=messages, memory=memory, stdout=stdout, sinks=sinks)
+    if profiler is None:
+        yield from process(opener())
+    else:
+        yield from profiler.stream('stream_messages', opener, process)
+
+
+def converse_stream(
+    client: BedrockRuntimeClient,
+    request: Mapping[str, Any],
+    deadline: Optional[Deadline] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+) -> Generator[ConverseStreamOutputTypeDef, None, None]:
+    """Call converse_stream through a rate limiter, circuit breaker and deadline.
+
+    The stream is opened when the first event is requested. The quota is reserved before the
+    circuit breaker is entered, since waiting for it, or running out of time while waiting,
+    sends nothing to the model. The deadline is inside the breaker, so that a stream timing
+    out counts as a failure.
+    """
+    reservation = None if rate_limiter is None else rate_limiter.reserve_for(request, deadline)
+
+    def open_stream() -> Iterable[ConverseStreamOutputTypeDef]:
+        if rate_limiter is None:
+            response: ConverseStreamResponseTypeDef = client.converse_stream(**request)
+            return response['stream']  # type: ignore[return-value]
+        return rate_limiter.stream(client, request, reservation)
+
+    opener: Callable[[], Iterable[ConverseStreamOutputTypeDef]] = open_stream
+    if deadline is not None:
+        opener = partial(deadline.stream, opener)
+    if circuit_breaker is None:
+        yield from opener()
+        return
+    try:
+        yield from circuit_breaker.stream(request['modelId'], opener)
+    except CircuitOpenError:
+        if rate_limiter is not None and reservation is not None:
+            rate_limiter.reconcile(reservation, 0)
+        raise
+
+
+def process_stream(
+    events: Iterable[ConverseStreamOutputTypeDef],
+    messages: Optional[List[MessageUnionTypeDef]] = None,
+    memory: Optional[Memory] = None,
+    stdout: Optional[bool] = None,
+    sinks: Sequence[StreamSink] = (),
+) -> Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any]:
+    """Turn raw ConverseStream events into `(event, final_message)` tuples.
+
+    The events are annotated in place with `done`, and `toolUseInput` for toolUse blocks, and
+    passed on to the sinks as they are yielded. Streams shared through SingleFlight hand every
+    subscriber its own copy of the events, so no other consumer sees the annotations.
+
+    Args:
+        events (Iterable[ConverseStreamOutputTypeDef]): The events of the stream.
+        messages (Optional[List[MessageUnionTypeDef]], optional): The messages of the request, whose last one is recorded in memory along with the reply. Defaults to None.
+        memory (Optional[Memory], optional): The memory to record the turn in. Defaults to None.
+        stdout (Optional[bool], optional): Whether to print the text as it arrives, through a StdoutSink. Defaults to None.
+        sinks (Sequence[StreamSink], optional): Where to send the text and events of the stream as well. Defaults to ().
+    """  # noqa: E501
+    if stdout:
+        sinks = [*sinks, StdoutSink()]
+    # bound methods are looked up once, and only for the hooks a sink implements
+    writers = [sink.write for sink in sinks if sink.overrides('write')]
+    listeners = [sink.event for sink in sinks if sink.overrides('event')]
+    error: Optional[BaseException] = None
+    try:
+        yield from _dispatch(events, messages, memory, writers, listeners)
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        for sink in sinks:
+            sink.end(error)
+
+
+def _dispatch(
+    events: Iterable[ConverseStreamOutputTypeDef],
+    messages: Optional[List[MessageUnionTypeDef]],
+    memory: Optional[Memory],
+    writers: List[Callable[[str], None]],
+    listeners: List[Callable[[Any, Optional[MessageUnionTypeDef]], None]],
 ) -> Generator[tuple[ConverserStreamOutputTypeDefEnd, None | MessageUnionTypeDef], Any, Any]:
-    """Stream messages to the model."""
-    response: ConverseStreamResponseTypeDef = client.converse_stream(
-        modelId=model_id,
-        messages=messages,
-        system=system_prompt,
-        inferenceConfig=cast(InferenceConfigurationTypeDef, inference_config.model_dump()),
-    )
-
-    complete_message: list[str] = []
-    for event in response['stream']:
-        yield_message: ConverserStreamOutputTypeDefEnd = cast(
-            ConverserStreamOutputTypeDefEnd, {**event, **{'done': False}}
-        )
+    """The single loop processing the events and driving the sinks."""
+    accumulator = StreamAccumulator()
+    for event in events:
+        yield_message = cast(ConverserStreamOutputTypeDefEnd, event)
+        yield_message['done'] = False
+        final_message: Optional[MessageUnionTypeDef] = None
         # check which event type is in the response and assign the correct output key
-        output_key = next((key for key in event.keys() if key in ConverseStreamingKeys), None)
+        output_key = next((key for key in event.keys() if key in _STREAMING_KEYS), None)
+        accumulator.feed(event)
         match output_key:
             case (
                 ConverseStreamingKeys.MESSAGE_START
                 | ConverseStreamingKeys.CONTENT_BLOCK_START
-                | ConverseStreamingKeys.CONTENT_BLOCK_STOP
                 | ConverseStreamingKeys.METADATA
             ):
-                yield yield_message, None
-            case ConverseStreamingKeys.CONTENT_BLOCK_DELTA:
-                text = event['contentBlockDelta']['delta']['text']  # type: ignore
-                print(text, end='') if stdout else None
-                complete_message.append(text)
-                yield yield_message, None
+                pass
+            case (
+                ConverseStreamingKeys.CONTENT_BLOCK_DELTA
+                | ConverseStreamingKeys.CONTENT_BLOCK_STOP
+            ):
+                tool_use_input = _block_event(event, output_key, accumulator, writers)
+                if tool_use_input is not None:
+                    yield_message['toolUseInput'] = tool_use_input
             case ConverseStreamingKeys.MESSAGE_STOP:
-                final_text = ''.join(complete_message)
-                final_message: MessageUnionTypeDef = {
+                final_message = {
                     'role': 'assistant',
-                    'content': [{'text': final_text}],
+                    'content': accumulator.content() or [{'text': ''}],  # type: ignore[typeddict-item]
                 }
-                if memory:
-                    memory.add_messages([messages[-1]] + [final_message])
+                if memory and messages:
+                    memory.add_messages([messages[-1], final_message])
                 yield_message['done'] = True
-                yield yield_message, final_message
-                complete_message = []
+                accumulator = StreamAccumulator()
             case None:
                 raise ValueError('Invalid event type')
+        for listener in listeners:
+            listener(yield_message, final_message)
+        yield yield_message, final_message
+
+
+def _block_event(
+    event: ConverseStreamOutputTypeDef,
+    output_key: str,
+    accumulator: StreamAccumulator,
+    writers: List[Callable[[str], None]],
+) -> Optional[ToolUseInputTypeDef]:
+    """Send the text of a block event to the writers, and return the toolUse input so far."""
+    block_event = event[output_key]  # type: ignore[literal-required]
+    delta = block_event.get('delta')
+    if delta is not None and writers:
+        text = delta.get('text')
+        if text:
+            for write in writers:
+                write(text)
+    return accumulator.tool_use_input(block_event['contentBlockIndex'])
@@ -0,0 +1,8 @@
+"""Stand-ins for the Bedrock runtime to test and benchmark converser offline."""
+
+from .cassette import Cassette
+from .fake_bedrock import FakeBedrock, encode_event
+from .stub_client import StubBedrockClient
+
+
+__all__ = ['Cassette', 'FakeBedrock', 'StubBedrockClient', 'encode_event']
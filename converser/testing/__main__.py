@@ -0,0 +1,6 @@
+"""Run the fake Bedrock runtime server until interrupted."""
+
+from .fake_bedrock import main
+
+
+main()
@@ -0,0 +1,218 @@
+"""Record the Bedrock calls of a client to a file, and replay them without the network."""
+
+import copy
+import json
+import os
+import threading
+import time
+from botocore.exceptions import ClientError
+from converser.conversation_memory.sqlite_memory import decode_content, encode_content
+from converser.utils.fingerprint import request_fingerprint
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Literal, Optional, Tuple, Union
+
+
+CassetteMode = Literal['auto', 'record', 'replay']
+
+_OPERATION_NAMES = {'converse': 'Converse', 'converse_stream': 'ConverseStream'}
+
+
+class Cassette:
+    """A bedrock-runtime client that records the calls of another client, or replays them.
+
+    Calls are keyed by the fingerprint of their request. A recorded `converse` call keeps its
+    response and how long it took; a `converse_stream` call keeps its events and the delay
+    before each. Calls that failed with a ClientError keep the error, which is raised again on
+    replay. Pass the cassette as the `client` of a `Converse`.
+
+    The file holds one JSON line per call, appended as soon as the call is recorded, so a long
+    recording writes every call once and a crash loses at most the call being written.
+
+    In 'record' mode every call goes to `client` and the file is started from scratch. In
+    'replay' mode calls are answered from the file, and a call that was never recorded raises
+    LookupError. In 'auto' mode, recorded calls are replayed and the others recorded. Calls
+    with the same request are replayed in the order they were recorded, the last one repeating
+    once they run out. Replays are instant, unless `pace` reproduces a share of the recorded
+    delays: 1.0 replays at the recorded speed, 0.5 twice as fast.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        client: Any = None,
+        mode: CassetteMode = 'auto',
+        pace: float = 0.0,
+    ) -> None:
+        """Initialize the Cassette class.
+
+        Args:
+            path (Union[str, Path]): The JSON lines file holding the recorded calls.
+            client (Any, optional): The bedrock-runtime client making the calls to record. Required unless the mode is 'replay'. Defaults to None.
+            mode (CassetteMode, optional): 'record', 'replay', or 'auto' to replay the calls recorded and record the others. Defaults to 'auto'.
+            pace (float, optional): The share of the recorded delays waited on replay. Defaults to 0.0, for instant replays.
+        """  # noqa: E501
+        if mode not in ('auto', 'record', 'replay'):
+            raise ValueError(f'Invalid cassette mode: {mode}')
+        if client is None and mode != 'replay':
+            raise ValueError(f'A client is required to record calls in {mode!r} mode')
+        self.path = Path(path)
+        self.client = client
+        self.mode = mode
+        self.pace = pace
+        self._interactions: Dict[str, Dict[str, List[Dict[str, Any]]]] = {
+            'converse': {},
+            'converse_stream': {},
+        }
+        if mode != 'record' and self.path.exists():
+            self._load()
+        # record mode starts a new file with its first call
+        self._truncate = mode == 'record'
+        self._played: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        with self.path.open(encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    entry = decode_content(line)
+                except json.JSONDecodeError:
+                    # the last line was cut short by a crash while it was written
+                    break
+                recorded = self._interactions[entry['operation']]
+                recorded.setdefault(entry['key'], []).append(entry['interaction'])
+
+    def __getattr__(self, name: str) -> Any:
+        """Expose the attributes of the recorded client, like the `meta` botocore hooks use."""
+        client = self.__dict__.get('client')
+        if client is None:
+            raise AttributeError(name)
+        return getattr(client, name)
+
+    def converse(self, **kwargs: Any) -> Dict[str, Any]:
+        """Replay or record a `converse` call."""
+        key = request_fingerprint(kwargs)
+        interaction = self._replay('converse', key)
+        if interaction is not None:
+            self._wait(interaction['elapsed'])
+            if 'error' in interaction:
+                raise _client_error(interaction, 'converse')
+            return interaction['response']
+        start = time.perf_counter()
+        try:
+            response = self.client.converse(**kwargs)
+        except ClientError as exc:
+            self._record(
+                'converse', key, {'elapsed': time.perf_counter() - start, 'error': exc.response}
+            )
+            raise
+        self._record(
+            'converse', key, {'elapsed': time.perf_counter() - start, 'response': response}
+        )
+        return response
+
+    def converse_stream(self, **kwargs: Any) -> Dict[str, Any]:
+        """Replay or record a `converse_stream` call; the call is recorded once its stream ends."""
+        key = request_fingerprint(kwargs)
+        interaction = self._replay('converse_stream', key)
+        if interaction is not None:
+            self._wait(interaction['elapsed'])
+            if 'error' in interaction and interaction['events'] is None:
+                raise _client_error(interaction, 'converse_stream')
+            return {**interaction['response'], 'stream': self._replay_events(interaction)}
+        start = time.perf_counter()
+        try:
+            response = self.client.converse_stream(**kwargs)
+        except ClientError as exc:
+            self._record(
+                'converse_stream',
+                key,
+                {'elapsed': time.perf_counter() - start, 'error': exc.response, 'events': None},
+            )
+            raise
+        interaction = {
+            'elapsed': time.perf_counter() - start,
+            'response': {name: value for name, value in response.items() if name != 'stream'},
+            'events': [],
+        }
+        return {**response, 'stream': self._record_events(key, interaction, response['stream'])}
+
+    def save(self) -> None:
+        """Rewrite the file with every call recorded or loaded, replacing it atomically.
+
+        Calls are already written as they are recorded, so this is only needed to rebuild a
+        file, for example after editing the recorded calls.
+        """
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+            with temporary.open('w', encoding='utf-8') as file:
+                for operation, recorded in self._interactions.items():
+                    for key, interactions in recorded.items():
+                        for interaction in interactions:
+                            file.write(_line(operation, key, interaction))
+            os.replace(temporary, self.path)
+            self._truncate = False
+
+    def _replay(self, operation: str, key: str) -> Optional[Dict[str, Any]]:
+        """The next recorded interaction for a request, or None if it is to be recorded."""
+        if self.mode == 'record':
+            return None
+        with self._lock:
+            recorded = self._interactions[operation].get(key)
+            if not recorded:
+                if self.mode == 'replay':
+                    raise LookupError(f'No recorded {operation} call matches request {key}')
+                return None
+            played = self._played.get((operation, key), 0)
+            self._played[(operation, key)] = played + 1
+            # callers may modify what they get, like a fresh response
+            return copy.deepcopy(recorded[min(played, len(recorded) - 1)])
+
+    def _record(self, operation: str, key: str, interaction: Dict[str, Any]) -> None:
+        interaction = copy.deepcopy(interaction)
+        with self._lock:
+            self._interactions[operation].setdefault(key, []).append(interaction)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open('w' if self._truncate else 'a', encoding='utf-8') as file:
+                file.write(_line(operation, key, interaction))
+            self._truncate = False
+
+    def _record_events(
+        self, key: str, interaction: Dict[str, Any], stream: Any
+    ) -> Generator[Dict[str, Any], None, None]:
+        events: List[Tuple[float, Dict[str, Any]]] = interaction['events']
+        previous = time.perf_counter()
+        try:
+            for event in stream:
+                now = time.perf_counter()
+                # converser annotates the events it yields, so keep them as they arrived
+                events.append((now - previous, copy.deepcopy(event)))
+                previous = now
+                yield event
+        except ClientError as exc:
+            interaction['error'] = exc.response
+            self._record('converse_stream', key, interaction)
+            raise
+        # only reached once the stream ends, so a stream abandoned part way is not recorded
+        self._record('converse_stream', key, interaction)
+
+    def _replay_events(self, interaction: Dict[str, Any]) -> Generator[Dict[str, Any], None, None]:
+        for delay, event in interaction['events']:
+            self._wait(delay)
+            yield event
+        if 'error' in interaction:
+            raise _client_error(interaction, 'converse_stream')
+
+    def _wait(self, delay: float) -> None:
+        if self.pace:
+            time.sleep(delay * self.pace)
+
+
+def _line(operation: str, key: str, interaction: Dict[str, Any]) -> str:
+    return encode_content({'operation': operation, 'key': key, 'interaction': interaction}) + '\n'
+
+
+def _client_error(interaction: Dict[str, Any], operation: str) -> ClientError:
+    return ClientError(interaction['error'], _OPERATION_NAMES[operation])
@@ -0,0 +1,347 @@
+"""A local HTTP server speaking the Converse and ConverseStream APIs of the Bedrock runtime.
+
+Point a real boto3 client at it to exercise the whole network path of converser, including
+request signing, serialization, connection pooling, retries and event-stream decoding,
+without AWS access. Run it on its own with `python -m converser.testing`.
+"""
+
+import argparse
+import binascii
+import boto3
+import json
+import random
+import struct
+import threading
+import time
+from botocore.config import Config
+from converser.utils.tokens import estimate_message_tokens
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from mypy_boto3_bedrock_runtime.client import BedrockRuntimeClient
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import unquote
+
+
+Delay = Union[float, Callable[[random.Random], float]]
+
+
+def encode_event(event_type: str, payload: Dict[str, Any]) -> bytes:
+    """Encode one event as an `application/vnd.amazon.eventstream` message.
+
+    A message is a prelude with its total and headers lengths and their CRC32, the headers,
+    the JSON payload, and the CRC32 of everything before it.
+
+    Args:
+        event_type (str): The name of the event, like 'contentBlockDelta'.
+        payload (Dict[str, Any]): The members of the event.
+
+    Returns:
+        bytes: The encoded message.
+    """
+    headers = b''.join(
+        _header(name, value)
+        for name, value in (
+            (':event-type', event_type),
+            (':content-type', 'application/json'),
+            (':message-type', 'event'),
+        )
+    )
+    body = json.dumps(payload, separators=(',', ':')).encode()
+    prelude = struct.pack('!II', 12 + len(headers) + len(body) + 4, len(headers))
+    message = prelude + struct.pack('!I', binascii.crc32(prelude)) + headers + body
+    return message + struct.pack('!I', binascii.crc32(message))
+
+
+def _header(name: str, value: str) -> bytes:
+    # a string header: the name, type 7, and the value prefixed by its length
+    name_bytes, value_bytes = name.encode(), value.encode()
+    return (
+        struct.pack('!B', len(name_bytes))
+        + name_bytes
+        + struct.pack('!BH', 7, len(value_bytes))
+        + value_bytes
+    )
+
+
+class FakeBedrock:
+    """A local stand-in for the Bedrock runtime endpoint, for load tests and benchmarks.
+
+    Every reply is the canned `text`, or the text of the last user message with `echo`, split
+    into one token per word. Scripted `replies` are sent first, one per call, as with
+    `StubBedrockClient`. Timings follow a real model: `latency` passes before the response
+    starts, `time_to_first_token` before the first token, and the tokens then come at
+    `tokens_per_second`. A non-streaming reply is sent once it would have been generated.
+    Delays are seconds, or functions drawing them from the server's random generator, like
+    `lambda rng: rng.lognormvariate(-3, 0.5)`. With `throttle_rate`, that share of the
+    requests is refused with a ThrottlingException.
+
+    Requests are not authenticated, so any credentials will do. Use it as a context manager,
+    or call `start` and `stop`.
+    """
+
+    def __init__(
+        self,
+        text: str = 'Hello there!',
+        echo: bool = False,
+        replies: Optional[Sequence[List[Dict[str, Any]]]] = None,
+        latency: Delay = 0.0,
+        time_to_first_token: Delay = 0.0,
+        tokens_per_second: Optional[float] = None,
+        throttle_rate: float = 0.0,
+        seed: Optional[int] = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ) -> None:
+        """Initialize the FakeBedrock class.
+
+        Args:
+            text (str, optional): The text of every reply. Defaults to 'Hello there!'.
+            echo (bool, optional): Whether to reply with the text of the last user message instead. Defaults to False.
+            replies (Optional[Sequence[List[Dict[str, Any]]]], optional): The content blocks of the first replies, in order. A reply with toolUse blocks stops with 'tool_use'. Defaults to None.
+            latency (Delay, optional): The delay before a response starts. Defaults to 0.0.
+            time_to_first_token (Delay, optional): The delay between the start of a response and its first token. Defaults to 0.0.
+            tokens_per_second (Optional[float], optional): The rate of the tokens after the first. Defaults to None, for no delay.
+            throttle_rate (float, optional): The share of requests refused with a ThrottlingException. Defaults to 0.0.
+            seed (Optional[int], optional): The seed of the random generator drawing delays and throttles. Defaults to None.
+            host (str, optional): The address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): The port to listen on. Defaults to 0, for any free port.
+        """  # noqa: E501
+        self.text = text
+        self.echo = echo
+        self.latency = latency
+        self.time_to_first_token = time_to_first_token
+        self.tokens_per_second = tokens_per_second
+        self.throttle_rate = throttle_rate
+        self.requests = 0
+        self.throttled = 0
+        self._replies = list(replies or ())
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self  # type: ignore[attr-defined]
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint_url(self) -> str:
+        """The URL to pass as the `endpoint_url` of a client."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeBedrock':
+        """Serve requests on a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, name='fake-bedrock', daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeBedrock':
+        """Start the server."""
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop the server."""
+        self.stop()
+
+    def client(
+        self, region: str = 'us-west-2', max_pool_connections: int = 10, max_attempts: int = 1
+    ) -> BedrockRuntimeClient:
+        """A new bedrock-runtime client sending its requests to the server, with dummy credentials.
+
+        Args:
+            region (str, optional): The region the requests are signed for. Defaults to 'us-west-2'.
+            max_pool_connections (int, optional): The maximum number of connections kept open to the server. Defaults to 10.
+            max_attempts (int, optional): The total number of attempts of a call, with adaptive retries. Defaults to 1.
+        """  # noqa: E501
+        return boto3.client(
+            'bedrock-runtime',
+            region_name=region,
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id='fake',
+            aws_secret_access_key='fake',
+            config=Config(
+                retries={'total_max_attempts': max_attempts, 'mode': 'adaptive'},
+                max_pool_connections=max_pool_connections,
+            ),
+        )
+
+    def _admit(self) -> bool:
+        """Count a request, and draw whether it is throttled."""
+        with self._lock:
+            self.requests += 1
+            throttled = self._random.random() < self.throttle_rate
+            self.throttled += throttled
+            return not throttled
+
+    def _delay(self, delay: Delay) -> float:
+        return delay(self._random) if callable(delay) else delay
+
+    def _reply(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._replies:
+                return self._replies.pop(0)
+        if self.echo:
+            users = [m for m in request.get('messages', []) if m.get('role') == 'user']
+            texts = [b['text'] for b in (users[-1]['content'] if users else []) if 'text' in b]
+            return [{'text': ' '.join(texts)}]
+        return [{'text': self.text}]
+
+    def _tokens(self, request: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """The events of the reply to a request, paced like a model generating it."""
+        start = time.monotonic()
+        content = self._reply(request)
+        time.sleep(self._delay(self.latency))
+        yield 'messageStart', {'role': 'assistant'}
+        time.sleep(self._delay(self.time_to_first_token))
+        interval = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+        output_tokens = 0
+        for index, block in enumerate(content):
+            # like Bedrock, only toolUse blocks have a contentBlockStart event
+            if 'toolUse' in block:
+                tool_use = block['toolUse']
+                start_block = {'toolUseId': tool_use['toolUseId'], 'name': tool_use['name']}
+                yield (
+                    'contentBlockStart',
+                    {'start': {'toolUse': start_block}, 'contentBlockIndex': index},
+                )
+                words = json.dumps(tool_use['input']).split(' ')
+            else:
+                words = block['text'].split(' ')
+            for i, word in enumerate(words):
+                if output_tokens and interval:
+                    time.sleep(interval)
+                output_tokens += 1
+                chunk = word if i == 0 else f' {word}'
+                delta = {'toolUse': {'input': chunk}} if 'toolUse' in block else {'text': chunk}
+                yield 'contentBlockDelta', {'delta': delta, 'contentBlockIndex': index}
+            yield 'contentBlockStop', {'contentBlockIndex': index}
+        yield 'messageStop', {'stopReason': _stop_reason(content)}
+        input_tokens = sum(estimate_message_tokens(m) for m in request.get('messages', []))
+        yield (
+            'metadata',
+            {
+                'usage': {
+                    'inputTokens': input_tokens,
+                    'outputTokens': output_tokens,
+                    'totalTokens': input_tokens + output_tokens,
+                },
+                'metrics': {'latencyMs': int((time.monotonic() - start) * 1000)},
+            },
+        )
+
+
+def _stop_reason(content: List[Dict[str, Any]]) -> str:
+    return 'tool_use' if any('toolUse' in block for block in content) else 'end_turn'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # the headers and body go out in separate writes, which Nagle's algorithm would delay
+    disable_nagle_algorithm = True
+    server: Any
+
+    def do_POST(self) -> None:
+        fake: FakeBedrock = self.server.fake
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        parts = unquote(self.path).strip('/').split('/')
+        operation = parts[-1] if len(parts) >= 3 and parts[0] == 'model' else None
+        if operation not in ('converse', 'converse-stream'):
+            self._error(404, 'ResourceNotFoundException', f'Unknown path {self.path}')
+        elif not fake._admit():
+            self._error(429, 'ThrottlingException', 'Too many requests, please wait.')
+        elif operation == 'converse':
+            self._converse(fake._tokens(request))
+        else:
+            self._converse_stream(fake._tokens(request))
+
+    def _converse(self, events: Iterator[Tuple[str, Dict[str, Any]]]) -> None:
+        content: List[Dict[str, Any]] = []
+        response: Dict[str, Any] = {}
+        for event_type, payload in events:
+            if event_type == 'contentBlockStart':
+                content.append({'toolUse': {**payload['start']['toolUse'], 'input': ''}})
+            elif event_type == 'contentBlockDelta':
+                delta = payload['delta']
+                if 'toolUse' in delta:
+                    content[-1]['toolUse']['input'] += delta['toolUse']['input']
+                elif payload['contentBlockIndex'] < len(content):
+                    content[-1]['text'] += delta['text']
+                else:
+                    content.append({'text': delta['text']})
+            elif event_type == 'messageStop':
+                response['stopReason'] = payload['stopReason']
+            elif event_type == 'metadata':
+                response.update(payload)
+        for block in content:
+            if 'toolUse' in block:
+                block['toolUse']['input'] = json.loads(block['toolUse']['input'])
+        response['output'] = {'message': {'role': 'assistant', 'content': content}}
+        self._send(200, 'application/json', json.dumps(response).encode())
+
+    def _converse_stream(self, events: Iterator[Tuple[str, Dict[str, Any]]]) -> None:
+        # the headers only go out with the first event, after the latency
+        first = True
+        for event_type, payload in events:
+            if first:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/vnd.amazon.eventstream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                first = False
+            message = encode_event(event_type, payload)
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(message), message))
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def _error(self, status: int, error_type: str, message: str) -> None:
+        body = json.dumps({'message': message}).encode()
+        self._send(status, 'application/json', body, {'x-amzn-ErrorType': error_type})
+
+    def _send(
+        self, status: int, content_type: str, body: bytes, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Stay quiet: the server answers thousands of requests under load."""
+
+
+def main() -> None:
+    """Serve until interrupted, with the settings given on the command line."""
+    parser = argparse.ArgumentParser(
+        prog='python -m converser.testing', description=__doc__.splitlines()[0]
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--text', default='Hello there!')
+    parser.add_argument('--echo', action='store_true')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--time-to-first-token', type=float, default=0.0)
+    parser.add_argument('--tokens-per-second', type=float, default=None)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = vars(parser.parse_args())
+    fake = FakeBedrock(**arguments)
+    print(f'Serving the Bedrock runtime on {fake.endpoint_url}', flush=True)
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake._server.server_close()
@@ -0,0 +1,87 @@
+"""An in-process stand-in for the bedrock-runtime client."""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Generator, List, Optional, Sequence
+
+
+class StubBedrockClient:
+    """A minimal in-process stand-in for the bedrock-runtime client.
+
+    It answers `converse` and `converse_stream` with a canned text response, without any
+    serialization or network I/O, and records the keyword arguments of every call. Scripted
+    `replies` are sent first, one per call, which is how tool use is exercised.
+    """
+
+    def __init__(
+        self,
+        text: str = 'Hello there!',
+        latency: float = 0.0,
+        replies: Optional[Sequence[List[Dict[str, Any]]]] = None,
+    ) -> None:
+        """Initialize the StubBedrockClient class.
+
+        Args:
+            text (str, optional): The text of every response. Defaults to 'Hello there!'.
+            latency (float, optional): Seconds to sleep per response, or per delta when streaming. Defaults to 0.0.
+            replies (Optional[Sequence[List[Dict[str, Any]]]], optional): The content blocks of the first responses, in order. A reply with toolUse blocks stops with 'tool_use'. Defaults to None.
+        """  # noqa: E501
+        self.text = text
+        self.latency = latency
+        self.calls: List[Dict[str, Any]] = []
+        self._replies = deque(replies or ())
+        self._lock = threading.Lock()
+
+    def _next_reply(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._replies.popleft() if self._replies else [{'text': self.text}]
+
+    def converse(self, **kwargs: Any) -> Dict[str, Any]:
+        """Return a canned non-streaming response."""
+        self.calls.append(kwargs)
+        content = self._next_reply()
+        if self.latency:
+            time.sleep(self.latency)
+        return {
+            'output': {'message': {'role': 'assistant', 'content': content}},
+            'stopReason': _stop_reason(content),
+            'usage': {'inputTokens': 10, 'outputTokens': 3, 'totalTokens': 13},
+            'metrics': {'latencyMs': int(self.latency * 1000)},
+        }
+
+    def converse_stream(self, **kwargs: Any) -> Dict[str, Any]:
+        """Return a canned streaming response, one delta per word of text or toolUse input."""
+        self.calls.append(kwargs)
+        return {'stream': self._events(self._next_reply())}
+
+    def _events(self, content: List[Dict[str, Any]]) -> Generator[Dict[str, Any], None, None]:
+        yield {'messageStart': {'role': 'assistant'}}
+        for index, block in enumerate(content):
+            if 'toolUse' in block:
+                tool_use = block['toolUse']
+                start = {'toolUse': {'toolUseId': tool_use['toolUseId'], 'name': tool_use['name']}}
+                words = json.dumps(tool_use['input']).split(' ')
+            else:
+                start = {}
+                words = block['text'].split(' ')
+            yield {'contentBlockStart': {'start': start, 'contentBlockIndex': index}}
+            for i, word in enumerate(words):
+                if self.latency:
+                    time.sleep(self.latency)
+                chunk = word if i == 0 else f' {word}'
+                delta = {'toolUse': {'input': chunk}} if 'toolUse' in block else {'text': chunk}
+                yield {'contentBlockDelta': {'delta': delta, 'contentBlockIndex': index}}
+            yield {'contentBlockStop': {'contentBlockIndex': index}}
+        yield {'messageStop': {'stopReason': _stop_reason(content)}}
+        yield {
+            'metadata': {
+                'usage': {'inputTokens': 10, 'outputTokens': 3, 'totalTokens': 13},
+                'metrics': {'latencyMs': 1},
+            }
+        }
+
+
+def _stop_reason(content: List[Dict[str, Any]]) -> str:
+    return 'tool_use' if any('toolUse' in block for block in content) else 'end_turn'
@@ -1,6 +1,14 @@
 """Init for tool use"""
 
-from .tool_use import generate_tool_schema_from_function
+from .registry import Tool, ToolRegistry
+from .structured import StructuredOutput
+from .tool_use import generate_tool_schema_from_function, generate_tool_schema_from_model
 
 
-__all__ = ['generate_tool_schema_from_function']
+__all__ = [
+    'StructuredOutput',
+    'Tool',
+    'ToolRegistry',
+    'generate_tool_schema_from_function',
+    'generate_tool_schema_from_model',
+]
@@ -0,0 +1,288 @@
+"""A registry of Python callables exposed to the model as tools."""
+
+import asyncio
+import inspect
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from converser.tool_use.tool_use import generate_tool_schema_from_function
+from mypy_boto3_bedrock_runtime.type_defs import (
+    ContentBlockTypeDef,
+    ToolConfigurationTypeDef,
+    ToolTypeDef,
+    ToolUseBlockTypeDef,
+)
+from pydantic import BaseModel, TypeAdapter, create_model
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    get_type_hints,
+)
+
+
+class Tool:
+    """A callable registered as a tool, with its schema and input validator built once."""
+
+    def __init__(self, func: Callable[..., Any], name: str, timeout: Optional[float]) -> None:
+        """Initialize the Tool class.
+
+        Args:
+            func (Callable[..., Any]): The function or coroutine function run for the tool.
+            name (str): The name of the tool, as seen by the model.
+            timeout (Optional[float]): The number of seconds a call may take.
+        """
+        self.func = func
+        self.name = name
+        self.timeout = timeout
+        self.is_async = inspect.iscoroutinefunction(func)
+        self.spec: ToolTypeDef = generate_tool_schema_from_function(func)
+        self.spec['toolSpec']['name'] = name
+        self.validator = TypeAdapter(_arguments_model(func))
+
+    def arguments(self, tool_input: Any) -> Dict[str, Any]:
+        """Validate the input the model sent for the tool, and convert it to keyword arguments.
+
+        Raises:
+            pydantic.ValidationError: If the input does not match the signature of the function.
+        """
+        return dict(self.validator.validate_python(tool_input))
+
+
+def _arguments_model(func: Callable[..., Any]) -> type[BaseModel]:
+    """A model of the arguments of `func`, where parameters with a default are optional.
+
+    Unlike generate_pydantic_model, which builds the published schema, it follows the signature
+    rather than the annotations, so the return annotation is not an argument.
+    """
+    annotations = get_type_hints(func, include_extras=True)
+    fields: Dict[str, Any] = {}
+    for param_name, param in inspect.signature(func).parameters.items():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        # Annotated[type, Field(...)] is understood by pydantic as is
+        param_type = annotations.get(param_name, Any)
+        fields[param_name] = (param_type, ... if param.default is param.empty else param.default)
+    return create_model(f'{func.__name__.capitalize()}Arguments', **fields)
+
+
+class ToolRegistry:
+    """Python callables exposed to the model as tools, and the engine that runs them.
+
+    Register functions with `register`, pass `tool_config()` as the `toolConfig` of a request,
+    and hand the `toolUse` blocks of the reply to `execute`. All the tool calls of one turn run
+    concurrently: plain functions on a thread pool, and coroutine functions together on an
+    event loop. A call that raises or times out becomes an error `toolResult`, so the model
+    can react to it. Timed-out functions cannot be interrupted: they finish in the background,
+    holding one of the `max_workers` threads until then, so size the pool for the slow calls
+    that may overlap.
+
+    A call can also be started on its own with `start`, for example as soon as its block has
+    streamed in, and handed to `execute` with the rest of the turn.
+
+    `Converse.run_agent` runs the whole loop.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[Callable[..., Any]] = (),
+        timeout: Optional[float] = None,
+        max_workers: int = 8,
+    ) -> None:
+        """Initialize the ToolRegistry class.
+
+        Args:
+            tools (Sequence[Callable[..., Any]], optional): Functions to register under their own name. Defaults to ().
+            timeout (Optional[float], optional): The default number of seconds a tool call may take. Defaults to None.
+            max_workers (int, optional): The number of threads running plain functions, including timed-out ones that are still running. Defaults to 8.
+        """  # noqa: E501
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._tools: Dict[str, Tool] = {}
+        self._tool_config: Optional[ToolConfigurationTypeDef] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        for func in tools:
+            self.register(func)
+
+    def register(
+        self,
+        func: Optional[Callable[..., Any]] = None,
+        *,
+        name: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Register a function as a tool; also usable as a decorator, with or without arguments.
+
+        Args:
+            func (Optional[Callable[..., Any]], optional): The function to register.
+            name (Optional[str], optional): The name of the tool. Defaults to the name of the function.
+            timeout (Optional[float], optional): The number of seconds a call may take. Defaults to the timeout of the registry.
+
+        Returns:
+            The function, unchanged.
+        """  # noqa: E501
+        if func is None:
+            return lambda decorated: self.register(decorated, name=name, timeout=timeout)
+        tool = Tool(
+            func,
+            name or func.__name__,
+            self.timeout if timeout is None else timeout,
+        )
+        self._tools[tool.name] = tool
+        self._tool_config = None
+        return func
+
+    def __contains__(self, name: object) -> bool:
+        """Whether a tool of that name is registered."""
+        return name in self._tools
+
+    def __iter__(self) -> Iterator[Tool]:
+        """Iterate over the registered tools."""
+        return iter(self._tools.values())
+
+    def __len__(self) -> int:
+        """The number of registered tools."""
+        return len(self._tools)
+
+    def tool_config(self) -> ToolConfigurationTypeDef:
+        """The `toolConfig` describing the registered tools to the model.
+
+        It is built once and shared by every request until another tool is registered, so it
+        must not be modified.
+        """
+        if self._tool_config is None:
+            self._tool_config = {'tools': [tool.spec for tool in self._tools.values()]}
+        return self._tool_config
+
+    def start(self, tool_use: ToolUseBlockTypeDef) -> Future:
+        """Start one tool call in the background, before the rest of the turn is known.
+
+        Args:
+            tool_use (ToolUseBlockTypeDef): The `toolUse` block of the call.
+
+        Returns:
+            Future: The outcome of the call, to pass to `execute` under its `toolUseId`.
+        """
+        try:
+            tool, arguments = self._arguments(tool_use)
+        except Exception as exc:
+            return _failed(exc)
+        if tool.is_async:
+            return self._pool().submit(asyncio.run, _call_async(tool, arguments))
+        return self._pool().submit(tool.func, **arguments)
+
+    def execute(
+        self,
+        tool_uses: Sequence[ToolUseBlockTypeDef],
+        started: Optional[Mapping[str, Future]] = None,
+    ) -> List[ContentBlockTypeDef]:
+        """Run the tool calls of one assistant turn concurrently.
+
+        Args:
+            tool_uses (Sequence[ToolUseBlockTypeDef]): The `toolUse` blocks of the turn.
+            started (Optional[Mapping[str, Future]], optional): Calls already started with `start`, by `toolUseId`. Their timeout counts from the call to `execute`. Defaults to None.
+
+        Returns:
+            List[ContentBlockTypeDef]: One `toolResult` block per call, in the same order.
+        """  # noqa: E501
+        start = time.monotonic()
+        futures, coroutines = self._submit(tool_uses, started or {})
+        # the coroutines share one event loop, run on the pool like the plain functions
+        gathered = self._pool().submit(asyncio.run, _gather(coroutines)) if coroutines else None
+
+        results: List[ContentBlockTypeDef] = []
+        for index, tool_use in enumerate(tool_uses):
+            try:
+                if index in coroutines:
+                    outcome = gathered.result()[index]  # type: ignore[union-attr]
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                else:
+                    timeout = getattr(self._tools.get(tool_use['name']), 'timeout', None)
+                    remaining = None if timeout is None else start + timeout - time.monotonic()
+                    outcome = futures[index].result(timeout=remaining)
+            except Exception as exc:
+                results.append(_tool_result(tool_use, _error_message(tool_use, exc), 'error'))
+            else:
+                results.append(_tool_result(tool_use, outcome, 'success'))
+        return results
+
+    def _submit(
+        self, tool_uses: Sequence[ToolUseBlockTypeDef], started: Mapping[str, Future]
+    ) -> Tuple[Dict[int, Future], Dict[int, Any]]:
+        """Validate the inputs and start the plain functions; the coroutines are returned."""
+        # inputs are validated up front, so invalid calls never take a worker
+        futures: Dict[int, Future] = {}
+        coroutines: Dict[int, Any] = {}
+        for index, tool_use in enumerate(tool_uses):
+            if tool_use['toolUseId'] in started:
+                futures[index] = started[tool_use['toolUseId']]
+                continue
+            try:
+                tool, arguments = self._arguments(tool_use)
+            except Exception as exc:
+                futures[index] = _failed(exc)
+                continue
+            if tool.is_async:
+                coroutines[index] = _call_async(tool, arguments)
+            else:
+                futures[index] = self._pool().submit(tool.func, **arguments)
+        return futures, coroutines
+
+    def _arguments(self, tool_use: ToolUseBlockTypeDef) -> Tuple[Tool, Dict[str, Any]]:
+        tool = self._tools.get(tool_use['name'])
+        if tool is None:
+            raise LookupError(f'Unknown tool: {tool_use["name"]}')
+        return tool, tool.arguments(tool_use['input'])
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='converser-tool'
+            )
+        return self._executor
+
+    def close(self) -> None:
+        """Shut down the thread pool running the tools."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def _failed(error: Exception) -> Future:
+    future: Future = Future()
+    future.set_exception(error)
+    return future
+
+
+async def _call_async(tool: Tool, arguments: Dict[str, Any]) -> Any:
+    return await asyncio.wait_for(tool.func(**arguments), tool.timeout)
+
+
+async def _gather(coroutines: Dict[int, Any]) -> Dict[int, Any]:
+    outcomes = await asyncio.gather(*coroutines.values(), return_exceptions=True)
+    return dict(zip(coroutines, outcomes))
+
+
+def _error_message(tool_use: ToolUseBlockTypeDef, error: Exception) -> str:
+    # before Python 3.11, futures and asyncio have their own TimeoutError classes
+    if isinstance(error, (TimeoutError, FutureTimeoutError, asyncio.TimeoutError)):
+        return f'Tool {tool_use["name"]} timed out'
+    return f'{type(error).__name__}: {error}'
+
+
+def _tool_result(tool_use: ToolUseBlockTypeDef, outcome: Any, status: str) -> ContentBlockTypeDef:
+    """Wrap the return value of a tool in a `toolResult` block."""
+    content = [{'json': outcome}] if isinstance(outcome, dict) else [{'text': str(outcome)}]
+    return {
+        'toolResult': {
+            'toolUseId': tool_use['toolUseId'],
+            'content': content,  # type: ignore[typeddict-item]
+            'status': status,  # type: ignore[typeddict-item]
+        }
+    }
@@ -0,0 +1,121 @@
+"""Extraction of pydantic models from replies through a forced tool call."""
+
+import json
+from converser.streaming import ConverserStreamOutputTypeDefEnd
+from converser.tool_use.tool_use import generate_tool_schema_from_model
+from functools import lru_cache
+from mypy_boto3_bedrock_runtime.type_defs import (
+    ConverseResponseTypeDef,
+    MessageUnionTypeDef,
+    ToolConfigurationTypeDef,
+)
+from pydantic import BaseModel, TypeAdapter
+from typing import Annotated, Any, Dict, Generator, Generic, Iterable, Tuple, Type, TypeVar
+
+
+M = TypeVar('M', bound=BaseModel)
+
+
+class StructuredOutput(Generic[M]):
+    """The tool configuration that makes the model answer with an instance of `model`.
+
+    The only tool is generated from the model, and the model is forced to call it, so its
+    input is the structured answer. `Converse.send_structured` uses it; forcing a tool is only
+    supported by some models, such as Anthropic Claude.
+    """
+
+    def __init__(self, model: Type[M]) -> None:
+        """Initialize the StructuredOutput class.
+
+        Args:
+            model (Type[M]): The pydantic model of the answer.
+        """
+        self.model = model
+        spec = generate_tool_schema_from_model(model)
+        self.name = spec['toolSpec']['name']
+        self.tool_config: ToolConfigurationTypeDef = {
+            'tools': [spec],
+            'toolChoice': {'tool': {'name': self.name}},
+        }
+
+    def from_response(self, response: ConverseResponseTypeDef) -> M:
+        """Validate the answer in a complete response.
+
+        Raises:
+            ValueError: If the response does not call the tool.
+            pydantic.ValidationError: If the answer does not match the model.
+        """
+        return self.from_message(response['output']['message'])  # type: ignore[typeddict-item]
+
+    def from_message(self, message: MessageUnionTypeDef) -> M:
+        """Validate the answer in an assistant message.
+
+        Raises:
+            ValueError: If the message does not call the tool.
+            pydantic.ValidationError: If the answer does not match the model.
+        """
+        for block in message['content']:
+            if 'toolUse' in block and block['toolUse']['name'] == self.name:
+                return self.model.model_validate(block['toolUse']['input'])
+        raise ValueError(f'The reply does not call {self.name}')
+
+    def transcript(self, message: MessageUnionTypeDef) -> MessageUnionTypeDef:
+        """The assistant message to keep in memory in place of `message`.
+
+        The call of the tool is replaced with its input as JSON text, which keeps the history
+        valid for later requests that neither answer the call nor declare the tool.
+        """
+        content = [
+            {'text': json.dumps(block['toolUse']['input'])} if 'toolUse' in block else block
+            for block in message['content']
+        ]
+        return {'role': 'assistant', 'content': content}  # type: ignore[typeddict-item]
+
+    def partials(
+        self,
+        stream: Iterable[Tuple[ConverserStreamOutputTypeDefEnd, Any]],
+    ) -> Generator[M, None, None]:
+        """Turn a stream into progressively more complete instances of the model.
+
+        A field is validated once, as soon as the next one starts or the input is complete,
+        and a partial instance with the fields validated so far is yielded; it is built with
+        `model_construct`, so the fields still missing are not set. The instance yielded last
+        is the whole answer, validated as a whole. The stream is always read to the end.
+
+        Raises:
+            ValueError: If the stream ends without calling the tool.
+            pydantic.ValidationError: If a field or the answer does not match the model.
+        """
+        adapters = _field_adapters(self.model)
+        fields: Dict[str, Any] = {}
+        settled = 0
+        done = False
+        for event, _ in stream:
+            tool_use_input = event.get('toolUseInput')
+            if done or tool_use_input is None or tool_use_input['name'] != self.name:
+                continue
+            arguments = tool_use_input['input']
+            if tool_use_input['complete']:
+                done = True
+                yield self.model.model_validate(arguments)
+                continue
+            # the last key may still be arriving, the ones before it are complete
+            keys = list(arguments)[settled:-1]
+            for key in keys:
+                if key in adapters:
+                    name, adapter = adapters[key]
+                    fields[name] = adapter.validate_python(arguments[key])
+            settled += len(keys)
+            if keys:
+                yield self.model.model_construct(**fields)
+        if not done:
+            raise ValueError(f'The reply does not call {self.name}')
+
+
+@lru_cache(maxsize=256)
+def _field_adapters(model: Type[BaseModel]) -> Dict[str, Tuple[str, TypeAdapter]]:
+    """A validator per field of the model, keyed by the name the field has in the input."""
+    return {
+        field.alias or name: (name, TypeAdapter(Annotated[field.annotation, field]))
+        for name, field in model.model_fields.items()
+    }
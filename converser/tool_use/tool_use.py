@@ -1,6 +1,8 @@
 # ruff: noqa: D100, D101, D103
 
+import copy
 import inspect
+from functools import lru_cache
 from mypy_boto3_bedrock_runtime.type_defs import ToolTypeDef
 from pydantic import BaseModel, Field, create_model
 from pydantic.fields import FieldInfo
@@ -160,8 +162,39 @@ def has_field_annotated_args(func):
 # If it does, generate the schema using generate_tool_schema.
 # If not, generate the schema using generate_json_schema.
 # don't use try except... check if the function has Pydantic Field
-def generate_tool_schema_from_function(func: Callable):
+def generate_tool_schema_from_function(func: Callable) -> ToolTypeDef:
+    # the schema is built once per function, and every caller gets its own copy; the cache
+    # keeps up to 1024 functions alive, and does not see changes made to a function later
+    return copy.deepcopy(_cached_tool_schema(func))
+
+
+@lru_cache(maxsize=1024)
+def _cached_tool_schema(func: Callable) -> ToolTypeDef:
     if has_field_annotated_args(func):
         return generate_tool_schema(func)
     else:
         return generate_json_schema(func)
+
+
+def generate_tool_schema_from_model(model: type[BaseModel]) -> ToolTypeDef:
+    """Generate a ToolTypeDef schema whose input is an instance of a pydantic model.
+
+    Args:
+        model (type[BaseModel]): The model the input of the tool must match.
+
+    Returns:
+        ToolTypeDef: A ToolTypeDef schema named after the model, to use with Bedrock.
+    """
+    return copy.deepcopy(_cached_model_schema(model))
+
+
+@lru_cache(maxsize=1024)
+def _cached_model_schema(model: type[BaseModel]) -> ToolTypeDef:
+    schema = model.model_json_schema()
+    return {
+        'toolSpec': {
+            'name': model.__name__,
+            'description': schema.get('description', f'Record a {model.__name__}.'),
+            'inputSchema': {'json': schema},
+        }
+    }
@@ -1,6 +1,11 @@
 """Helpful utilities for the converser package."""
 
-from .bedrock_runtime_client.bedrock_runtime_client import get_bedrock_client
+from .bedrock_runtime_client.bedrock_runtime_client import (
+    clear_bedrock_clients,
+    get_bedrock_client,
+    warmup,
+)
+from .profiler import PhaseStats, Profiler
 
 
-__all__ = ['get_bedrock_client']
+__all__ = ['PhaseStats', 'Profiler', 'clear_bedrock_clients', 'get_bedrock_client', 'warmup']
@@ -1,35 +1,145 @@
 """This module provides a function to get a Bedrock client."""
 
+import threading
 from boto3 import _get_default_session
 from boto3.session import Session
 from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from mypy_boto3_bedrock_runtime.client import BedrockRuntimeClient
+from typing import Any, Dict, Hashable, Optional, Tuple
 
 
-def get_bedrock_client(region: str, profile: str | None = None) -> BedrockRuntimeClient:
+_clients: Dict[Tuple[Hashable, ...], BedrockRuntimeClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_bedrock_client(
+    region: str,
+    profile: str | None = None,
+    max_pool_connections: int = 10,
+    connect_timeout: float = 60,
+    read_timeout: float = 300,
+    tcp_keepalive: bool = False,
+    max_attempts: int = 20,
+    endpoint_url: Optional[str] = None,
+) -> BedrockRuntimeClient:
     """Get a Bedrock client.
 
+    Clients are cached for the lifetime of the process, one per combination of arguments, so
+    every caller with the same settings shares one client and its connection pool. boto3
+    clients are thread-safe, and creating them is serialized.
+
     Args:
         region (str): The AWS region to use.
         profile (str, optional): The AWS profile to use. Defaults to None.
+        max_pool_connections (int, optional): The maximum number of connections kept open to the endpoint. Defaults to 10.
+        connect_timeout (float, optional): The timeout for opening a connection, in seconds. Defaults to 60.
+        read_timeout (float, optional): The timeout for reading from a connection, in seconds. Defaults to 300.
+        tcp_keepalive (bool, optional): Whether to enable TCP keepalive on the connections. Defaults to False.
+        max_attempts (int, optional): The total number of attempts of a call, with adaptive retries. Defaults to 20.
+        endpoint_url (Optional[str], optional): The URL to send the requests to, like that of a `FakeBedrock`. Defaults to None, for the regional endpoint.
 
     Returns:
         BedrockRuntimeClient: The Bedrock client.
 
-    """
-    session: Session
-    if profile is None:
-        session = _get_default_session()
-    else:
-        session = Session(profile_name=profile)
-    return session.client(
-        'bedrock-runtime',
-        region_name=region,
-        config=Config(
-            retries={
-                'total_max_attempts': 20,
-                'mode': 'adaptive',
-            },
-            read_timeout=300,
-        ),
+    """  # noqa: E501
+    key = (
+        region,
+        profile,
+        max_pool_connections,
+        connect_timeout,
+        read_timeout,
+        tcp_keepalive,
+        max_attempts,
+        endpoint_url,
     )
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            session: Session
+            if profile is None:
+                session = _get_default_session()
+            else:
+                session = Session(profile_name=profile)
+            client = _clients[key] = session.client(
+                'bedrock-runtime',
+                region_name=region,
+                endpoint_url=endpoint_url,
+                config=Config(
+                    retries={
+                        'total_max_attempts': max_attempts,
+                        'mode': 'adaptive',
+                    },
+                    max_pool_connections=max_pool_connections,
+                    connect_timeout=connect_timeout,
+                    read_timeout=read_timeout,
+                    tcp_keepalive=tcp_keepalive,
+                ),
+            )
+    return client
+
+
+def clear_bedrock_clients() -> None:
+    """Forget the cached clients, so the next calls to get_bedrock_client create new ones."""
+    with _clients_lock:
+        _clients.clear()
+
+
+def warmup(client: BedrockRuntimeClient, connections: Optional[int] = None) -> int:
+    """Open TLS connections to the endpoint of a client ahead of the first request.
+
+    The connections are opened in parallel and returned to the client's pool, so the first
+    requests reuse them instead of paying for the handshake. No request is sent. Connections
+    going through a proxy are not warmed up.
+
+    botocore has no public API for its connection pool, so this relies on internals of
+    botocore and urllib3. If they are not laid out as expected, nothing is warmed up and the
+    first requests open their connections as usual.
+
+    Args:
+        client (BedrockRuntimeClient): The client to warm up.
+        connections (Optional[int], optional): The number of connections to open. Defaults to None, which fills the pool.
+
+    Returns:
+        int: The number of connections opened, not counting those that were already open.
+    """  # noqa: E501
+    pool = _connection_pool(client)
+    if pool is None:
+        return 0
+    pool_size = client.meta.config.max_pool_connections
+    connections = pool_size if connections is None else min(connections, pool_size)
+    if connections < 1:
+        return 0
+    # taking every connection out of the pool at once makes the pool hand out distinct ones
+    idle = [pool._get_conn() for _ in range(connections)]
+    cold = [connection for connection in idle if not _is_connected(connection)]
+    try:
+        if cold:
+            with ThreadPoolExecutor(max_workers=len(cold)) as executor:
+                list(executor.map(lambda connection: connection.connect(), cold))
+    finally:
+        for connection in idle:
+            pool._put_conn(connection)
+    return len(cold)
+
+
+def _connection_pool(client: BedrockRuntimeClient) -> Optional[Any]:
+    """The urllib3 connection pool of the client's endpoint, or None if it cannot be reached."""
+    url = client.meta.endpoint_url
+    try:
+        # botocore keeps its urllib3 pool manager on the endpoint of the client
+        http_session = client._endpoint.http_session  # type: ignore[attr-defined]
+        pool = http_session._get_connection_manager(url).connection_from_url(url)
+    except AttributeError:
+        return None
+    if not (
+        callable(getattr(pool, '_get_conn', None)) and callable(getattr(pool, '_put_conn', None))
+    ):
+        return None
+    return pool
+
+
+def _is_connected(connection: Any) -> bool:
+    is_connected = getattr(connection, 'is_connected', None)
+    # urllib3 before 2.0 has no is_connected, but a connection without a socket is not open
+    return getattr(connection, 'sock', None) is not None if is_connected is None else is_connected
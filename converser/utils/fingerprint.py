@@ -0,0 +1,31 @@
+"""Stable fingerprints of Bedrock requests."""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Mapping, Sequence, Union
+
+
+def _encode_default(value: Any) -> Union[Dict[str, str], List[Any]]:
+    if isinstance(value, (bytes, bytearray)):
+        # hash attachments instead of inlining them, the digest is all the key needs
+        return {'__sha256__': hashlib.sha256(value).hexdigest()}
+    if isinstance(value, Sequence):
+        # message views, encoded like the lists they stand for
+        return list(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def request_fingerprint(request: Mapping[str, Any]) -> str:
+    """Compute a stable hash of a Converse request.
+
+    The request is serialized as canonical JSON, with sorted keys and no whitespace, so equal
+    requests get the same fingerprint whatever the order their keys were built in.
+
+    Args:
+        request (Mapping[str, Any]): The keyword arguments of the converse call.
+
+    Returns:
+        str: The SHA-256 hex digest of the canonical request.
+    """
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), default=_encode_default)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
@@ -0,0 +1,224 @@
+"""Opt-in timing of the phases of Bedrock calls, to tell library overhead from network time."""
+
+import cProfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
+
+
+T = TypeVar('T')
+
+_END = object()
+_local = threading.local()
+
+
+class PhaseStats(NamedTuple):
+    """The timings of one phase, in nanoseconds."""
+
+    count: int
+    total_ns: int
+    min_ns: int
+    max_ns: int
+
+    @property
+    def mean_ns(self) -> float:
+        """The mean duration of the phase."""
+        return self.total_ns / self.count if self.count else 0.0
+
+
+class Profiler:
+    """Time every phase of the calls of a `Converse`, and aggregate the timings per phase.
+
+    Pass it as `Converse(profiler=...)`. The phases of a call are `read_file`, `validate`,
+    `history`, `build_request` and `record_turn` in converser; `serialize`, `network` and
+    `parse` in botocore, timed through its event hooks; and, for streams, `first_event`,
+    `receive_events` (waiting for and decoding events) and `process_events` (converser's
+    work on them). `send_messages` and `stream_messages` time whole calls; a stream counts
+    until its last event, including the time the caller spends between events.
+
+    The botocore phases are only timed for calls made on the calling thread, so not for calls
+    with a timeout or hedging. `cprofile` wraps calls in cProfile for a function-level view.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the Profiler class."""
+        self._stats: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, elapsed_ns: int) -> None:
+        """Add one timing of a phase."""
+        with self._lock:
+            stats = self._stats.get(phase)
+            if stats is None:
+                self._stats[phase] = [1, elapsed_ns, elapsed_ns, elapsed_ns]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed_ns
+                stats[2] = min(stats[2], elapsed_ns)
+                stats[3] = max(stats[3], elapsed_ns)
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Time the body of the with statement as one run of a phase."""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter_ns() - start)
+
+    @contextmanager
+    def activate(self) -> Iterator[None]:
+        """Let the botocore hooks time the calls made on this thread within the statement."""
+        previous = getattr(_local, 'profiler', None)
+        _local.profiler = self
+        try:
+            yield
+        finally:
+            _local.profiler = previous
+
+    @contextmanager
+    def call(self, phase: str) -> Iterator[None]:
+        """Time a whole call as one run of a phase, with the botocore hooks active."""
+        with self.phase(phase), self.activate():
+            yield
+
+    def stream(
+        self,
+        phase: str,
+        open_stream: Callable[[], Iterable[Any]],
+        process: Callable[[Iterable[Any]], Iterable[T]],
+    ) -> Generator[T, None, None]:
+        """Time a stream opened by `open_stream` and turned into items by `process`.
+
+        Args:
+            phase (str): The phase timing the whole stream.
+            open_stream (Callable[[], Iterable[Any]]): Opens the stream of raw events, when the first item is requested.
+            process (Callable[[Iterable[Any]], Iterable[T]]): Turns the events into the items yielded.
+        """  # noqa: E501
+        start = time.perf_counter_ns()
+        received = 0
+
+        def receive() -> Generator[Any, None, None]:
+            nonlocal received
+            before = time.perf_counter_ns()
+            with self.activate():
+                iterator = iter(open_stream())
+            received += time.perf_counter_ns() - before
+            while True:
+                before = time.perf_counter_ns()
+                with self.activate():
+                    event = next(iterator, _END)
+                received += time.perf_counter_ns() - before
+                if event is _END:
+                    return
+                yield event
+
+        items = iter(process(receive()))
+        busy = 0
+        first = True
+        try:
+            while True:
+                before = time.perf_counter_ns()
+                item = next(items, _END)
+                now = time.perf_counter_ns()
+                busy += now - before
+                if first:
+                    self.record('first_event', now - start)
+                    first = False
+                if item is _END:
+                    return
+                yield item
+        finally:
+            self.record('receive_events', received)
+            self.record('process_events', busy - received)
+            self.record(phase, time.perf_counter_ns() - start)
+
+    @contextmanager
+    def cprofile(self, path: Optional[str] = None) -> Iterator[cProfile.Profile]:
+        """Run the body of the with statement under cProfile.
+
+        Args:
+            path (Optional[str], optional): Where to dump the pstats once the statement ends. Defaults to None.
+
+        Returns:
+            Iterator[cProfile.Profile]: The profile, to inspect with pstats.
+        """  # noqa: E501
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            if path is not None:
+                profile.dump_stats(path)
+
+    def stats(self) -> Dict[str, PhaseStats]:
+        """The timings of every phase recorded so far."""
+        with self._lock:
+            return {phase: PhaseStats(*stats) for phase, stats in self._stats.items()}
+
+    def report(self) -> str:
+        """The timings as a table, in microseconds."""
+        lines = [f'{"phase":<16}{"count":>8}{"mean us":>12}{"min us":>12}{"max us":>12}']
+        for phase, stats in self.stats().items():
+            lines.append(
+                f'{phase:<16}{stats.count:>8}{stats.mean_ns / 1_000:>12.1f}'
+                f'{stats.min_ns / 1_000:>12.1f}{stats.max_ns / 1_000:>12.1f}'
+            )
+        return '\n'.join(lines)
+
+    def reset(self) -> None:
+        """Forget the timings recorded so far."""
+        with self._lock:
+            self._stats.clear()
+
+
+def _mark(phase: Optional[str], start: Optional[str]) -> Callable[..., None]:
+    """A botocore hook ending the `phase` started by the previous mark, and starting `start`."""
+
+    def hook(**kwargs: Any) -> None:
+        profiler: Optional[Profiler] = getattr(_local, 'profiler', None)
+        if profiler is None:
+            return
+        now = time.perf_counter_ns()
+        marks = _local.__dict__.setdefault('marks', {})
+        if phase is not None and phase in marks:
+            profiler.record(phase, now - marks.pop(phase))
+        if start is not None:
+            marks[start] = now
+
+    return hook
+
+
+# botocore events, in the order they are emitted for every attempt of a call
+_HOOKS = (
+    ('before-parameter-build.*', _mark(None, 'serialize')),
+    ('before-send.*', _mark('serialize', 'network')),
+    ('before-parse.*', _mark('network', 'parse')),
+    ('needs-retry.*', _mark('parse', None)),
+)
+
+
+def install_profiler_hooks(client: Any) -> None:
+    """Let profilers time the botocore phases of the calls of a boto3 client.
+
+    The hooks do nothing unless a profiler is active on the calling thread. Objects that are
+    not boto3 clients are left as they are.
+    """
+    events = getattr(getattr(client, 'meta', None), 'events', None)
+    if events is None:
+        return
+    for event_name, hook in _HOOKS:
+        events.register(event_name, hook, unique_id=f'converser-profiler-{event_name}')
@@ -0,0 +1,69 @@
+"""Cheap token estimates for Bedrock messages."""
+
+import json
+from mypy_boto3_bedrock_runtime.type_defs import MessageUnionTypeDef
+from typing import Any, Iterable, Mapping
+
+
+# Rough averages: about four characters of English text per token, and a flat cost per image
+# since the dimensions are not known without decoding it.
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1600
+
+
+def _estimate_block_tokens(block: Mapping[str, Any]) -> int:
+    if 'text' in block:
+        return len(block['text']) // CHARS_PER_TOKEN + 1
+    if 'image' in block:
+        return IMAGE_TOKENS
+    if 'document' in block:
+        return _source_size(block['document']['source']) // CHARS_PER_TOKEN + 1
+    if 'toolUse' in block:
+        return len(json.dumps(block['toolUse'].get('input', {}))) // CHARS_PER_TOKEN + 1
+    if 'toolResult' in block:
+        return estimate_content_tokens(block['toolResult'].get('content', []))
+    if 'json' in block:
+        return len(json.dumps(block['json'])) // CHARS_PER_TOKEN + 1
+    return 0
+
+
+def _source_size(source: Mapping[str, Any]) -> int:
+    data = source.get('bytes')
+    if data is not None:
+        return len(data)
+    # the size BlobStore records next to a blob reference, or nothing for other sources
+    return source.get('blobSize', 0)
+
+
+def estimate_content_tokens(content: Iterable[Mapping[str, Any]]) -> int:
+    """Estimate the number of input tokens of a list of content blocks."""
+    return sum(_estimate_block_tokens(block) for block in content)
+
+
+def estimate_message_tokens(message: MessageUnionTypeDef) -> int:
+    """Estimate the number of input tokens of a message.
+
+    This is a heuristic meant for budgeting, not an exact count: the real number depends on
+    the model's tokenizer.
+
+    Args:
+        message (MessageUnionTypeDef): The message to estimate.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return estimate_content_tokens(message.get('content', []))  # type: ignore[arg-type]
+
+
+def estimate_request_tokens(request: Mapping[str, Any]) -> int:
+    """Estimate the tokens a Converse request can consume: its input plus the output budget.
+
+    Args:
+        request (Mapping[str, Any]): The keyword arguments of a converse or converse_stream call.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    tokens = sum(estimate_message_tokens(message) for message in request.get('messages', []))
+    tokens += estimate_content_tokens(request.get('system', []))
+    return tokens + request.get('inferenceConfig', {}).get('maxTokens', 0)
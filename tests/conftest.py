@@ -0,0 +1,10 @@
+"""Shared fixtures that let the tests run without AWS access."""
+
+import pytest
+from converser.testing import StubBedrockClient
+
+
+@pytest.fixture
+def stub_client():
+    """A stub bedrock-runtime client."""
+    return StubBedrockClient()
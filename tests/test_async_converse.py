@@ -0,0 +1,93 @@
+"""Test the AsyncConverse class."""
+
+import asyncio
+import pytest
+import threading
+from converser import AsyncConverse, Memory
+from converser.testing import StubBedrockClient
+
+
+def test_async_send_messages(stub_client):
+    """Test a single non-streaming request."""
+
+    async def main():
+        async with AsyncConverse(model_id='test-model', client=stub_client) as converse:
+            return await converse.send_messages([{'role': 'user', 'content': [{'text': 'Hi'}]}])
+
+    response = asyncio.run(main())
+
+    assert response['output']['message']['content'][0]['text'] == 'Hello there!'
+    assert stub_client.calls[0]['modelId'] == 'test-model'
+
+
+def test_async_streaming_with_memory(stub_client):
+    """Test that streaming yields the same events and updates memory."""
+    memory = Memory()
+
+    async def main():
+        async with AsyncConverse(
+            model_id='test-model', client=stub_client, memory=memory
+        ) as converse:
+            stream = await converse.send_messages(
+                [{'role': 'user', 'content': [{'text': 'Hi'}]}], streaming=True
+            )
+            return [item async for item in stream]
+
+    events = asyncio.run(main())
+
+    assert all('done' in event for event, _ in events)
+    final = [message for event, message in events if event['done']]
+    assert final == [{'role': 'assistant', 'content': [{'text': 'Hello there!'}]}]
+    assert len(memory.get_history()) == 2
+
+
+def test_async_invalid_order_raises_on_await(stub_client):
+    """Test that an invalid message order raises before any request is made."""
+
+    async def main():
+        async with AsyncConverse(model_id='test-model', client=stub_client) as converse:
+            await converse.send_messages(
+                [{'role': 'assistant', 'content': [{'text': 'Hi'}]}], streaming=True
+            )
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+    assert stub_client.calls == []
+
+
+def test_async_concurrency_is_bounded():
+    """Test that no more than max_concurrency requests are in flight at once."""
+    client = StubBedrockClient(latency=0.02)
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+    converse_call = client.converse
+
+    def tracking_converse(**kwargs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        try:
+            return converse_call(**kwargs)
+        finally:
+            with lock:
+                in_flight -= 1
+
+    client.converse = tracking_converse  # type: ignore[method-assign]
+
+    async def main():
+        async with AsyncConverse(
+            model_id='test-model', client=client, max_concurrency=4
+        ) as converse:
+            return await asyncio.gather(
+                *(
+                    converse.send_messages([{'role': 'user', 'content': [{'text': str(i)}]}])
+                    for i in range(20)
+                )
+            )
+
+    responses = asyncio.run(main())
+
+    assert len(responses) == 20
+    assert 1 < peak <= 4
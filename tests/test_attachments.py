@@ -0,0 +1,198 @@
+"""Test the BlobStore class and the attachment elision policy."""
+
+import pytest
+from converser import Converse, Memory
+from converser.conversation_memory import AttachmentElisionPolicy, BlobStore, MissingBlobError
+from converser.conversation_memory.blob_store import BLOB_REF_KEY, BLOB_SIZE_KEY
+from converser.utils.tokens import estimate_message_tokens
+
+
+def _image_message(data: bytes):
+    return {
+        'role': 'user',
+        'content': [
+            {'text': 'Describe this'},
+            {'image': {'format': 'png', 'source': {'bytes': data}}},
+        ],
+    }
+
+
+def test_blob_store_round_trip_and_disk_tier(tmp_path):
+    """Test that blobs evicted from the LRU are read back from disk."""
+    store = BlobStore(tmp_path, max_memory_bytes=1500, min_size=1)
+    first = store.put(b'a' * 1000)
+    second = store.put(b'b' * 1000)
+
+    assert store.put(b'a' * 1000) == first
+    assert store.get(first) == b'a' * 1000
+    assert store.get(second) == b'b' * 1000
+    assert first in store
+    with pytest.raises(KeyError):
+        BlobStore().get(first)
+
+
+def test_blob_store_without_directory_keeps_evicted_blobs():
+    """Test that a store without a directory bounds memory without losing evicted blobs."""
+    import gc
+
+    store = BlobStore(max_memory_bytes=1500, min_size=1)
+    first = store.put(b'a' * 1000)
+    store.put(b'b' * 1000)
+    reference = {'role': 'user', 'content': [{'image': {'source': {BLOB_REF_KEY: first}}}]}
+
+    assert first not in store._lru and first in store
+    resolved = store.resolve_messages([reference])  # type: ignore[list-item]
+    assert resolved[0]['content'][0]['image']['source'] == {'bytes': b'a' * 1000}  # type: ignore
+    with pytest.raises(MissingBlobError):
+        store.get('0' * 64)
+
+    # the temporary directory goes away with the store
+    directory = store.directory
+    del store
+    gc.collect()
+    assert not directory.exists()
+
+
+def test_externalize_and_resolve_copy_on_write():
+    """Test that only messages with attachments are copied."""
+    store = BlobStore()
+    text_message = {'role': 'assistant', 'content': [{'text': 'ok'}]}
+    messages = [_image_message(b'x' * 2048), text_message]
+
+    externalized = store.externalize_messages(messages)  # type: ignore[arg-type]
+    source = externalized[0]['content'][1]['image']['source']  # type: ignore
+    assert source == {BLOB_REF_KEY: store.put(b'x' * 2048), BLOB_SIZE_KEY: 2048}
+    assert externalized[1] is text_message
+    assert messages[0]['content'][1]['image']['source']['bytes'] == b'x' * 2048  # type: ignore
+
+    resolved = store.resolve_messages(externalized)
+    assert resolved[0]['content'][1]['image']['source']['bytes'] == b'x' * 2048  # type: ignore
+    assert store.resolve_messages(resolved) is resolved
+
+
+def test_blob_reference_token_estimate():
+    """Test that a referenced document is estimated from the size of its bytes."""
+    store = BlobStore()
+    message = {
+        'role': 'user',
+        'content': [
+            {'document': {'format': 'txt', 'name': 'notes', 'source': {'bytes': b'x' * 4000}}}
+        ],
+    }
+
+    externalized = store.externalize_messages([message])  # type: ignore[list-item]
+
+    assert estimate_message_tokens(externalized[0]) == estimate_message_tokens(message)  # type: ignore
+
+
+def test_converse_keeps_references_in_memory(stub_client, tmp_path):
+    """Test that memory holds references while the client receives the bytes."""
+    image = tmp_path / 'image.png'
+    image.write_bytes(b'\x89PNG' * 1024)
+    memory = Memory()
+    converse = Converse(
+        model_id='test-model', memory=memory, client=stub_client, blob_store=BlobStore()
+    )
+
+    converse.from_file(str(image), 'image')
+    converse.send_messages([{'role': 'user', 'content': [{'text': 'And now?'}]}])
+
+    stored_source = memory.get_history()[0]['content'][1]['image']['source']  # type: ignore
+    assert BLOB_REF_KEY in stored_source
+    sent_source = stub_client.calls[1]['messages'][0]['content'][1]['image']['source']
+    assert sent_source == {'bytes': b'\x89PNG' * 1024}
+
+    # files below the size threshold stay inline, like any other small source
+    icon = tmp_path / 'icon.png'
+    icon.write_bytes(b'\x89PNG')
+    converse.from_file(str(icon), 'image')
+    assert memory.get_history()[-2]['content'][1]['image']['source'] == {'bytes': b'\x89PNG'}  # type: ignore
+
+
+def test_attachment_policy_elides_old_turns(stub_client, tmp_path):
+    """Test that attachments are replaced once they are more than max_turns old."""
+    document = tmp_path / 'report.pdf'
+    document.write_bytes(b'%PDF' * 512)
+    summaries = []
+
+    def summarizer(block):
+        summaries.append(block)
+        return 'a short report'
+
+    sent_documents = []
+    converse_call = stub_client.converse
+
+    def tracking_converse(**kwargs):
+        blocks = [block for message in kwargs['messages'] for block in message['content']]
+        sent_documents.append(sum('document' in block for block in blocks))
+        return converse_call(**kwargs)
+
+    stub_client.converse = tracking_converse
+    memory = Memory()
+    converse = Converse(
+        model_id='test-model',
+        memory=memory,
+        client=stub_client,
+        attachment_policy=AttachmentElisionPolicy(max_turns=1, summarizer=summarizer),
+    )
+    converse.from_file(str(document), 'document')
+    converse.send_messages([{'role': 'user', 'content': [{'text': 'Turn two'}]}])
+    converse.send_messages([{'role': 'user', 'content': [{'text': 'Turn three'}]}])
+    converse.send_messages([{'role': 'user', 'content': [{'text': 'Turn four'}]}])
+
+    assert sent_documents == [1, 1, 0, 0]
+    assert stub_client.calls[2]['messages'][0]['content'][1] == {
+        'text': '[Summary of a document from an earlier turn: a short report]'
+    }
+    # memory keeps the original, so what it holds, counts and persists never disagree
+    assert 'document' in memory.get_history()[0]['content'][1]  # type: ignore
+    assert len(summaries) == 1
+
+
+def test_attachment_policy_byte_budget():
+    """Test that the oldest attachments are elided first when over the byte budget."""
+    policy = AttachmentElisionPolicy(max_turns=None, max_bytes=3000)
+    history = []
+    for i in range(3):
+        history += [
+            _image_message(bytes([i]) * 2000),
+            {'role': 'assistant', 'content': [{'text': 'ok'}]},
+        ]
+    new_message = _image_message(b'new' * 2000)
+
+    request = policy.elide([*history, new_message], len(history))  # type: ignore[list-item]
+
+    kept = ['image' in message['content'][1] for message in request[::2]]  # type: ignore
+    assert kept == [False, False, True, True]
+    assert request[0]['content'][1] == {  # type: ignore
+        'text': '[image from an earlier turn was removed]'
+    }
+    assert 'image' in history[0]['content'][1]  # type: ignore
+    assert request[1] is history[1] and request[4] is history[4]
+    recent = history[4:]
+    assert policy.elide(recent) is recent
+
+
+def test_attachment_policy_applies_after_reload(stub_client, tmp_path):
+    """Test that a reloaded SqliteMemory history is elided as before the reload."""
+    from converser import SqliteMemory
+
+    def converse(memory):
+        return Converse(
+            model_id='test-model',
+            memory=memory,
+            client=stub_client,
+            attachment_policy=AttachmentElisionPolicy(max_turns=1),
+        )
+
+    memory = SqliteMemory('session', tmp_path / 'memory.db')
+    converse(memory).send_messages([_image_message(b'x' * 2048)])  # type: ignore[list-item]
+    converse(memory).send_messages([{'role': 'user', 'content': [{'text': 'Two'}]}])
+    memory.close()
+
+    reloaded = SqliteMemory('session', tmp_path / 'memory.db')
+    converse(reloaded).send_messages([{'role': 'user', 'content': [{'text': 'Three'}]}])
+
+    sent = stub_client.calls[-1]['messages'][0]['content'][1]
+    assert sent == {'text': '[image from an earlier turn was removed]'}
+    assert 'image' in reloaded.get_history()[0]['content'][1]  # type: ignore
@@ -0,0 +1,73 @@
+"""Test the cached Bedrock clients."""
+
+import boto3
+import socket
+import threading
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from converser import AsyncConverse
+from converser.utils import clear_bedrock_clients, get_bedrock_client, warmup
+
+
+def test_clients_are_cached_per_settings():
+    """Test that the same settings share one client, and different settings do not."""
+    clear_bedrock_clients()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: get_bedrock_client('us-west-2'), range(16)))
+
+    assert all(client is clients[0] for client in clients)
+    assert get_bedrock_client('us-east-1') is not clients[0]
+    pooled = get_bedrock_client('us-west-2', max_pool_connections=32, tcp_keepalive=True)
+    assert pooled is not clients[0]
+    assert pooled.meta.config.max_pool_connections == 32
+    assert pooled.meta.config.tcp_keepalive is True
+    assert pooled.meta.config.read_timeout == 300
+
+    clear_bedrock_clients()
+    assert get_bedrock_client('us-west-2') is not clients[0]
+
+
+def test_async_converse_pool_matches_concurrency():
+    """Test that AsyncConverse sizes the connection pool of its client to its concurrency."""
+    converse = AsyncConverse(model_id='test-model', max_concurrency=24)
+    try:
+        assert converse.client.meta.config.max_pool_connections == 24
+    finally:
+        converse.close()
+
+
+def test_warmup_opens_pooled_connections():
+    """Test that warmup opens connections to the endpoint and leaves them in the pool."""
+    server = socket.create_server(('127.0.0.1', 0))
+    accepted = []
+
+    def accept():
+        while len(accepted) < 3:
+            accepted.append(server.accept()[0])
+
+    acceptor = threading.Thread(target=accept)
+    acceptor.start()
+    client = boto3.client(
+        'bedrock-runtime',
+        region_name='us-west-2',
+        endpoint_url=f'http://127.0.0.1:{server.getsockname()[1]}',
+        config=Config(max_pool_connections=3),
+    )
+    try:
+        assert warmup(client) == 3
+        acceptor.join(timeout=5)
+        assert len(accepted) == 3
+        # the connections are already open, so a second warmup has nothing to do
+        assert warmup(client) == 0
+    finally:
+        for connection in accepted:
+            connection.close()
+        server.close()
+
+
+def test_warmup_skips_without_pool_internals(monkeypatch):
+    """Test that warmup does nothing, rather than fail, when botocore internals are missing."""
+    client = boto3.client('bedrock-runtime', region_name='us-west-2')
+    monkeypatch.delattr(type(client._endpoint.http_session), '_get_connection_manager')
+
+    assert warmup(client) == 0
@@ -0,0 +1,161 @@
+"""Test the response cache and request coalescing."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from converser import AsyncConverse, Converse, InferenceConfig, Memory, ResponseCache
+from converser.cache import SingleFlight
+from converser.streaming import events_from_response, response_from_events
+from converser.testing import StubBedrockClient
+
+
+def _converse(client, cache, **kwargs):
+    return Converse(
+        model_id='test-model',
+        client=client,
+        cache=cache,
+        inference_config=InferenceConfig(temperature=0),
+        **kwargs,
+    )
+
+
+def test_cache_serves_repeated_requests(stub_client):
+    """Test that an identical request is only sent once."""
+    converse = _converse(stub_client, ResponseCache())
+    messages = [{'role': 'user', 'content': [{'text': 'Hi'}]}]
+
+    first = converse.send_messages(messages)  # type: ignore[arg-type]
+    second = converse.send_messages(messages)  # type: ignore[arg-type]
+
+    assert first == second
+    assert len(stub_client.calls) == 1
+    assert converse.cache.hits == 1  # type: ignore[union-attr]
+
+
+def test_cache_bypasses_sampled_requests(stub_client):
+    """Test that requests with a temperature above zero are not cached by default."""
+    converse = Converse(model_id='test-model', client=stub_client, cache=ResponseCache())
+    messages = [{'role': 'user', 'content': [{'text': 'Hi'}]}]
+
+    converse.send_messages(messages)  # type: ignore[arg-type]
+    converse.send_messages(messages)  # type: ignore[arg-type]
+
+    assert len(stub_client.calls) == 2
+
+
+def test_cache_disk_tier_and_stream_replay(stub_client, tmp_path):
+    """Test that a streamed response is stored on disk and replayed in both modes."""
+    messages = [{'role': 'user', 'content': [{'text': 'Hi'}]}]
+    live = list(
+        _converse(stub_client, ResponseCache(directory=tmp_path)).send_messages(messages, True)  # type: ignore[arg-type]
+    )
+
+    memory = Memory()
+    converse = _converse(stub_client, ResponseCache(directory=tmp_path), memory=memory)
+    replayed = list(converse.send_messages(messages, True))  # type: ignore[arg-type]
+    response = _converse(stub_client, ResponseCache(directory=tmp_path)).send_messages(messages)  # type: ignore[arg-type]
+
+    assert len(stub_client.calls) == 1
+    assert replayed[-2][1] == live[-2][1]
+    assert memory.get_last_message() == live[-2][1]
+    assert response['output']['message']['content'] == [{'text': 'Hello there!'}]  # type: ignore
+
+
+def test_events_round_trip():
+    """Test that replayed events rebuild the original response."""
+    response = {
+        'output': {
+            'message': {
+                'role': 'assistant',
+                'content': [
+                    {'text': 'Let me look that up. ' * 5},
+                    {'toolUse': {'toolUseId': 't1', 'name': 'search', 'input': {'q': 'x'}}},
+                ],
+            }
+        },
+        'stopReason': 'tool_use',
+        'usage': {'inputTokens': 1, 'outputTokens': 2, 'totalTokens': 3},
+        'metrics': {'latencyMs': 5},
+    }
+
+    assert response_from_events(events_from_response(response, chunk_size=8)) == response  # type: ignore
+
+
+def test_single_flight_coalesces_threads():
+    """Test that identical concurrent requests share one call."""
+    client = StubBedrockClient(latency=0.2)
+    single_flight = SingleFlight()
+    messages = [{'role': 'user', 'content': [{'text': 'FAQ'}]}]
+    converses = [
+        Converse(model_id='test-model', client=client, single_flight=single_flight)
+        for _ in range(8)
+    ]
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda converse: converse.send_messages(messages), converses))
+
+    assert len(client.calls) == 1
+    assert single_flight.coalesced == 7
+    assert all(response == responses[0] for response in responses)
+
+
+def test_single_flight_fans_out_streams():
+    """Test that asyncio callers of an identical stream all receive every event."""
+    client = StubBedrockClient(text='one two three four', latency=0.05)
+
+    async def main():
+        async with AsyncConverse(
+            model_id='test-model', client=client, single_flight=SingleFlight()
+        ) as converse:
+
+            async def consume():
+                stream = await converse.send_messages(
+                    [{'role': 'user', 'content': [{'text': 'FAQ'}]}], streaming=True
+                )
+                return [item async for item in stream]
+
+            return await asyncio.gather(*(consume() for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert len(client.calls) == 1
+    finals = [events[-2][1] for events in results]
+    assert finals == [{'role': 'assistant', 'content': [{'text': 'one two three four'}]}] * 5
+    # every subscriber annotates its own copy of the events
+    firsts = [events[0][0] for events in results]
+    assert len({id(event) for event in firsts}) == 5
+
+
+def test_single_flight_closes_abandoned_streams():
+    """Test that a stream all its subscribers abandon is closed and not joined later."""
+    closed = []
+    opened = []
+
+    def open_stream():
+        def events():
+            try:
+                yield from ({'n': n} for n in range(10))
+            finally:
+                closed.append(True)
+
+        opened.append(True)
+        return events()
+
+    single_flight = SingleFlight()
+    first = single_flight.stream('key', open_stream)
+    second = single_flight.stream('key', open_stream)
+    assert next(first) == next(second) == {'n': 0}
+    event = next(first)
+    event['n'] = 'changed'
+    assert next(second) == {'n': 1}
+
+    first.close()
+    assert not closed
+    second.close()
+    assert closed == [True]
+
+    # a never-started subscription is counted out when collected
+    unstarted = single_flight.stream('key', open_stream)
+    del unstarted
+    assert list(single_flight.stream('key', open_stream)) == [{'n': n} for n in range(10)]
+    assert len(opened) == 2
+    assert single_flight._streams == {}
@@ -0,0 +1,86 @@
+"""Test recording Bedrock calls to a cassette and replaying them."""
+
+import pytest
+import time
+from botocore.exceptions import ClientError
+from converser import Converse
+from converser.testing import Cassette, FakeBedrock, StubBedrockClient
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'Tell me a story'}]}
+
+
+def run(client):
+    """A plain and a streamed call, returning the response and the final streamed message."""
+    converse = Converse(model_id='test-model', client=client)
+    response = converse.send_messages([MESSAGE])
+    final_messages = [message for _, message in converse.stream_messages([MESSAGE]) if message]
+    return response, final_messages[0]
+
+
+def test_replay_matches_recording(tmp_path):
+    """Test that replays return the recorded calls, instantly or at the recorded pace."""
+    path = tmp_path / 'cassette.json'
+    stub = StubBedrockClient('Once upon a time', latency=0.02)
+    recorded = run(Cassette(path, stub, mode='record'))
+
+    start = time.perf_counter()
+    replayed = run(Cassette(path, mode='replay'))
+    instant = time.perf_counter() - start
+    start = time.perf_counter()
+    run(Cassette(path, mode='replay', pace=1.0))
+    paced = time.perf_counter() - start
+
+    assert replayed == recorded
+    assert len(stub.calls) == 2
+    assert instant < 0.05 <= 0.1 <= paced
+
+
+def test_auto_mode_records_only_new_calls(tmp_path):
+    """Test that auto mode replays known requests and records the others."""
+    path = tmp_path / 'cassette.json'
+    stub = StubBedrockClient()
+    Converse(model_id='test-model', client=Cassette(path, stub)).send_messages([MESSAGE])
+
+    converse = Converse(model_id='test-model', client=Cassette(path, stub))
+    converse.send_messages([MESSAGE])
+    other = {'role': 'user', 'content': [{'text': 'Another one'}]}
+    converse.send_messages([other])
+
+    assert len(stub.calls) == 2
+    replay = Converse(model_id='test-model', client=Cassette(path, mode='replay'))
+    assert replay.send_messages([other])['stopReason'] == 'end_turn'
+    with pytest.raises(LookupError):
+        replay.send_messages([{'role': 'user', 'content': [{'text': 'Never sent'}]}])
+
+
+def test_errors_are_replayed(tmp_path):
+    """Test that a ClientError from a real client is recorded and raised again on replay."""
+    path = tmp_path / 'cassette.json'
+    with FakeBedrock(throttle_rate=1.0) as fake:
+        with pytest.raises(ClientError):
+            Cassette(path, fake.client(), mode='record').converse(
+                modelId='test-model', messages=[MESSAGE]
+            )
+
+    with pytest.raises(ClientError) as error:
+        Cassette(path, mode='replay').converse(modelId='test-model', messages=[MESSAGE])
+
+    assert error.value.response['Error']['Code'] == 'ThrottlingException'
+
+
+def test_calls_are_appended_as_recorded(tmp_path):
+    """Test that each recorded call adds one line, and that save rebuilds the same calls."""
+    path = tmp_path / 'cassette.jsonl'
+    cassette = Cassette(path, StubBedrockClient(), mode='record')
+    requests = [[{'role': 'user', 'content': [{'text': str(i)}]}] for i in range(5)]
+    for i, messages in enumerate(requests):
+        cassette.converse(modelId='test-model', messages=messages)
+        assert len(path.read_text(encoding='utf-8').splitlines()) == i + 1
+
+    cassette.save()
+
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 5
+    replay = Cassette(path, mode='replay')
+    for messages in requests:
+        replay.converse(modelId='test-model', messages=messages)
@@ -0,0 +1,131 @@
+"""Test the circuit breaker."""
+
+import pytest
+import time
+from botocore.exceptions import ClientError
+from converser import Converse
+from converser.resilience import CircuitBreaker, CircuitOpenError, CircuitState, RateLimiter
+from converser.testing import StubBedrockClient
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'Hello'}]}
+
+
+class FailingClient(StubBedrockClient):
+    """A stub client that fails with `error_code` while it is set."""
+
+    error_code = None
+
+    def converse(self, **kwargs):
+        """Fail, or answer normally."""
+        if self.error_code:
+            self.calls.append(kwargs)
+            raise ClientError({'Error': {'Code': self.error_code}}, 'Converse')
+        return super().converse(**kwargs)
+
+
+def test_opens_after_consecutive_failures_and_recovers():
+    """Test that a circuit opens, fails fast, half-opens after the timeout, then closes."""
+    client = FailingClient()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    converse = Converse(model_id='test-model', client=client, circuit_breaker=breaker)
+
+    client.error_code = 'ServiceUnavailableException'
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            converse.send_messages([MESSAGE])
+    with pytest.raises(CircuitOpenError):
+        converse.send_messages([MESSAGE])
+    assert len(client.calls) == 2
+    assert breaker.status('test-model').state == CircuitState.OPEN
+
+    time.sleep(0.06)
+    assert breaker.status('test-model').state == CircuitState.HALF_OPEN
+    client.error_code = None
+    converse.send_messages([MESSAGE])
+
+    status = breaker.statuses()['test-model']
+    assert status.state == CircuitState.CLOSED
+    assert status.trips == 1
+
+
+def test_failed_probe_reopens():
+    """Test that a failure while half-open opens the circuit again."""
+    client = FailingClient()
+    client.error_code = 'ThrottlingException'
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    converse = Converse(model_id='test-model', client=client, circuit_breaker=breaker)
+    with pytest.raises(ClientError):
+        converse.send_messages([MESSAGE])
+
+    time.sleep(0.02)
+    with pytest.raises(ClientError):
+        converse.send_messages([MESSAGE])
+
+    assert breaker.status('test-model') == (CircuitState.OPEN, 2, 2)
+
+
+def test_client_errors_do_not_count():
+    """Test that validation errors leave the circuit closed."""
+    client = FailingClient()
+    client.error_code = 'ValidationException'
+    breaker = CircuitBreaker(failure_threshold=1)
+    converse = Converse(model_id='test-model', client=client, circuit_breaker=breaker)
+    for _ in range(3):
+        with pytest.raises(ClientError):
+            converse.send_messages([MESSAGE])
+
+    assert breaker.status('test-model').state == CircuitState.CLOSED
+
+
+def test_client_errors_do_not_reset_failures():
+    """Test that validation errors between throttles neither reset the count nor close a probe."""
+    client = FailingClient()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.01)
+    converse = Converse(model_id='test-model', client=client, circuit_breaker=breaker)
+    for error_code in ['ThrottlingException', 'ValidationException', 'ThrottlingException']:
+        client.error_code = error_code
+        with pytest.raises(ClientError):
+            converse.send_messages([MESSAGE])
+    assert breaker.status('test-model') == (CircuitState.OPEN, 2, 1)
+
+    time.sleep(0.02)
+    client.error_code = 'ValidationException'
+    with pytest.raises(ClientError):
+        converse.send_messages([MESSAGE])
+
+    assert breaker.status('test-model') == (CircuitState.HALF_OPEN, 2, 1)
+
+
+def test_streams_are_guarded(stub_client):
+    """Test that streams go through the circuit, and that models have separate circuits."""
+    breaker = CircuitBreaker(failure_threshold=1)
+    converse = Converse(model_id='test-model', client=stub_client, circuit_breaker=breaker)
+    list(converse.send_messages([MESSAGE], streaming=True))
+    with pytest.raises(TimeoutError), breaker.guard('other-model'):
+        raise TimeoutError
+
+    assert breaker.status('test-model').state == CircuitState.CLOSED
+    other = Converse(model_id='other-model', client=stub_client, circuit_breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        list(other.send_messages([MESSAGE], streaming=True))
+
+
+def test_waiting_for_quota_does_not_count(stub_client):
+    """Test that running out of time while waiting for the rate limiter is not a failure."""
+    breaker = CircuitBreaker(failure_threshold=2)
+    converse = Converse(
+        model_id='test-model',
+        client=stub_client,
+        circuit_breaker=breaker,
+        rate_limiter=RateLimiter(requests_per_minute=1),
+    )
+    converse.send_messages([MESSAGE], timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            converse.send_messages([MESSAGE], timeout=0.05)
+        with pytest.raises(TimeoutError):
+            list(converse.send_messages([MESSAGE], streaming=True, timeout=0.05))
+
+    assert len(stub_client.calls) == 1
+    assert breaker.status('test-model') == (CircuitState.CLOSED, 0, 0)
@@ -0,0 +1,109 @@
+"""Test per-call deadlines."""
+
+import pytest
+import threading
+import time
+from converser import Converse, Memory
+from converser.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    Deadline,
+    DeadlineExceeded,
+    HedgePolicy,
+)
+from converser.resilience.deadline import current_deadline
+from converser.testing import StubBedrockClient
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'Hello'}]}
+
+
+def test_send_messages_deadline():
+    """Test that a call slower than its timeout raises instead of blocking the caller."""
+    converse = Converse(model_id='test-model', client=StubBedrockClient(latency=1))
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        converse.send_messages([MESSAGE], timeout=0.05)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_streaming_deadline_bounds_the_whole_stream():
+    """Test that a stream still running past the deadline raises mid-stream."""
+    converse = Converse(
+        model_id='test-model', client=StubBedrockClient('one two three four', latency=0.1)
+    )
+    events = []
+    with pytest.raises(DeadlineExceeded):
+        for event, _ in converse.send_messages([MESSAGE], streaming=True, timeout=0.25):
+            events.append(event)
+
+    assert 0 < len(events) < 8
+
+
+def test_deadline_met_with_memory(stub_client):
+    """Test that calls within their deadline behave as usual, memory included."""
+    memory = Memory()
+    converse = Converse(model_id='test-model', client=stub_client, memory=memory)
+
+    converse.send_messages([MESSAGE], timeout=5)
+    final = [
+        message
+        for event, message in converse.send_messages([MESSAGE], streaming=True, timeout=5)
+        if event['done']
+    ]
+
+    assert final[0]['content'] == [{'text': 'Hello there!'}]
+    assert len(memory.get_history()) == 4
+
+
+def test_timeouts_count_as_circuit_failures():
+    """Test that calls abandoned at their deadline trip the circuit breaker."""
+    breaker = CircuitBreaker(failure_threshold=2)
+    converse = Converse(
+        model_id='test-model', client=StubBedrockClient(latency=1), circuit_breaker=breaker
+    )
+
+    for _ in range(2):
+        with pytest.raises(DeadlineExceeded):
+            converse.send_messages([MESSAGE], timeout=0.05)
+
+    assert breaker.status('test-model').state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        converse.send_messages([MESSAGE], timeout=0.05)
+
+
+def test_hedged_calls_run_under_the_deadline():
+    """Test that the calls a hedge policy runs on its threads see the caller's deadline."""
+    policy = HedgePolicy(min_samples=1)
+    policy.record(0.001)
+    seen = []
+
+    def call(client, request):
+        seen.append(current_deadline())
+        time.sleep(0.05)
+        return 'response'
+
+    deadline = Deadline(5)
+    assert deadline.run(lambda: policy.send(call, None, {'messages': []})) == 'response'
+    assert seen and all(seen_deadline is deadline for seen_deadline in seen)
+
+
+def test_abandoned_stream_is_closed():
+    """Test that the thread reading a stream closes it once the caller stops reading."""
+    closed = threading.Event()
+
+    def open_stream():
+        try:
+            for n in range(100):
+                time.sleep(0.01)
+                yield n
+        finally:
+            closed.set()
+
+    stream = Deadline(5).stream(open_stream)
+    assert next(stream) == 0
+    stream.close()
+
+    assert closed.wait(1)
@@ -0,0 +1,68 @@
+"""Test the fake Bedrock runtime server through real boto3 clients."""
+
+import pytest
+import time
+from botocore.eventstream import EventStreamBuffer
+from botocore.exceptions import ClientError
+from converser import Converse
+from converser.bench.load import bench_load
+from converser.testing import FakeBedrock, encode_event
+from converser.utils import clear_bedrock_clients, get_bedrock_client
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'Tell me about Paris'}]}
+
+
+def test_events_decode_with_botocore():
+    """Test that encoded events pass botocore's length and checksum validation."""
+    buffer = EventStreamBuffer()
+    buffer.add_data(encode_event('contentBlockDelta', {'delta': {'text': 'été'}}))
+
+    message = next(iter(buffer))
+
+    assert message.headers[':event-type'] == 'contentBlockDelta'
+    assert message.payload == b'{"delta":{"text":"\\u00e9t\\u00e9"}}'
+
+
+def test_converse_and_stream_over_http():
+    """Test both APIs with echo replies, scripted tool use, and token pacing."""
+    tool_use = {'toolUse': {'toolUseId': '1', 'name': 'weather', 'input': {'city': 'Paris'}}}
+    with FakeBedrock(echo=True, replies=[[tool_use]], tokens_per_second=100) as fake:
+        converse = Converse(model_id='test-model', client=fake.client())
+
+        response = converse.send_messages([MESSAGE])
+        start = time.perf_counter()
+        events = list(converse.stream_messages([MESSAGE]))
+
+    assert response['stopReason'] == 'tool_use'
+    assert response['output']['message']['content'] == [tool_use]
+    assert events[-2][1]['content'] == [{'text': 'Tell me about Paris'}]
+    assert events[-1][0]['metadata']['usage']['outputTokens'] == 4
+    assert time.perf_counter() - start >= 0.03
+    assert fake.requests == 2
+
+
+def test_throttling_and_endpoint_url(monkeypatch):
+    """Test that throttled requests raise ThrottlingException through get_bedrock_client."""
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'fake')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'fake')
+    clear_bedrock_clients()
+    with FakeBedrock(throttle_rate=1.0) as fake:
+        client = get_bedrock_client('us-west-2', max_attempts=1, endpoint_url=fake.endpoint_url)
+        assert client is not get_bedrock_client('us-west-2', max_attempts=1)
+
+        with pytest.raises(ClientError) as error:
+            client.converse(modelId='test-model', messages=[MESSAGE])
+
+    assert error.value.response['Error']['Code'] == 'ThrottlingException'
+    assert fake.throttled == 1
+    clear_bedrock_clients()
+
+
+def test_load_benchmark_reports_percentiles():
+    """Test that the load benchmark runs against the fake server and orders its percentiles."""
+    results = bench_load(requests=20, concurrency=4, streaming=True)
+
+    assert results['errors'] == 0
+    assert results['throughput_rps'] > 0
+    assert results['p50_ms'] <= results['p95_ms'] <= results['p99_ms']
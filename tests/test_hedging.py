@@ -0,0 +1,101 @@
+"""Test hedged requests."""
+
+import pytest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from converser import Converse
+from converser.resilience import HedgePolicy
+from converser.testing import StubBedrockClient
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'Hello'}]}
+
+
+class StallingClient(StubBedrockClient):
+    """A stub client whose calls stall once `stall` is set."""
+
+    stall = False
+
+    def converse(self, **kwargs):
+        """Answer after a long pause when stalling."""
+        if self.stall:
+            time.sleep(1)
+        return super().converse(**kwargs)
+
+
+def test_slow_request_is_hedged():
+    """Test that a request slower than the percentile delay is answered by its hedge."""
+    client = StallingClient('Slow', latency=0.01)
+    hedging = HedgePolicy(percentile=50, max_extra_load=1, client=StubBedrockClient('Fast'))
+    converse = Converse(model_id='test-model', client=client, hedging=hedging)
+    for _ in range(hedging.min_samples):
+        converse.send_messages([MESSAGE])
+    assert 0.005 < hedging.delay() < 0.5
+
+    client.stall = True
+    start = time.perf_counter()
+    response = converse.send_messages([MESSAGE])
+
+    assert time.perf_counter() - start < 0.5
+    assert response['output']['message']['content'] == [{'text': 'Fast'}]
+    assert (hedging.hedges, hedging.hedge_wins) == (1, 1)
+
+
+def test_extra_load_is_capped():
+    """Test that no hedge is sent beyond the extra load budget."""
+    client = StallingClient(latency=0.01)
+    hedging = HedgePolicy(percentile=50, max_extra_load=0, min_samples=2)
+    converse = Converse(model_id='test-model', client=client, hedging=hedging)
+    for _ in range(2):
+        converse.send_messages([MESSAGE])
+
+    client.stall = True
+    converse.send_messages([MESSAGE])
+
+    assert hedging.hedges == 0
+    assert len(client.calls) == 3
+
+
+def test_no_hedging_without_samples(stub_client):
+    """Test that requests are not hedged until enough latencies are known."""
+    hedging = HedgePolicy(max_extra_load=1)
+    converse = Converse(model_id='test-model', client=stub_client, hedging=hedging)
+    converse.send_messages([MESSAGE])
+
+    assert hedging.delay() is None
+    assert hedging.requests == 1
+    assert len(stub_client.calls) == 1
+
+
+def test_policy_closes_only_its_own_pool():
+    """Test that closing a policy shuts down the pool it created, and not one passed to it."""
+    with HedgePolicy(min_samples=1) as hedging:
+        converse = Converse(model_id='test-model', client=StubBedrockClient(), hedging=hedging)
+        converse.send_messages([MESSAGE])
+        converse.send_messages([MESSAGE])
+    with pytest.raises(RuntimeError):
+        converse.send_messages([MESSAGE])
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with HedgePolicy(min_samples=1, executor=pool) as hedging:
+            converse = Converse(model_id='test-model', client=StubBedrockClient(), hedging=hedging)
+            converse.send_messages([MESSAGE])
+            converse.send_messages([MESSAGE])
+        assert pool.submit(len, 'open').result() == 4
+
+
+def test_queued_hedge_is_cancelled():
+    """Test that a hedge still waiting for a worker is cancelled once the original answers."""
+    client = StallingClient(latency=0.01)
+    hedge_client = StubBedrockClient('Hedge')
+    with HedgePolicy(
+        percentile=50, max_extra_load=1, client=hedge_client, min_samples=2, max_workers=1
+    ) as hedging:
+        converse = Converse(model_id='test-model', client=client, hedging=hedging)
+        for _ in range(2):
+            converse.send_messages([MESSAGE])
+        client.stall = True
+        response = converse.send_messages([MESSAGE])
+
+    assert hedging.hedges == 1 and not hedge_client.calls
+    assert response['output']['message']['content'] == [{'text': 'Hello there!'}]
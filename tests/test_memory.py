@@ -0,0 +1,225 @@
+"""Test the Memory class."""
+
+import pytest
+from converser import Memory, SqliteMemory, WindowedMemory
+
+
+def test_memory_validates_appends_incrementally():
+    """Test that appends are validated against the role expected after the history."""
+    memory = Memory()
+    memory.add_messages([{'role': 'user', 'content': [{'text': 'Hi'}]}])
+    memory.add_messages([{'role': 'assistant', 'content': [{'text': 'Hello'}]}])
+
+    with pytest.raises(ValueError):
+        memory.add_messages([{'role': 'assistant', 'content': [{'text': 'Again'}]}])
+
+    # a rejected append leaves the history untouched
+    assert len(memory.get_history()) == 2
+    memory.add_messages(
+        [
+            {'role': 'user', 'content': [{'text': 'How are you?'}]},
+            {'role': 'assistant', 'content': [{'text': 'Well'}]},
+        ]
+    )
+    assert memory.get_last_message()['role'] == 'assistant'
+
+
+def test_memory_clear_resets_expected_role():
+    """Test that clearing the history expects a user message again."""
+    memory = Memory()
+    memory.add_messages([{'role': 'user', 'content': [{'text': 'Hi'}]}])
+    memory.clear_history()
+
+    with pytest.raises(ValueError):
+        memory.add_messages([{'role': 'assistant', 'content': [{'text': 'Hello'}]}])
+    memory.add_messages([{'role': 'user', 'content': [{'text': 'Hi'}]}])
+    assert len(memory.get_history()) == 1
+
+
+def test_request_view_leaves_history_untouched():
+    """Test that the request view reads the history in place, as it was on entry."""
+    memory = WindowedMemory(max_tokens=4, token_estimator=lambda message: 1)
+    memory.add_messages(
+        [
+            {'role': 'user', 'content': [{'text': 'Hi'}]},
+            {'role': 'assistant', 'content': [{'text': 'Hello'}]},
+        ]
+    )
+    new_message = {'role': 'user', 'content': [{'text': 'How are you?'}]}
+
+    with memory.request_view([new_message]) as request_messages:  # type: ignore[list-item]
+        first = memory.history[0]
+        assert not isinstance(request_messages, list)
+        assert request_messages._history is memory.history  # type: ignore[attr-defined]
+        assert request_messages[0] is first
+        assert request_messages[-1] is new_message
+        assert len(request_messages) == 3
+        assert len(memory.get_history()) == 2
+
+        # later turns, and the eviction of the first one, do not change the view
+        memory.add_messages(_turn('Later'))  # type: ignore[arg-type]
+        memory.add_messages(_turn('Latest'))  # type: ignore[arg-type]
+        assert memory.history[0] is not first
+        assert list(request_messages) == [first, request_messages[1], new_message]
+
+
+def test_message_view_is_sent_by_boto3_clients():
+    """Test that botocore, which only accepts lists, takes a message view."""
+    import boto3
+    from botocore.stub import ANY, Stubber
+    from converser import Converse
+
+    client = boto3.client('bedrock-runtime', region_name='us-west-2')
+    response = {
+        'output': {'message': {'role': 'assistant', 'content': [{'text': 'Hi'}]}},
+        'stopReason': 'end_turn',
+        'usage': {'inputTokens': 1, 'outputTokens': 1, 'totalTokens': 2},
+        'metrics': {'latencyMs': 1},
+    }
+    memory = Memory()
+    converse = Converse(model_id='test-model', memory=memory, client=client)
+    with Stubber(client) as stubber:
+        for _ in range(2):
+            stubber.add_response(
+                'converse',
+                response,
+                {'modelId': 'test-model', 'messages': ANY, 'system': ANY, 'inferenceConfig': ANY},
+            )
+        converse.send_messages([{'role': 'user', 'content': [{'text': 'Hi'}]}])
+        converse.send_messages([{'role': 'user', 'content': [{'text': 'Again'}]}])
+
+    assert len(memory.get_history()) == 4
+
+
+def test_converse_sends_history_snapshot(stub_client):
+    """Test that Converse sends the history plus the new message and records the turn."""
+    from converser import Converse
+
+    memory = Memory()
+    converse = Converse(model_id='test-model', memory=memory, client=stub_client)
+    converse.send_messages([{'role': 'user', 'content': [{'text': 'Hi'}]}])
+    converse.send_messages([{'role': 'user', 'content': [{'text': 'Again'}]}])
+
+    assert stub_client.calls[1]['messages'] == memory.history[:3]
+    assert len(stub_client.calls[0]['messages']) == 1
+    assert len(memory.get_history()) == 4
+
+    events = list(
+        converse.send_messages([{'role': 'user', 'content': [{'text': 'Stream'}]}], True)
+    )
+    assert events[-2][0]['done']
+    assert stub_client.calls[2]['messages'] == memory.history[:5]
+    assert len(memory.get_history()) == 6
+
+
+def test_concurrent_calls_never_see_pending_turns():
+    """Test that concurrent calls on one memory only ever see recorded turns."""
+    from concurrent.futures import ThreadPoolExecutor
+    from converser import Converse
+    from converser.testing import StubBedrockClient
+
+    client = StubBedrockClient(latency=0.005)
+    memory = Memory()
+    converse = Converse(model_id='test-model', memory=memory, client=client)
+    converse_call = client.converse
+    observed = []
+
+    def checking_converse(**kwargs):
+        # both what was sent and what memory holds meanwhile must be whole turns
+        observed.append((len(kwargs['messages']), list(memory.get_history())))
+        return converse_call(**kwargs)
+
+    client.converse = checking_converse  # type: ignore[method-assign]
+
+    def send(index: int) -> None:
+        converse.send_messages([{'role': 'user', 'content': [{'text': f'question {index}'}]}])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(send, range(64)))
+
+    assert len(observed) == 64
+    for sent, history in observed:
+        assert sent % 2 == 1
+        assert len(history) % 2 == 0
+        assert [message['role'] for message in history] == ['user', 'assistant'] * (
+            len(history) // 2
+        )
+    assert len(memory.get_history()) == 128
+
+
+def _turn(text: str):
+    return [
+        {'role': 'user', 'content': [{'text': text}]},
+        {'role': 'assistant', 'content': [{'text': text}]},
+    ]
+
+
+def test_windowed_memory_evicts_oldest_pairs():
+    """Test that the window evicts whole turns and keeps the pinned ones."""
+    memory = WindowedMemory(max_tokens=3, pinned_turns=1, token_estimator=lambda message: 1)
+    for i in range(4):
+        memory.add_messages(_turn(str(i)))  # type: ignore[arg-type]
+
+    texts = [message['content'][0]['text'] for message in memory.get_history()]  # type: ignore
+    assert texts == ['0', '0', '3', '3']
+    assert memory.total_tokens == 4
+    # the history still alternates, so the next turn is accepted
+    memory.add_messages(_turn('4'))  # type: ignore[arg-type]
+    assert memory.get_history()[2]['content'][0]['text'] == '4'  # type: ignore
+
+
+def test_windowed_memory_counts_each_message_once():
+    """Test that old messages are never re-estimated."""
+    estimated = []
+
+    def estimator(message):
+        estimated.append(message)
+        return 10
+
+    memory = WindowedMemory(max_tokens=1_000, token_estimator=estimator)
+    for i in range(5):
+        memory.add_messages(_turn(str(i)))  # type: ignore[arg-type]
+
+    assert len(estimated) == 10
+    assert memory.total_tokens == 100
+
+
+def test_sqlite_memory_shares_history_across_connections(tmp_path):
+    """Test that two connections to one database see the same session."""
+    path = tmp_path / 'memory.db'
+    writer = SqliteMemory('session', path)
+    reader = SqliteMemory('session', path)
+    writer.add_messages(_turn('0'))  # type: ignore[arg-type]
+    assert len(reader.get_history()) == 2
+
+    # the reader's view catches up incrementally, and validation uses the stored history
+    reader.add_messages(_turn('1'))  # type: ignore[arg-type]
+    with pytest.raises(ValueError):
+        writer.add_messages([{'role': 'assistant', 'content': [{'text': 'x'}]}])
+    assert len(writer.get_history()) == 4
+    assert SqliteMemory('other', path).get_history() == []
+
+
+def test_sqlite_memory_window_and_export(tmp_path):
+    """Test tail loading, bytes round-tripping and the JSON lines export."""
+    import io
+    import json
+
+    path = tmp_path / 'memory.db'
+    memory = SqliteMemory('session', path)
+    for i in range(5):
+        memory.add_messages(_turn(str(i)))  # type: ignore[arg-type]
+    memory.add_messages(
+        [{'role': 'user', 'content': [{'image': {'format': 'png', 'source': {'bytes': b'\x89'}}}]}]
+    )
+
+    windowed = SqliteMemory('session', path, window=4)
+    history = windowed.get_history()
+    assert [message['role'] for message in history] == ['user', 'assistant', 'user']
+    assert history[-1]['content'][0]['image']['source']['bytes'] == b'\x89'  # type: ignore
+
+    buffer = io.StringIO()
+    assert memory.export(buffer) == 11
+    lines = [json.loads(line) for line in buffer.getvalue().splitlines()]
+    assert [line['seq'] for line in lines] == list(range(11))
+    assert memory.sessions() == ['session']
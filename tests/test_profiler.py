@@ -0,0 +1,69 @@
+"""Test the per-phase profiler."""
+
+import boto3
+import json
+import pstats
+from botocore.awsrequest import AWSResponse
+from converser import Converse, Memory, Profiler
+from converser.testing import StubBedrockClient
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'Hello'}]}
+RESPONSE = {
+    'output': {'message': {'role': 'assistant', 'content': [{'text': 'Hi'}]}},
+    'stopReason': 'end_turn',
+    'usage': {'inputTokens': 1, 'outputTokens': 1, 'totalTokens': 2},
+    'metrics': {'latencyMs': 1},
+}
+
+
+class RawResponse:
+    """The raw body of a canned HTTP response."""
+
+    def stream(self, **kwargs):
+        """Yield the body."""
+        yield json.dumps(RESPONSE).encode()
+
+
+def test_phases_of_calls_and_streams(tmp_path):
+    """Test that converser's phases are timed for plain and streamed calls, with cProfile."""
+    profiler = Profiler()
+    converse = Converse(
+        model_id='test-model', client=StubBedrockClient(), memory=Memory(), profiler=profiler
+    )
+
+    with profiler.cprofile(str(tmp_path / 'calls.pstats')):
+        converse.send_messages([MESSAGE])
+        list(converse.send_messages([MESSAGE], streaming=True))
+
+    stats = profiler.stats()
+    assert stats['validate'].count == stats['history'].count == 2
+    assert stats['record_turn'].count == 2
+    assert stats['send_messages'].count == stats['stream_messages'].count == 1
+    assert stats['receive_events'].count == stats['process_events'].count == 1
+    assert stats['send_messages'].total_ns >= stats['build_request'].min_ns
+    assert 'stream_messages' in profiler.report()
+    assert pstats.Stats(str(tmp_path / 'calls.pstats')).total_calls > 0
+
+
+def test_botocore_phases():
+    """Test that serialization, network and parsing are timed through the botocore hooks."""
+    client = boto3.client(
+        'bedrock-runtime',
+        region_name='us-west-2',
+        aws_access_key_id='test',
+        aws_secret_access_key='test',
+    )
+    client.meta.events.register(
+        'before-send.bedrock-runtime.Converse',
+        lambda request, **kwargs: AWSResponse(request.url, 200, {}, RawResponse()),
+    )
+    profiler = Profiler()
+    converse = Converse(model_id='test-model', client=client, profiler=profiler)
+
+    response = converse.send_messages([MESSAGE])
+
+    assert response['output']['message']['content'] == [{'text': 'Hi'}]
+    stats = profiler.stats()
+    assert {'serialize', 'network', 'parse'} <= set(stats)
+    assert stats['send_messages'].total_ns > stats['serialize'].total_ns
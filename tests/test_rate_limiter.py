@@ -0,0 +1,100 @@
+"""Test the client-side rate limiter."""
+
+import pytest
+import time
+from converser import Converse, InferenceConfig, RateLimiter
+from converser.resilience import Quota
+
+
+def test_requests_per_minute_bucket():
+    """Test that a full bucket allows a burst, then holds requests back."""
+    limiter = RateLimiter(requests_per_minute=2)
+    limiter.reserve('model', 0)
+    limiter.reserve('model', 0)
+
+    with pytest.raises(TimeoutError):
+        limiter.reserve('model', 0, timeout=1)
+    # every model has its own bucket
+    limiter.reserve('other-model', 0)
+
+
+def test_reconcile_gives_back_unused_tokens():
+    """Test that tokens reserved but not used become available again."""
+    limiter = RateLimiter(tokens_per_minute=1000)
+    reservation = limiter.reserve('model', 900)
+    with pytest.raises(TimeoutError):
+        limiter.reserve('model', 900, timeout=0)
+
+    limiter.reconcile(reservation, 100)
+
+    limiter.reserve('model', 800, timeout=0)
+
+
+def test_per_model_quotas_replace_defaults():
+    """Test that a model-specific quota takes precedence over the default one."""
+    limiter = RateLimiter(requests_per_minute=1, quotas={'fast': Quota(requests_per_minute=100)})
+    for _ in range(10):
+        limiter.reserve('fast', 0, timeout=0)
+    limiter.reserve('slow', 0, timeout=0)
+    with pytest.raises(TimeoutError):
+        limiter.reserve('slow', 0, timeout=0)
+
+
+def test_waits_for_refill():
+    """Test that a reservation waits for the bucket to refill instead of failing."""
+    limiter = RateLimiter(requests_per_minute=600)
+    for _ in range(600):
+        limiter.reserve('model', 0)
+
+    start = time.perf_counter()
+    limiter.reserve('model', 0)
+    assert 0.05 < time.perf_counter() - start < 1
+
+
+def test_converse_reconciles_with_usage(stub_client):
+    """Test that Converse reserves before sending and reconciles with the reported usage."""
+    limiter = RateLimiter(tokens_per_minute=10_000)
+    converse = Converse(
+        model_id='test-model',
+        client=stub_client,
+        rate_limiter=limiter,
+        inference_config=InferenceConfig(maxTokens=4000),
+    )
+    message = {'role': 'user', 'content': [{'text': 'Hello'}]}
+
+    # without reconciling, the third request would have to wait for the 4000 output tokens
+    for _ in range(3):
+        converse.send_messages([message])
+    for _ in converse.send_messages([message], streaming=True):
+        pass
+
+    assert len(stub_client.calls) == 4
+    limiter.reserve('test-model', 9_900, timeout=0)
+
+
+def test_abandoned_stream_is_reconciled(stub_client):
+    """Test that a stream the caller stops reading gives back its unused output budget."""
+    limiter = RateLimiter(tokens_per_minute=10_000)
+    request = {
+        'modelId': 'test-model',
+        'messages': [{'role': 'user', 'content': [{'text': 'Hello'}]}],
+        'inferenceConfig': {'maxTokens': 4000},
+    }
+
+    events = iter(limiter.stream(stub_client, request))
+    next(events)
+    events.close()  # type: ignore[attr-defined]
+
+    limiter.reserve('test-model', 9_900, timeout=0)
+
+
+def test_file_lock_shares_buckets(tmp_path):
+    """Test that limiters sharing a lock file share their buckets."""
+    first = RateLimiter(requests_per_minute=3, lock_file=tmp_path / 'limits.json')
+    second = RateLimiter(requests_per_minute=3, lock_file=tmp_path / 'limits.json')
+    first.reserve('model', 0)
+    second.reserve('model', 0)
+    first.reserve('model', 0)
+
+    with pytest.raises(TimeoutError):
+        second.reserve('model', 0, timeout=0)
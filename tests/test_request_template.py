@@ -0,0 +1,52 @@
+"""Test the precompiled request template of Converse."""
+
+from converser import Converse, InferenceConfig
+from converser.testing import StubBedrockClient
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'Hello'}]}
+
+
+def test_template_is_reused_until_invalidated():
+    """Test that requests share the compiled template until one of its sources changes."""
+    client = StubBedrockClient()
+    converse = Converse(
+        model_id='test-model',
+        client=client,
+        guardrail_config={'guardrailIdentifier': 'guard', 'guardrailVersion': '1'},
+        additional_model_request_fields={'top_k': 50},
+    )
+    converse.send_messages([MESSAGE])
+    converse.send_messages([MESSAGE])
+    first, second = client.calls
+
+    assert first['inferenceConfig'] is second['inferenceConfig']
+    assert first['guardrailConfig']['guardrailIdentifier'] == 'guard'
+    assert first['additionalModelRequestFields'] == {'top_k': 50}
+    assert 'messages' not in converse.request_template()
+
+    converse.inference_config.maxTokens = 100
+    converse.send_messages([MESSAGE])
+    converse.inference_config = InferenceConfig(temperature=0)
+    converse.model_id = 'other-model'
+    converse.send_messages([MESSAGE])
+
+    assert client.calls[2]['inferenceConfig']['maxTokens'] == 100
+    assert client.calls[3]['inferenceConfig']['temperature'] == 0
+    assert client.calls[3]['modelId'] == 'other-model'
+
+
+def test_tool_config_default_and_override():
+    """Test that a call's tool config replaces the default one, and streams use the template."""
+    client = StubBedrockClient()
+    default = {'tools': [{'toolSpec': {'name': 'a', 'inputSchema': {'json': {}}}}]}
+    override = {'tools': [{'toolSpec': {'name': 'b', 'inputSchema': {'json': {}}}}]}
+    converse = Converse(model_id='test-model', client=client, tool_config=default)
+
+    converse.send_messages([MESSAGE])
+    converse.send_messages([MESSAGE], tool_config=override)
+    converse.model_id = 'other-model'
+    list(converse.stream_messages([MESSAGE]))
+
+    assert [call['toolConfig'] for call in client.calls] == [default, override, default]
+    assert client.calls[2]['modelId'] == 'other-model'
@@ -0,0 +1,178 @@
+"""Test the multi-region router."""
+
+import boto3
+import pytest
+import time
+from botocore.exceptions import ClientError
+from botocore.stub import ANY, Stubber
+from converser import Converse, Memory
+from converser.resilience import RegionRouter
+from converser.testing import StubBedrockClient
+
+
+RESPONSE = {
+    'output': {'message': {'role': 'assistant', 'content': [{'text': 'Hi'}]}},
+    'stopReason': 'end_turn',
+    'usage': {'inputTokens': 1, 'outputTokens': 1, 'totalTokens': 2},
+    'metrics': {'latencyMs': 1},
+}
+PARAMS = {'modelId': 'test-model', 'messages': ANY, 'system': ANY, 'inferenceConfig': ANY}
+MESSAGE = {'role': 'user', 'content': [{'text': 'Hello'}]}
+
+
+@pytest.fixture
+def stubbed_clients():
+    """Stubber-backed clients for two regions."""
+    clients = {
+        region: boto3.client('bedrock-runtime', region_name=region)
+        for region in ('us-west-2', 'us-east-1')
+    }
+    stubbers = {region: Stubber(client) for region, client in clients.items()}
+    for stubber in stubbers.values():
+        stubber.activate()
+    yield clients, stubbers
+    for stubber in stubbers.values():
+        stubber.deactivate()
+
+
+def test_fails_over_on_throttling(stubbed_clients):
+    """Test that a throttled call is retried in the next region, which then ranks first."""
+    clients, stubbers = stubbed_clients
+    stubbers['us-west-2'].add_client_error(
+        'converse', service_error_code='ThrottlingException', http_status_code=429
+    )
+    stubbers['us-east-1'].add_response('converse', RESPONSE, PARAMS)
+    stubbers['us-east-1'].add_response('converse', RESPONSE, PARAMS)
+    router = RegionRouter(clients)
+    converse = Converse(model_id='test-model', client=router)
+
+    assert converse.send_messages([MESSAGE])['output']['message']['content'] == [{'text': 'Hi'}]
+    assert router.ranked_regions('test-model') == ['us-east-1', 'us-west-2']
+    converse.send_messages([MESSAGE])
+
+    health = router.health()
+    assert health['us-west-2'].failures == 1
+    assert health['us-east-1'].requests == 2
+    assert health['us-east-1'].latency is not None
+    for stubber in stubbers.values():
+        stubber.assert_no_pending_responses()
+
+
+def test_other_errors_are_raised(stubbed_clients):
+    """Test that errors other than throttling do not fail over."""
+    clients, stubbers = stubbed_clients
+    stubbers['us-west-2'].add_client_error('converse', service_error_code='ValidationException')
+    router = RegionRouter(clients)
+
+    with pytest.raises(ClientError, match='ValidationException'):
+        router.converse(modelId='test-model', messages=[MESSAGE])
+    stubbers['us-east-1'].assert_no_pending_responses()
+
+
+def test_last_region_error_is_raised(stubbed_clients):
+    """Test that the error of the last region is raised when every region is throttled."""
+    clients, stubbers = stubbed_clients
+    for stubber in stubbers.values():
+        stubber.add_client_error('converse', service_error_code='ServiceUnavailableException')
+    router = RegionRouter(clients)
+
+    with pytest.raises(ClientError, match='ServiceUnavailableException'):
+        router.converse(modelId='test-model', messages=[MESSAGE])
+    assert all(health.failures == 1 for health in router.health().values())
+
+
+def test_model_regions_restrict_routing():
+    """Test that a model is only sent to the regions listed for it."""
+    clients = {'us-west-2': StubBedrockClient(), 'us-east-1': StubBedrockClient('East')}
+    router = RegionRouter(clients, model_regions={'east-only': ['us-east-1']})
+    converse = Converse(model_id='east-only', client=router)
+
+    for event, message in converse.send_messages([MESSAGE], streaming=True):
+        if event['done']:
+            assert message['content'] == [{'text': 'East'}]
+    assert not clients['us-west-2'].calls
+    with pytest.raises(ValueError):
+        RegionRouter(clients, model_regions={'model': ['eu-west-1']})
+
+
+def test_stream_fails_over_before_first_event():
+    """Test that a stream throttled before its first event is reopened in the next region."""
+
+    class ThrottledStream(StubBedrockClient):
+        def _events(self, content):
+            raise ClientError({'Error': {'Code': 'ThrottlingException'}}, 'ConverseStream')
+            yield
+
+    clients = {'us-west-2': ThrottledStream(), 'us-east-1': StubBedrockClient('East')}
+    router = RegionRouter(clients)
+
+    events = list(router.converse_stream(modelId='test-model', messages=[MESSAGE])['stream'])
+
+    assert events[0] == {'messageStart': {'role': 'assistant'}}
+    assert router.health()['us-west-2'].failures == 1
+
+
+def test_demoted_region_recovers():
+    """Test that a region demoted by a failure is tried again once its error rate decays."""
+
+    class ThrottledOnce(StubBedrockClient):
+        def converse(self, **kwargs):
+            if not self.calls:
+                self.calls.append(kwargs)
+                raise ClientError({'Error': {'Code': 'ThrottlingException'}}, 'Converse')
+            return super().converse(**kwargs)
+
+    clients = {'us-west-2': ThrottledOnce(), 'us-east-1': StubBedrockClient('East')}
+    router = RegionRouter(clients, error_half_life=0.05)
+
+    router.converse(modelId='test-model', messages=[MESSAGE])
+    assert router.ranked_regions('test-model') == ['us-east-1', 'us-west-2']
+
+    time.sleep(0.3)
+    assert router.health()['us-west-2'].error_rate == 0.0
+    assert router.ranked_regions('test-model')[0] == 'us-west-2'
+    response = router.converse(modelId='test-model', messages=[MESSAGE])
+    assert response['output']['message']['content'] == [{'text': 'Hello there!'}]
+
+
+def test_hooks_are_installed_in_every_region(stubbed_clients):
+    """Test that the botocore hooks of Converse reach the client of every region."""
+    clients, stubbers = stubbed_clients
+    stubbers['us-west-2'].add_response('converse', RESPONSE, PARAMS)
+    stubbers['us-west-2'].add_client_error(
+        'converse', service_error_code='ThrottlingException', http_status_code=429
+    )
+    stubbers['us-east-1'].add_response('converse', RESPONSE, PARAMS)
+    memory = Memory()
+    converse = Converse(model_id='test-model', client=RegionRouter(clients), memory=memory)
+
+    # the history is sent as a message view, which botocore only takes through the hook
+    converse.send_messages([MESSAGE])
+    converse.send_messages([MESSAGE])
+
+    assert len(memory.get_history()) == 4
+    for client in clients.values():
+        handlers = client.meta.events._emitter._unique_id_handlers
+        assert {'converser-deadline', 'converser-message-view'} <= set(handlers)
+    for stubber in stubbers.values():
+        stubber.assert_no_pending_responses()
+
+
+def test_streams_and_calls_are_ranked_separately():
+    """Test that the time to the first event of streams does not mix with call latencies."""
+
+    class SlowFirstEvent(StubBedrockClient):
+        def converse_stream(self, **kwargs):
+            time.sleep(0.05)
+            return super().converse_stream(**kwargs)
+
+    clients = {'us-west-2': SlowFirstEvent(), 'us-east-1': StubBedrockClient(latency=0.05)}
+    router = RegionRouter(clients, model_regions={'west': ['us-west-2'], 'east': ['us-east-1']})
+    for model_id in ('west', 'east'):
+        router.converse(modelId=model_id, messages=[MESSAGE])
+        list(router.converse_stream(modelId=model_id, messages=[MESSAGE])['stream'])
+
+    assert router.ranked_regions('test-model') == ['us-west-2', 'us-east-1']
+    assert router.ranked_regions('test-model', stream=True) == ['us-east-1', 'us-west-2']
+    health = router.health()
+    assert health['us-west-2'].first_event_latency > health['us-west-2'].latency
@@ -0,0 +1,41 @@
+"""Test the batch API of the Converse class."""
+
+import pytest
+from converser import Converse, Memory
+from converser.testing import StubBedrockClient
+
+
+def test_send_many_keeps_input_order():
+    """Test that results come back in input order with per-item errors."""
+    converse = Converse(model_id='test-model', client=StubBedrockClient(latency=0.01))
+    batch = [[{'role': 'user', 'content': [{'text': str(i)}]}] for i in range(8)]
+    batch[3] = [{'role': 'assistant', 'content': [{'text': 'out of order'}]}]
+
+    results = converse.send_many(batch, max_workers=4)
+
+    assert [result.index for result in results] == list(range(8))
+    assert not results[3].ok
+    assert isinstance(results[3].error, ValueError)
+    assert all(result.ok for i, result in enumerate(results) if i != 3)
+
+
+def test_iter_many_streaming(stub_client):
+    """Test that streaming requests yield the final assistant message."""
+    converse = Converse(model_id='test-model', client=stub_client)
+    batch = [[{'role': 'user', 'content': [{'text': str(i)}]}] for i in range(3)]
+
+    results = list(converse.iter_many(batch, streaming=True))
+
+    assert sorted(result.index for result in results) == [0, 1, 2]
+    assert all(
+        result.response == {'role': 'assistant', 'content': [{'text': 'Hello there!'}]}
+        for result in results
+    )
+
+
+def test_send_many_rejects_memory(stub_client):
+    """Test that a shared memory cannot be used for independent requests."""
+    converse = Converse(model_id='test-model', client=stub_client, memory=Memory())
+
+    with pytest.raises(ValueError):
+        converse.send_many([[{'role': 'user', 'content': [{'text': 'Hi'}]}]])
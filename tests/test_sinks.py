@@ -0,0 +1,86 @@
+"""Test the stream sinks."""
+
+import io
+import pytest
+from converser import Converse
+from converser.streaming import CallbackSink, FileSink, QueueSink, TextSink, process_stream
+from converser.testing import StubBedrockClient
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'Hello'}]}
+TEXT = 'one two three four five'
+
+
+class CountingIO(io.StringIO):
+    """A text buffer that counts writes."""
+
+    writes = 0
+
+    def write(self, text):
+        """Count and write."""
+        self.writes += 1
+        return super().write(text)
+
+
+def test_sinks_share_one_stream(tmp_path):
+    """Test that several sinks receive the text and events of one stream."""
+    buffer = CountingIO()
+    texts = []
+    queue_sink = QueueSink()
+    file_sink = FileSink(str(tmp_path / 'reply.log'), fsync=True)
+    converse = Converse(model_id='test-model', client=StubBedrockClient(TEXT))
+    sinks = [
+        TextSink(buffer, flush_interval=60),
+        file_sink,
+        queue_sink,
+        CallbackSink(texts.append),
+    ]
+
+    events = list(converse.send_messages([MESSAGE], streaming=True, sinks=sinks))
+    file_sink.close()
+
+    assert buffer.getvalue() == TEXT and buffer.writes == 1
+    assert (tmp_path / 'reply.log').read_text() == TEXT
+    assert ''.join(texts) == TEXT
+    queued = [queue_sink.queue.get() for _ in range(len(events) + 1)]
+    assert queued[-1] is None
+    assert [event for event, _ in queued[:-1]] == [event for event, _ in events]
+    assert queued[-2][0]['done'] is False and queued[-3][1]['role'] == 'assistant'
+
+
+def test_buffer_flushes_when_full_and_on_error():
+    """Test that a full buffer is written out, and that sinks see the error ending a stream."""
+    buffer = CountingIO()
+    queue_sink = QueueSink()
+
+    def events():
+        yield {'messageStart': {'role': 'assistant'}}
+        for word in TEXT.split(' '):
+            yield {'contentBlockDelta': {'delta': {'text': word}, 'contentBlockIndex': 0}}
+        raise ConnectionError('lost')
+
+    sinks = [TextSink(buffer, flush_interval=60, max_buffer=6), queue_sink]
+    with pytest.raises(ConnectionError):
+        list(process_stream(events(), sinks=sinks))
+
+    assert buffer.getvalue() == TEXT.replace(' ', '') and 1 < buffer.writes < 5
+    items = list(queue_sink.queue.queue)
+    assert isinstance(items[-1], ConnectionError)
+
+
+def test_text_is_written_when_a_block_stops():
+    """Test that buffered text is written out at the end of a block, not held through a pause."""
+    buffer = CountingIO()
+    seen_during_pause = []
+
+    def events():
+        yield {'messageStart': {'role': 'assistant'}}
+        yield {'contentBlockDelta': {'delta': {'text': TEXT}, 'contentBlockIndex': 0}}
+        yield {'contentBlockStop': {'contentBlockIndex': 0}}
+        # the model pauses here, for example before a tool call
+        seen_during_pause.append(buffer.getvalue())
+        yield {'messageStop': {'stopReason': 'end_turn'}}
+
+    list(process_stream(events(), sinks=[TextSink(buffer, flush_interval=60)]))
+
+    assert seen_during_pause == [TEXT]
@@ -0,0 +1,217 @@
+"""Test the processing of streamed replies, including toolUse blocks."""
+
+import json
+import pytest
+import random
+import time
+from converser import Converse, Memory
+from converser.streaming import (
+    PartialJSONParser,
+    events_from_response,
+    process_stream,
+    response_from_events,
+)
+from converser.testing import StubBedrockClient
+from converser.tool_use import ToolRegistry
+from pydantic import BaseModel, Field, ValidationError
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'What is the weather?'}]}
+TOOL_USE = {
+    'toolUse': {'toolUseId': '1', 'name': 'weather', 'input': {'city': 'Paris', 'days': 3}}
+}
+
+
+def test_parser_handles_any_fragmentation():
+    """Test that a document split anywhere parses to the same value, and partial values grow."""
+    document = {'a': [1, -2.5e3, True, None, {'b': 'x "y" \\ é 😀'}], 'c': {}, 'd': ''}
+    text = json.dumps(document)
+    for _ in range(50):
+        parser = PartialJSONParser()
+        position = 0
+        while position < len(text):
+            size = random.randint(1, 6)
+            parser.feed(text[position : position + size])
+            position += size
+        assert parser.complete and parser.result() == document
+
+    parser = PartialJSONParser()
+    assert parser.feed('{"city": "Par') == {'city': 'Par'}
+    assert parser.feed('is", "days": 1') == {'city': 'Paris'}
+    with pytest.raises(ValueError):
+        parser.result()
+    with pytest.raises(ValueError):
+        PartialJSONParser().feed('{"city" "Paris"}')
+
+
+def test_parser_open_string_grows_across_fragments():
+    """Test that an open string is shown as it grows, including a split surrogate pair."""
+    parser = PartialJSONParser()
+    for i in range(100):
+        assert parser.feed('ab' if i else '{"text": "ab') == {'text': 'ab' * (i + 1)}
+    assert parser.feed('\\ud83d') == {'text': 'ab' * 100 + '\ud83d'}
+    assert parser.feed('\\ude00"}') == {'text': 'ab' * 100 + '😀'}
+    assert parser.complete
+
+
+def test_tool_without_arguments_completes():
+    """Test that a toolUse block stopping without any input completes with an empty input."""
+    raw = [
+        event
+        for event in StubBedrockClient()._events(
+            [{'toolUse': {'toolUseId': '1', 'name': 'now', 'input': {}}}]
+        )
+        if 'contentBlockDelta' not in event
+    ]
+
+    events = [event for event, _ in process_stream(raw)]
+
+    tool_use_input = [event for event in events if 'toolUseInput' in event][-1]['toolUseInput']
+    assert tool_use_input['complete'] and tool_use_input['input'] == {}
+
+
+def test_stream_assembles_tool_use():
+    """Test that tool arguments stream as partial inputs and end up in the final message."""
+    client = StubBedrockClient(replies=[[{'text': 'Let me check.'}, TOOL_USE]])
+    converse = Converse(model_id='test-model', client=client)
+
+    events = list(converse.send_messages([MESSAGE], streaming=True))
+
+    inputs = [event['toolUseInput'] for event, _ in events if 'toolUseInput' in event]
+    assert inputs[0]['name'] == 'weather' and not inputs[0]['complete']
+    assert inputs[-1]['complete'] and inputs[-1]['input'] == {'city': 'Paris', 'days': 3}
+    assert events[-2][1] == {'role': 'assistant', 'content': [{'text': 'Let me check.'}, TOOL_USE]}
+
+
+def test_process_stream_annotates_events_in_place():
+    """Test that events are annotated without a copy per event."""
+    raw = list(StubBedrockClient()._events([{'text': 'Let me check.'}, TOOL_USE]))
+
+    processed = list(process_stream(raw))
+
+    assert all(event is original for (event, _), original in zip(processed, raw))
+    assert processed[-2][0]['done'] and processed[-2][1]['role'] == 'assistant'
+    assert [e for e, _ in processed if 'toolUseInput' in e][-1]['toolUseInput']['complete']
+
+
+def test_stream_keeps_reasoning_blocks():
+    """Test that reasoning deltas end up in reasoning blocks, not in empty text blocks."""
+    content = [
+        {'reasoningContent': {'reasoningText': {'text': 'They greet me. ' * 3, 'signature': 's'}}},
+        {'reasoningContent': {'redactedContent': b'\x00\x01'}},
+        {'text': 'Hello!'},
+    ]
+    response = {
+        'output': {'message': {'role': 'assistant', 'content': content}},
+        'stopReason': 'end_turn',
+        'usage': {'inputTokens': 1, 'outputTokens': 2, 'totalTokens': 3},
+        'metrics': {'latencyMs': 5},
+    }
+
+    processed = list(process_stream(events_from_response(response, chunk_size=8)))  # type: ignore[arg-type]
+
+    assert processed[-2][1] == {'role': 'assistant', 'content': content}
+    assert response_from_events(events_from_response(response)) == response  # type: ignore[arg-type]
+
+
+class TimedClient(StubBedrockClient):
+    """A stub client that records when each stream ends."""
+
+    def _events(self, content):
+        yield from super()._events(content)
+        self.stream_ends = getattr(self, 'stream_ends', []) + [time.monotonic()]
+
+
+def test_run_agent_streaming_starts_tools_early():
+    """Test that a tool starts while the rest of the reply is still streaming."""
+    started = []
+    tools = ToolRegistry()
+
+    @tools.register
+    def weather(city: str, days: int) -> str:
+        """Get the weather in a city.
+
+        Args:
+            city (str): The name of the city.
+            days (int): The number of days to forecast.
+        """
+        started.append(time.monotonic())
+        return 'sunny'
+
+    trailing = {'text': ' '.join(['word'] * 20)}
+    client = TimedClient('It is sunny.', latency=0.005, replies=[[TOOL_USE, trailing]])
+    converse = Converse(model_id='test-model', client=client)
+
+    response = converse.run_agent([MESSAGE], tools, streaming=True)
+
+    assert response['output']['message']['content'] == [{'text': 'It is sunny.'}]
+    assert response['stopReason'] == 'end_turn' and 'usage' in response
+    assert started[0] < client.stream_ends[0] - 0.05
+    assert client.calls[1]['messages'][2]['content'][0]['toolResult']['status'] == 'success'
+
+
+class Forecast(BaseModel):
+    """A weather forecast."""
+
+    city: str
+    days: int = Field(gt=0)
+    summary: str
+
+
+FORECAST = {'toolUseId': '1', 'name': 'Forecast'}
+
+
+def test_send_structured_forces_the_tool():
+    """Test that the answer is validated into the model, through a forced tool call."""
+    answer = {**FORECAST, 'input': {'city': 'Paris', 'days': '3', 'summary': 'Sunny'}}
+    client = StubBedrockClient(replies=[[{'toolUse': answer}]])
+    converse = Converse(model_id='test-model', client=client)
+
+    forecast = converse.send_structured([MESSAGE], Forecast)
+
+    assert forecast == Forecast(city='Paris', days=3, summary='Sunny')
+    assert client.calls[0]['toolConfig']['toolChoice'] == {'tool': {'name': 'Forecast'}}
+    spec = client.calls[0]['toolConfig']['tools'][0]['toolSpec']
+    assert spec['description'] == 'A weather forecast.'
+
+
+def test_send_structured_streams_partial_objects():
+    """Test that fields are validated as they complete, and invalid ones fail early."""
+    answer = {**FORECAST, 'input': {'city': 'Paris', 'days': 3, 'summary': 'Sunny all week'}}
+    converse = Converse(
+        model_id='test-model', client=StubBedrockClient(replies=[[{'toolUse': answer}]])
+    )
+
+    partials = list(converse.send_structured([MESSAGE], Forecast, streaming=True))
+
+    assert partials[0].model_dump(exclude_unset=True) == {'city': 'Paris'}
+    assert partials[1].model_dump(exclude_unset=True) == {'city': 'Paris', 'days': 3}
+    assert partials[-1] == Forecast(city='Paris', days=3, summary='Sunny all week')
+
+    invalid = {**FORECAST, 'input': {'city': 'Paris', 'days': 0, 'summary': 'Sunny'}}
+    converse = Converse(
+        model_id='test-model', client=StubBedrockClient(replies=[[{'toolUse': invalid}]])
+    )
+    with pytest.raises(ValidationError):
+        list(converse.send_structured([MESSAGE], Forecast, streaming=True))
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_send_structured_keeps_memory_usable(streaming):
+    """Test that a structured answer is recorded as text, so the conversation can go on."""
+    answer = {**FORECAST, 'input': {'city': 'Paris', 'days': 3, 'summary': 'Sunny'}}
+    client = StubBedrockClient(replies=[[{'toolUse': answer}]])
+    memory = Memory()
+    converse = Converse(model_id='test-model', client=client, memory=memory)
+
+    forecast = converse.send_structured([MESSAGE], Forecast, streaming=streaming)
+    if streaming:
+        forecast = list(forecast)[-1]
+    converse.send_messages([{'role': 'user', 'content': [{'text': 'And tomorrow?'}]}])
+
+    assert forecast == Forecast(city='Paris', days=3, summary='Sunny')
+    sent = client.calls[1]
+    assert 'toolConfig' not in sent
+    assert not any('toolUse' in block for m in sent['messages'] for block in m['content'])
+    assert json.loads(memory.history[1]['content'][0]['text']) == answer['input']
+    assert len(memory.get_history()) == 4
@@ -0,0 +1,251 @@
+"""Test the tool registry and the agent loop."""
+
+import asyncio
+import pytest
+import time
+from converser import Converse, Memory
+from converser.testing import StubBedrockClient
+from converser.tool_use import ToolRegistry
+from converser.tool_use.tool_use import generate_tool_schema_from_function
+from pydantic import Field
+from typing import Annotated
+
+
+MESSAGE = {'role': 'user', 'content': [{'text': 'What is the weather?'}]}
+
+
+def tool_use(tool_use_id, name, **arguments):
+    """A toolUse content block."""
+    return {'toolUse': {'toolUseId': tool_use_id, 'name': name, 'input': arguments}}
+
+
+def make_registry():
+    """A registry with a slow sync tool, a slow async tool and a failing tool."""
+    tools = ToolRegistry(timeout=5)
+
+    @tools.register
+    def weather(city: str) -> dict:
+        """Get the weather in a city.
+
+        Args:
+            city (str): The name of the city.
+        """
+        time.sleep(0.2)
+        return {'city': city, 'forecast': 'sunny'}
+
+    @tools.register(name='population')
+    async def get_population(city: str) -> int:
+        """Get the population of a city.
+
+        Args:
+            city (str): The name of the city.
+        """
+        await asyncio.sleep(0.2)
+        return 1000
+
+    @tools.register(timeout=0.05)
+    def broken(city: str) -> str:
+        """Never answer in time.
+
+        Args:
+            city (str): The name of the city.
+        """
+        time.sleep(1)
+        return 'too late'
+
+    return tools
+
+
+def test_execute_runs_calls_concurrently():
+    """Test that the calls of a turn run concurrently and fail independently."""
+    tools = make_registry()
+    calls = [
+        tool_use('1', 'weather', city='Paris'),
+        tool_use('2', 'weather', city='Oslo'),
+        tool_use('3', 'population', city='Paris'),
+        tool_use('4', 'broken', city='Paris'),
+        tool_use('5', 'missing'),
+        tool_use('6', 'weather', town='Paris'),
+    ]
+
+    start = time.perf_counter()
+    results = [block['toolResult'] for block in tools.execute([c['toolUse'] for c in calls])]
+
+    assert time.perf_counter() - start < 0.5
+    assert [result['toolUseId'] for result in results] == ['1', '2', '3', '4', '5', '6']
+    assert results[0]['content'] == [{'json': {'city': 'Paris', 'forecast': 'sunny'}}]
+    assert results[2] == {'toolUseId': '3', 'content': [{'text': '1000'}], 'status': 'success'}
+    assert [result['status'] for result in results[3:]] == ['error'] * 3
+    assert 'timed out' in results[3]['content'][0]['text']
+    tools.close()
+
+
+def test_timeouts_are_reported_on_every_python():
+    """Test that timed-out futures and coroutines both read as timeouts to the model."""
+    from concurrent.futures import TimeoutError as FutureTimeoutError
+    from converser.tool_use.registry import _error_message
+
+    tools = ToolRegistry()
+
+    @tools.register(timeout=0.05)
+    async def slow(city: str) -> str:
+        """Never answer in time.
+
+        Args:
+            city (str): The name of the city.
+        """
+        await asyncio.sleep(1)
+        return 'too late'
+
+    results = tools.execute([tool_use('1', 'slow', city='Paris')['toolUse']])
+    tools.close()
+
+    assert results[0]['toolResult']['content'] == [{'text': 'Tool slow timed out'}]
+    for error in [FutureTimeoutError(), asyncio.TimeoutError(), TimeoutError()]:
+        assert _error_message({'name': 'slow'}, error) == 'Tool slow timed out'  # type: ignore[typeddict-item]
+
+
+def test_tool_config_lists_registered_tools():
+    """Test that tools are described under their registered names."""
+    tools = make_registry()
+
+    names = [tool['toolSpec']['name'] for tool in tools.tool_config()['tools']]
+
+    assert names == ['weather', 'population', 'broken']
+    assert 'population' in tools and len(tools) == 3
+
+
+def test_run_agent_loops_until_end_turn():
+    """Test that tool results are sent back until the model gives a final answer."""
+    client = StubBedrockClient(
+        'It is sunny.',
+        replies=[[{'text': 'Checking.'}, tool_use('1', 'weather', city='Paris')]],
+    )
+    converse = Converse(model_id='test-model', client=client)
+
+    response = converse.run_agent([MESSAGE], make_registry())
+
+    assert response['output']['message']['content'] == [{'text': 'It is sunny.'}]
+    assert all(call['toolConfig']['tools'] for call in client.calls)
+    final_request = client.calls[-1]['messages']
+    assert [message['role'] for message in final_request] == ['user', 'assistant', 'user']
+    assert final_request[2]['content'][0]['toolResult']['toolUseId'] == '1'
+
+
+def test_run_agent_with_memory_and_guard():
+    """Test the loop with memory, and that it stops after max_iterations requests."""
+    looping = [[tool_use(str(i), 'population', city='Oslo')] for i in range(5)]
+    memory = Memory()
+    converse = Converse(
+        model_id='test-model', client=StubBedrockClient(replies=looping), memory=memory
+    )
+
+    with pytest.raises(RuntimeError):
+        converse.run_agent([MESSAGE], make_registry(), max_iterations=3)
+
+    roles = [message['role'] for message in memory.get_history()]
+    assert roles == ['user', 'assistant'] * 3
+
+
+def test_inputs_are_validated_before_dispatch():
+    """Test that inputs are coerced to the signature, and invalid ones never reach the tool."""
+    calls = []
+    tools = ToolRegistry()
+
+    @tools.register
+    def forecast(city: str, days: int = 1) -> str:
+        """Get the forecast for a city.
+
+        Args:
+            city (str): The name of the city.
+            days (int): The number of days to forecast.
+        """
+        calls.append((city, days))
+        return 'sunny'
+
+    results = tools.execute(
+        [
+            tool_use('1', 'forecast', city='Paris', days='3')['toolUse'],
+            tool_use('2', 'forecast', city='Oslo')['toolUse'],
+            tool_use('3', 'forecast', city='Rome', days='many')['toolUse'],
+        ]
+    )
+
+    assert calls == [('Paris', 3), ('Oslo', 1)]
+    assert [block['toolResult']['status'] for block in results] == ['success'] * 2 + ['error']
+    assert 'ValidationError' in results[2]['toolResult']['content'][0]['text']
+    tools.close()
+
+
+def test_tool_config_is_cached_until_registration():
+    """Test that the same config is reused until another tool is registered."""
+    tools = make_registry()
+    config = tools.tool_config()
+
+    assert tools.tool_config() is config
+
+    @tools.register
+    def noop() -> None:
+        """Do nothing."""
+
+    assert len(tools.tool_config()['tools']) == 4
+
+
+def test_tool_schemas_are_unchanged():
+    """Test that the schemas published for functions stay as they have always been."""
+
+    def forecast(city: str, days: int = 1) -> dict:
+        """Get the forecast for a city.
+
+        Args:
+            city (str): The name of the city.
+            days (int): The number of days to forecast.
+        """
+        return {}
+
+    def search(
+        query: Annotated[str, Field(description='The text to look for')],
+        limit: Annotated[int, Field(gt=0, description='The maximum number of results')] = 10,
+    ):
+        """Search the catalogue."""
+
+    assert generate_tool_schema_from_function(forecast) == {
+        'toolSpec': {
+            'name': 'forecast',
+            'description': 'Get the forecast for a city.',
+            'inputSchema': {
+                'json': {
+                    'type': 'object',
+                    'properties': {
+                        'city': {'type': 'string', 'description': 'The name of the city.'},
+                        'days': {
+                            'type': 'integer',
+                            'description': 'The number of days to forecast.',
+                        },
+                    },
+                    'required': ['city'],
+                }
+            },
+        }
+    }
+    assert generate_tool_schema_from_function(search) == {
+        'toolSpec': {
+            'name': 'search',
+            'description': 'Search the catalogue.',
+            'inputSchema': {
+                'json': {
+                    'properties': {
+                        'query': {'title': 'Query', 'type': 'string'},
+                        'limit': {'title': 'Limit', 'type': 'integer'},
+                    },
+                    'required': ['query', 'limit'],
+                    'title': 'SearchInputModel',
+                    'type': 'object',
+                }
+            },
+        }
+    }
+    # the registry still lets the model leave out arguments that have a default
+    tools = ToolRegistry([search])
+    result = tools.execute([tool_use('1', 'search', query='maps')['toolUse']])[0]['toolResult']
+    assert result['status'] == 'success'